@@ -0,0 +1,145 @@
+""" Benchmarks for the hot paths of StreamAnimations (collision rules, pathfinding, rendering and sprite sheets).
+
+    Benchmarks are registered by group (see register and StreamAnimations.benchmarks.cases) and run with run,
+    which returns a JSON-serializable dict of results. Results can be compared against a stored baseline
+    with compare. From the command line:
+
+        python -m StreamAnimations.benchmarks [group ...] [--quick] [--output FILE] [--baseline FILE]
+"""
+## Builtin
+import json
+import platform
+import statistics
+import time
+## Third Party
+import numpy as np
+import PIL
+
+## Version of the results format (stored in the results' "version" key)
+FORMATVERSION = 1
+## Statistics recorded for each benchmark: statistics are in seconds per operation
+STATISTICS = ("best", "median", "mean")
+## Default fraction by which a benchmark has to slow down (or speed up) for compare to report it
+DEFAULT_THRESHOLD = .25
+
+## group => case function (see register)
+CASES = dict()
+
+def register(group: str):
+    """ Decorator which registers a case function under the given group.
+
+        A case function takes a single argument (quick: bool, which should reduce the benchmark sizes)
+        and yields (name, function, params, operations) for each benchmark: function is called with no
+        arguments once per repeat and performs the given number of operations (e.g.- moves or frames),
+        so that times are reported per operation. params is a dict describing the benchmark (e.g.- its size).
+    """
+    def decorator(function):
+        CASES[group] = function
+        return function
+    return decorator
+
+def measure(function, operations: int = 1, repeat: int = 5)-> dict:
+    """ Calls function repeat times and returns the best, median and mean time per operation (in seconds) """
+    times = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append((time.perf_counter() - start) / operations)
+    return dict(best = min(times), median = statistics.median(times), mean = statistics.fmean(times), repeat = repeat, operations = operations)
+
+def environment()-> dict:
+    """ Returns a description of the machine the benchmarks were run on """
+    return dict(python = platform.python_version(), implementation = platform.python_implementation(),
+        platform = platform.platform(), machine = platform.machine(), numpy = np.__version__, pillow = PIL.__version__)
+
+def groups()-> list:
+    ## Importing cases registers the default benchmarks
+    from StreamAnimations.benchmarks import cases
+    return list(CASES)
+
+def run(names: list = None, quick: bool = False, repeat: int = 5, log = None)-> dict:
+    """ Runs the benchmarks of the given groups (all groups if names is None) and returns the results.
+
+        Each result is keyed on "{group}/{name}" and contains its group, params and statistics.
+        If log is provided (e.g.- sys.stderr), the name of each benchmark is written to it as it is run.
+    """
+    available = groups()
+    names = available if names is None else list(names)
+    for name in names:
+        if name not in CASES: raise ValueError(f"Invalid benchmark group: {name} (available groups: {', '.join(available)})")
+
+    results = dict()
+    for group in names:
+        for (name, function, params, operations) in CASES[group](quick):
+            key = f"{group}/{name}"
+            if log: print(key, file = log, flush = True)
+            results[key] = dict(group = group, params = params, **measure(function, operations, repeat))
+    return dict(version = FORMATVERSION, created = time.time(), quick = quick, groups = names, environment = environment(), results = results)
+
+def save(results: dict, output)-> None:
+    """ Writes results to output (a path or an open file) as JSON """
+    if hasattr(output, "write"):
+        json.dump(results, output, indent = 2)
+        return
+    with open(output, "w") as f:
+        json.dump(results, f, indent = 2)
+
+def load(path)-> dict:
+    """ Loads results saved with save """
+    with open(path, "r") as f:
+        results = json.load(f)
+    if results.get("version") != FORMATVERSION:
+        raise ValueError(f"Unsupported benchmark results version: {results.get('version')}")
+    return results
+
+def compare(results: dict, baseline: dict, threshold: float = DEFAULT_THRESHOLD, statistic: str = "median")-> list:
+    """ Compares each benchmark in results with the same benchmark in baseline.
+
+        Returns a list of dicts (one per benchmark in either results) with the benchmark's name, the
+        baseline and current value of statistic, their ratio (current / baseline) and a status:
+            "regression" - the benchmark is more than threshold slower than the baseline
+            "improvement" - the benchmark is more than threshold faster than the baseline
+            "unchanged" - otherwise
+            "new"/"missing" - the benchmark is only in results/baseline
+        Benchmarks in baseline from groups which were not run for results are ignored.
+    """
+    if statistic not in STATISTICS: raise ValueError(f"Invalid statistic: {statistic}")
+    current = results["results"]
+    previous = {name: result for name, result in baseline["results"].items() if result["group"] in results["groups"]}
+    output = []
+    for name in list(current) + [name for name in previous if name not in current]:
+        new, old = current.get(name), previous.get(name)
+        new, old = new and new[statistic], old and old[statistic]
+        if old is None or new is None:
+            output.append(dict(name = name, baseline = old, current = new, ratio = None, status = "new" if old is None else "missing"))
+            continue
+        ratio = new / old if old else float("inf")
+        if ratio > 1 + threshold: status = "regression"
+        elif ratio < 1 / (1 + threshold): status = "improvement"
+        else: status = "unchanged"
+        output.append(dict(name = name, baseline = old, current = new, ratio = ratio, status = status))
+    return output
+
+def format_time(seconds: float)-> str:
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale: return f"{seconds/scale:.3f} {unit}"
+    return f"{seconds/1e-9:.1f} ns"
+
+def format_results(results: dict)-> str:
+    """ Returns a table of the median and best time per operation of each benchmark """
+    width = max([len(name) for name in results["results"]] + [9])
+    lines = [f"{'benchmark':<{width}}  {'median':>12}  {'best':>12}"]
+    for name, result in results["results"].items():
+        lines.append(f"{name:<{width}}  {format_time(result['median']):>12}  {format_time(result['best']):>12}")
+    return "\n".join(lines)
+
+def format_comparison(comparison: list)-> str:
+    """ Returns a table of the output of compare """
+    width = max([len(row["name"]) for row in comparison] + [9])
+    lines = [f"{'benchmark':<{width}}  {'baseline':>12}  {'current':>12}  {'ratio':>7}  status"]
+    for row in comparison:
+        baseline = format_time(row["baseline"]) if row["baseline"] is not None else "-"
+        current = format_time(row["current"]) if row["current"] is not None else "-"
+        ratio = f"{row['ratio']:.2f}x" if row["ratio"] is not None else "-"
+        lines.append(f"{row['name']:<{width}}  {baseline:>12}  {current:>12}  {ratio:>7}  {row['status']}")
+    return "\n".join(lines)
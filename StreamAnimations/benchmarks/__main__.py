@@ -0,0 +1,49 @@
+""" Command line interface for the benchmarks: run "python -m StreamAnimations.benchmarks --help" for usage """
+## This Module
+from StreamAnimations import benchmarks
+## Builtin
+import argparse
+import sys
+
+def parse_args(args: list = None)-> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog = "python -m StreamAnimations.benchmarks", description = "Times the hot paths of StreamAnimations and reports the results as JSON.")
+    parser.add_argument("groups", nargs = "*", help = "Benchmark groups to run (default: all groups)")
+    parser.add_argument("--list", action = "store_true", help = "List the available benchmark groups and exit")
+    parser.add_argument("--quick", action = "store_true", help = "Run smaller benchmarks (e.g.- as a smoke test)")
+    parser.add_argument("--repeat", type = int, default = 5, help = "Number of times each benchmark is run (default: %(default)s)")
+    parser.add_argument("--output", "-o", help = "File to write the results to as JSON (\"-\" for stdout)")
+    parser.add_argument("--baseline", "-b", help = "Results file to compare the results against")
+    parser.add_argument("--threshold", type = float, default = benchmarks.DEFAULT_THRESHOLD,
+        help = "Fraction by which a benchmark has to slow down to be reported as a regression (default: %(default)s)")
+    parser.add_argument("--statistic", choices = benchmarks.STATISTICS, default = "median", help = "Statistic to compare (default: %(default)s)")
+    return parser.parse_args(args)
+
+def main(args: list = None)-> int:
+    """ Runs the benchmarks. Returns 1 if any benchmark regressed compared to the baseline, otherwise 0 """
+    args = parse_args(args)
+    if args.list:
+        print("\n".join(benchmarks.groups()))
+        return 0
+    ## Load the baseline first so that a bad path fails before the benchmarks are run
+    baseline = benchmarks.load(args.baseline) if args.baseline else None
+    results = benchmarks.run(args.groups or None, quick = args.quick, repeat = args.repeat, log = sys.stderr)
+
+    ## Tables are written to stderr when the JSON is written to stdout
+    report = sys.stderr if args.output == "-" else sys.stdout
+    if args.output == "-":
+        benchmarks.save(results, sys.stdout)
+    elif args.output:
+        benchmarks.save(results, args.output)
+    if baseline is None:
+        print(benchmarks.format_results(results), file = report)
+        return 0
+    comparison = benchmarks.compare(results, baseline, threshold = args.threshold, statistic = args.statistic)
+    print(benchmarks.format_comparison(comparison), file = report)
+    regressions = [row for row in comparison if row["status"] == "regression"]
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}", file = report)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+""" The default benchmarks (see StreamAnimations.benchmarks.register) """
+## This Module
+from StreamAnimations import utils
+from StreamAnimations.benchmarks import register, scenes
+from StreamAnimations.engine.ai import algorithms
+from StreamAnimations.engine.ai.heuristics import distances
+## Builtin
+import io
+
+@register("collision")
+def collision(quick: bool):
+    """ collision_stop_rule (via CanvasBase.move_sprite) per move, for moves which succeed and moves which are blocked """
+    moves = 200 if quick else 1000
+    for desks in ((16,) if quick else (16, 100, 400)):
+        canvas, sprite, blockedby = scenes.collision_scene(desks)
+        params = dict(desks = len(canvas.sprites) - 1, moves = moves)
+        def free(canvas = canvas, sprite = sprite):
+            ## Moves back and forth so that the sprite stays in the same gap
+            for i in range(moves // 2):
+                canvas.move_sprite(sprite, "right")
+                canvas.move_sprite(sprite, "left")
+        def blocked(canvas = canvas, sprite = sprite):
+            for i in range(moves):
+                canvas.move_sprite(sprite, "up")
+        yield f"free-move/desks={params['desks']}", free, params, moves
+        yield f"blocked-move/desks={params['desks']}", blocked, params, moves
+
+@register("crowd")
+def crowd(quick: bool):
+    """ One tick of a crowd of walkers, moved with a move_sprite loop and with CanvasBase.move_sprites """
+    for walkers in ((100,) if quick else (100, 500, 1000)):
+        params = dict(walkers = walkers)
+        sequentialcanvas, sequentialwalkers, directions = scenes.crowd_scene(walkers)
+        batchcanvas, batchwalkers, directions = scenes.crowd_scene(walkers)
+        ## Walkers turn around every tick so that they stay in their gaps
+        reverse = dict(up = "down", down = "up", left = "right", right = "left")
+        def sequential(canvas = sequentialcanvas, sprites = sequentialwalkers, directions = directions):
+            for (sprite, direction) in zip(sprites, directions):
+                canvas.move_sprite(sprite, direction)
+            directions[:] = [reverse[direction] for direction in directions]
+        def batched(canvas = batchcanvas, sprites = batchwalkers, directions = list(directions)):
+            canvas.move_sprites(sprites, directions = directions)
+            directions[:] = [reverse[direction] for direction in directions]
+        yield f"move_sprite/walkers={walkers}", sequential, params, walkers
+        yield f"move_sprites/walkers={walkers}", batched, params, walkers
+
+@register("pathfinding")
+def pathfinding(quick: bool):
+    """ A* across mazes of increasing size: the generic astar, astar_grid and astar_grid with diagonal moves """
+    for size in ((21, 41) if quick else (21, 41, 81, 161)):
+        grid = scenes.maze(size)
+        start, target = (0, 0), (grid.shape[1] - 1, grid.shape[0] - 1)
+        params = dict(size = grid.shape[0], open = int((~grid).sum()))
+        adjacent = scenes.grid_adjacency(grid)
+        def generic(adjacent = adjacent, target = target):
+            list(algorithms.astar(start, target, adjacent, distances.manhattan))
+        def grid4(grid = grid, target = target):
+            algorithms.astar_grid(grid, start, target)
+        def grid8(grid = grid, target = target):
+            algorithms.astar_grid(grid, start, target, diagonal = True)
+        yield f"astar/maze={params['size']}", generic, params, 1
+        yield f"astar_grid/maze={params['size']}", grid4, params, 1
+        yield f"astar_grid-diagonal/maze={params['size']}", grid8, params, 1
+
+@register("render")
+def render(quick: bool):
+    """ GifRenderer.render per frame at several scales for each backend, and GifRenderer.save per frame """
+    frames = 8 if quick else 32
+    for backend in ("pil", "numpy"):
+        renderer = scenes.render_scene(frames, backend = backend)
+        for scale in ((1, 2) if quick else (1, 2, 4)):
+            params = dict(backend = backend, scale = scale, frames = frames, size = list(renderer.canvas.size))
+            def rendered(renderer = renderer, scale = scale):
+                for frame in renderer.frames:
+                    renderer.render(frame = frame, scale = scale)
+            yield f"render/{backend}/scale={scale}", rendered, params, frames
+    renderer = scenes.render_scene(frames)
+    for scale in ((1,) if quick else (1, 2)):
+        params = dict(backend = "pil", scale = scale, frames = frames, size = list(renderer.canvas.size))
+        def saved(renderer = renderer, scale = scale):
+            renderer.save(io.BytesIO(), framerate = 10, scale = scale)
+        yield f"save/scale={scale}", saved, params, frames
+
+@register("spritesheet")
+def spritesheet(quick: bool):
+    """ split_spritesheet and scale_image (with each strategy) on tiled copies of a test spritesheet """
+    for tiles in (((1, 1), (4, 2)) if quick else ((1, 1), (4, 2), (16, 4))):
+        sheet = scenes.spritesheet(tiles)
+        params = dict(size = list(sheet.size))
+        name = "x".join(str(side) for side in sheet.size)
+        yield f"split_spritesheet/{name}", lambda sheet = sheet: utils.split_spritesheet(sheet, 32, 32), params, 1
+        for multiplier in (2, 4):
+            for strategy in utils.SCALESTRATEGIES:
+                def scaled(sheet = sheet, multiplier = multiplier, strategy = strategy):
+                    utils.scale_image(sheet, multiplier, strategy = strategy)
+                yield f"scale_image/{strategy}/x{multiplier}/{name}", scaled, dict(params, multiplier = multiplier, strategy = strategy), 1
@@ -0,0 +1,129 @@
+""" Scenes used by the benchmarks, built from the test samples (see StreamAnimations.tests.utils) """
+## This Module
+from StreamAnimations import utils
+from StreamAnimations.canvases import SinglePageCanvas
+from StreamAnimations.engine import utils as engineutils
+from StreamAnimations.engine.renderers.gif import GifRenderer
+from StreamAnimations.systems import twodimensional
+from StreamAnimations.tests import utils as testutils
+## Builtin
+import math
+import random
+## Third Party
+from PIL import Image
+import numpy as np
+
+## Distance (in pixels) between the desks of collision_scene
+DESKSPACING = 64
+## Height of the hitboxes created by testutils.create_sprite_hitbox and create_terrain_hitbox
+HITBOXHEIGHT = 10
+## Colors used for the background of render_scene
+BACKGROUNDCOLORS = [(173, 216, 230, 255), (144, 238, 144, 255), (240, 230, 140, 255)]
+
+def collision_scene(desks: int)-> tuple:
+    """ Returns (canvas, sprite, blockedby) for a canvas with (at least) the given number of desks arranged in a grid.
+
+        The canvas has collision_stop_rule as a movement listener. sprite sits in the gap between two rows of desks,
+        so it can move left and right freely, and blockedby is the desk directly above it (so it cannot move up).
+    """
+    columns = max(2, math.ceil(math.sqrt(desks)))
+    canvas = testutils.load_canvas(size = (columns * DESKSPACING, columns * DESKSPACING))
+    canvas.add_listener("movement", engineutils.collision_stop_rule)
+    deskgrid = []
+    for y in range(columns):
+        for x in range(columns):
+            desk = testutils.load_terrain_sprite(hitboxes = [testutils.create_terrain_hitbox(),])
+            canvas.add_sprite(desk, (x * DESKSPACING, y * DESKSPACING))
+            deskgrid.append(desk)
+    ## Bottom of the sprite's hitbox is directly below the bottom of the desk's hitbox
+    blockedby = deskgrid[(columns // 2) * columns + columns // 2]
+    x, y = blockedby.location
+    sprite = testutils.load_testsprite(hitboxes = [testutils.create_sprite_hitbox(),])
+    canvas.add_sprite(sprite, (x, y + HITBOXHEIGHT))
+    return canvas, sprite, blockedby
+
+def crowd_scene(walkers: int, seed: int = 0)-> tuple:
+    """ Returns (canvas, walkers, directions) for a SinglePageCanvas (with collision_stop_rule) holding the given number
+        of walkers on a lattice, with a desk in every fourth gap. directions is a random direction for each walker.
+    """
+    columns = max(2, math.ceil(math.sqrt(walkers)))
+    canvas = SinglePageCanvas((columns * DESKSPACING, columns * DESKSPACING), steplength = testutils.STEPLENGTH)
+    canvas.add_listener("movement", engineutils.collision_stop_rule)
+    rng = random.Random(seed)
+    sprites = []
+    for i in range(walkers):
+        x, y = (i % columns) * DESKSPACING, (i // columns) * DESKSPACING
+        sprite = testutils.load_testsprite(hitboxes = [testutils.create_sprite_hitbox(),])
+        canvas.add_sprite(sprite, (x, y))
+        sprites.append(sprite)
+        if i % 4 == 0:
+            desk = testutils.load_terrain_sprite(hitboxes = [testutils.create_terrain_hitbox(),])
+            canvas.add_sprite(desk, (x + testutils.SPRITESIZE // 2, y + testutils.SPRITESIZE))
+    directions = [rng.choice(["up", "down", "left", "right"]) for sprite in sprites]
+    return canvas, sprites, directions
+
+def maze(size: int, seed: int = 0)-> np.ndarray:
+    """ Returns a (size, size) boolean grid (indexed [y, x], True is blocked) containing a perfect maze.
+
+        size is rounded up to an odd number. The maze is carved with a randomized depth-first search, so
+        there is exactly one route between any two open cells; (0, 0) and (size-1, size-1) are always open.
+    """
+    size = max(3, size | 1)
+    rng = random.Random(seed)
+    grid = np.ones((size, size), dtype = bool)
+    grid[0, 0] = False
+    stack = [(0, 0)]
+    while stack:
+        x, y = stack[-1]
+        neighbors = [(x + dx, y + dy) for (dx, dy) in ((2, 0), (0, 2), (-2, 0), (0, -2))
+                        if 0 <= x + dx < size and 0 <= y + dy < size and grid[y + dy, x + dx]]
+        if not neighbors:
+            stack.pop()
+            continue
+        nx, ny = rng.choice(neighbors)
+        grid[(y + ny) // 2, (x + nx) // 2] = False
+        grid[ny, nx] = False
+        stack.append((nx, ny))
+    return grid
+
+def grid_adjacency(grid: np.ndarray):
+    """ Returns an adjacent function for algorithms.astar which yields the open orthogonal neighbors of a cell of grid """
+    rows, columns = grid.shape
+    blocked = grid.tolist()
+    def adjacent(cell):
+        x, y = cell
+        for (nx, ny) in ((x + 1, y), (x, y + 1), (x - 1, y), (x, y - 1)):
+            if 0 <= nx < columns and 0 <= ny < rows and not blocked[ny][nx]:
+                yield (nx, ny), 1
+    return adjacent
+
+def render_scene(frames: int, size: tuple = (384, 216), desks: int = 6, backend: str = "pil")-> GifRenderer:
+    """ Returns a GifRenderer with the given number of recorded frames of a sprite walking around a room of desks """
+    canvas = testutils.load_canvas(size = size)
+    background = Image.new("RGBA", size, BACKGROUNDCOLORS[0])
+    ## Stripes so that the background is not a single color
+    for i, color in enumerate(BACKGROUNDCOLORS):
+        background.paste(color, (0, i * size[1] // len(BACKGROUNDCOLORS), size[0], (i + 1) * size[1] // len(BACKGROUNDCOLORS)))
+    renderer = GifRenderer(canvas, background, sorter = twodimensional.twod_sprite_sorter, backend = backend)
+    for i in range(desks):
+        desk = testutils.load_terrain_sprite(hitboxes = [testutils.create_terrain_hitbox(),])
+        canvas.add_sprite(desk, (48 + (i % 3) * 112, 48 + (i // 3) * 96))
+    sprite = testutils.load_testsprite(hitboxes = [testutils.create_sprite_hitbox(),])
+    canvas.add_sprite(sprite, (8, 8))
+
+    ## Walk a loop around the room
+    side = max(1, (min(size) - 64) // testutils.STEPLENGTH)
+    route = ["right"] * side + ["down"] * side + ["left"] * side + ["up"] * side
+    for i in range(frames):
+        with renderer.frame() as frame:
+            frame.move_sprite(sprite, route[i % len(route)])
+    return renderer
+
+def spritesheet(tiles: tuple = (1, 1))-> Image.Image:
+    """ Returns the "Walk Down" test spritesheet tiled (columns, rows) times """
+    sheet = utils.import_spritesheet(testutils.SAMPLEDIR / "Walk Down.png").convert("RGBA")
+    output = Image.new("RGBA", (sheet.width * tiles[0], sheet.height * tiles[1]))
+    for x in range(tiles[0]):
+        for y in range(tiles[1]):
+            output.paste(sheet, (x * sheet.width, y * sheet.height))
+    return output
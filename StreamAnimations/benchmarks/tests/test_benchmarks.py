@@ -0,0 +1,96 @@
+## Test Framework
+import unittest
+## Test Target
+from StreamAnimations import benchmarks
+from StreamAnimations.benchmarks import scenes, __main__ as cli
+## This Module
+from StreamAnimations.engine.ai import algorithms
+
+## Builtin
+import contextlib
+import io
+import pathlib
+import tempfile
+## Third Party
+import numpy as np
+
+def fake_results(times: dict, groups: list = None)-> dict:
+    """ Returns results (as returned by benchmarks.run) with the given median times (name => seconds) """
+    results = {name: dict(group = name.split("/")[0], params = {}, best = time, median = time, mean = time, repeat = 1, operations = 1)
+                for name, time in times.items()}
+    groups = groups or sorted(set(result["group"] for result in results.values()))
+    return dict(version = benchmarks.FORMATVERSION, created = 0, quick = True, groups = groups, environment = {}, results = results)
+
+class ScenesTestCase(unittest.TestCase):
+    def test_maze(self):
+        """ Tests that mazes are perfect mazes in which the corners are connected """
+        for size in [3, 8, 21, 41]:
+            with self.subTest(size = size):
+                grid = scenes.maze(size)
+                self.assertEqual(grid.shape[0] % 2, 1)
+                self.assertGreaterEqual(grid.shape[0], size)
+                self.assertTrue(np.array_equal(grid, scenes.maze(size)))
+                route = algorithms.astar_grid(grid, (0, 0), (grid.shape[1] - 1, grid.shape[0] - 1))
+                self.assertIsNotNone(route)
+                ## A perfect maze is a tree: there is one fewer passage than there are open cells
+                passages = (~grid[:, 1:] & ~grid[:, :-1]).sum() + (~grid[1:, :] & ~grid[:-1, :]).sum()
+                self.assertEqual(passages, (~grid).sum() - 1)
+
+    def test_collision_scene(self):
+        """ Tests that the sprite in the collision scene can move sideways but not up """
+        canvas, sprite, blockedby = scenes.collision_scene(9)
+        self.assertEqual(len(canvas.sprites), 10)
+        location = tuple(sprite.location)
+        canvas.move_sprite(sprite, "up")
+        self.assertEqual(tuple(sprite.location), location)
+        canvas.move_sprite(sprite, "right")
+        self.assertNotEqual(tuple(sprite.location), location)
+
+class BenchmarksTestCase(unittest.TestCase):
+    def test_run(self):
+        """ Tests running a group and saving and loading its results """
+        results = benchmarks.run(["collision",], quick = True, repeat = 1)
+        self.assertEqual(results["groups"], ["collision",])
+        self.assertTrue(results["results"])
+        for name, result in results["results"].items():
+            with self.subTest(name = name):
+                self.assertTrue(name.startswith("collision/"))
+                self.assertLessEqual(result["best"], result["median"])
+        with tempfile.TemporaryDirectory() as directory:
+            path = pathlib.Path(directory) / "results.json"
+            benchmarks.save(results, path)
+            self.assertEqual(benchmarks.load(path), results)
+
+        self.assertRaises(ValueError, benchmarks.run, ["notagroup",])
+
+    def test_compare(self):
+        """ Tests the status of each benchmark compared to a baseline """
+        baseline = fake_results({"a/slower": 1.0, "a/faster": 1.0, "a/same": 1.0, "a/removed": 1.0, "b/notrun": 1.0})
+        results = fake_results({"a/slower": 1.5, "a/faster": .5, "a/same": 1.1, "a/added": 1.0}, groups = ["a",])
+        comparison = {row["name"]: row for row in benchmarks.compare(results, baseline, threshold = .25)}
+        tests = [
+            ## name,        status
+            ("a/slower",    "regression"),
+            ("a/faster",    "improvement"),
+            ("a/same",      "unchanged"),
+            ("a/added",     "new"),
+            ("a/removed",   "missing"),
+        ]
+        for (name, status) in tests:
+            with self.subTest(name = name, status = status):
+                self.assertEqual(comparison[name]["status"], status)
+        ## Groups which were not run are not reported
+        self.assertNotIn("b/notrun", comparison)
+        self.assertAlmostEqual(comparison["a/slower"]["ratio"], 1.5)
+
+    def test_main(self):
+        """ Tests that the command line exits with 1 only if a benchmark regressed """
+        with tempfile.TemporaryDirectory() as directory:
+            directory = pathlib.Path(directory)
+            results = benchmarks.run(["collision",], quick = True, repeat = 1)
+            for scale, code in [(1e6, 0), (1e-6, 1)]:
+                with self.subTest(scale = scale, code = code):
+                    baseline = fake_results({name: result["median"] * scale for name, result in results["results"].items()})
+                    benchmarks.save(baseline, directory / "baseline.json")
+                    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+                        self.assertEqual(cli.main(["collision", "--quick", "--repeat", "1", "--baseline", str(directory / "baseline.json")]), code)
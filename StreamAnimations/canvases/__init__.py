@@ -1,16 +1,73 @@
 from argparse import ArgumentError
 from StreamAnimations.sprite import Sprite
 from StreamAnimations.engine import Event
+from StreamAnimations.canvases.utils import SpatialHash, OccupancyGrid, hitbox_footprint, inflate_grid
+from StreamAnimations.engine.instrumentation import listener_name
+## Builtin
+import time
+## Third Party
+import numpy as np
+
+## Default size (in pixels) of the cells used by CanvasBase.spatialindex
+DEFAULT_CELLSIZE = 64
+
+class MoveBatch():
+    """ A set of simultaneous moves being evaluated by CanvasBase.move_sprites.
+
+        Movement listeners can evaluate every move at once by having a batch attribute: batch(moves, allowed)
+        is called with the MoveBatch and a boolean array of the moves which are still allowed, and should return
+        a boolean array of the moves it allows (entries which are False in allowed can be ignored).
+        Batch functions should not have side effects: they may be called more than once for the same moves.
+
+        locations - (n, 2) array of the movers' current (x, y) locations
+        deltas - (n, 2) array of the (dx, dy) of each move in pixels
+    """
+    def __init__(self, canvas: "CanvasBase", sprites: list, directions: list, deltas: np.ndarray) -> None:
+        self.canvas = canvas
+        self.sprites = sprites
+        self.directions = directions
+        self.locations = np.array([sprite.location[:2] for sprite in sprites]).reshape(-1, 2)
+        self.deltas = np.asarray(deltas).reshape(-1, 2)
+        ## sprite => index of its move
+        self.index = {sprite: i for i, sprite in enumerate(sprites)}
+        ## Storage for batch functions to reuse work between calls (e.g.- the canvas' hitboxes)
+        self.cache = dict()
+        if len(self.index) != len(sprites): raise ValueError("Each sprite can only be moved once per batch")
+
+    def __len__(self)-> int:
+        return len(self.sprites)
+
+    @property
+    def targets(self)-> np.ndarray:
+        """ (n, 2) array of the location each sprite is moving to """
+        return self.locations + self.deltas
+
+    def event(self, i: int)-> Event:
+        """ Returns the movement Event for the i-th move (as created by CanvasBase.move_sprite) """
+        sprite = self.sprites[i]
+        x, y, *z = sprite.location
+        dx, dy = self.deltas[i].tolist()
+        return Event(canvas = self.canvas, sprite = sprite, x = x, y = y, z = z[0] if z else sprite.zindex, dx = dx, dy = dy, dz = None)
 
 class CanvasBase():
-    def __init__(self, size: tuple, steplength:int) -> None:
+    def __init__(self, size: tuple, steplength:int, cellsize: int = None) -> None:
         ## Size of Canvas
         self.size = size
         ## Distance between animations
         self.steplength = steplength
         ## Sprites on Canvas
         self.sprites = []
+        ## Broad-phase lookup for sprites with hitboxes
+        self.spatialindex = SpatialHash(cellsize or DEFAULT_CELLSIZE)
+        ## Sprites whose location or frame changed since they were last hashed into spatialindex (see refresh_index)
+        self._stale = dict()
+        ## Sprites whose location or frame changed since they were last rasterized into occupancy (see get_occupancy)
+        self._staleoccupancy = dict()
+        ## OccupancyGrid at steplength resolution (created the first time it is needed: see get_occupancy)
+        self.occupancy = None
         self.events = dict(movement = [])
+        ## Optional engine.instrumentation.Instrumentation which records timers and counters (None disables it)
+        self.instrumentation = None
 
     def add_listener(self, event:str, callback):
         listeners = self.events.get(event, [])
@@ -22,8 +79,17 @@ class CanvasBase():
 
     def trigger_event(self, eventname: str, eventobject: Event):
         """ Helper generator function to make triggering events uniform (and aid in debugging) """
+        instrumentation = self.instrumentation
+        if instrumentation is None:
+            for callback in self.events[eventname]:
+                yield callback(eventobject)
+            return
+        ## Each listener is timed separately (excluding the time spent by the caller between listeners)
         for callback in self.events[eventname]:
-            yield callback(eventobject)
+            start = time.perf_counter()
+            response = callback(eventobject)
+            instrumentation.add_time(f"event.{eventname}.{listener_name(callback)}", time.perf_counter() - start)
+            yield response
 
     def add_sprite(self, sprite: Sprite, location: any = None, zindex: int = 0)-> None:
         if not isinstance(sprite, Sprite):
@@ -33,6 +99,80 @@ class CanvasBase():
             sprite.location = location
         if zindex:
             sprite.zindex = zindex
+        sprite.watch(self._sprite_changed)
+        self.spatialindex.update(sprite)
+        if self.occupancy is not None: self.occupancy.update(sprite)
+
+    def _sprite_changed(self, sprite: Sprite)-> None:
+        """ Sprite.watch callback: the sprite is rehashed (and re-rasterized) the next time the spatialindex (or occupancy grid) is used """
+        self._stale[sprite] = None
+        if self.occupancy is not None: self._staleoccupancy[sprite] = None
+
+    def refresh_index(self, exclude: Sprite = None)-> None:
+        """ Rehashes every sprite whose location or frame has changed since it was last hashed into the spatialindex.
+
+            exclude is left stale (e.g.- a sprite being tested at a temporary location, which is likely to change back)
+        """
+        for sprite in list(self._stale):
+            if sprite is exclude: continue
+            self.spatialindex.update(sprite)
+            del self._stale[sprite]
+
+    def reindex_sprite(self, sprite: Sprite)-> None:
+        """ Immediately updates the sprite's entry in the spatialindex (and occupancy grid).
+
+            Sprites are rehashed automatically when their location or frame changes (see Sprite.watch),
+            so this is not required after setting Sprite.location directly.
+        """
+        self.spatialindex.update(sprite)
+        self._stale.pop(sprite, None)
+        if self.occupancy is not None: self.occupancy.update(sprite)
+        self._staleoccupancy.pop(sprite, None)
+
+    def get_occupancy(self)-> OccupancyGrid:
+        """ Returns the canvas' OccupancyGrid, rasterizing all sprites the first time it is called.
+
+            Once created, the grid is updated incrementally as sprites are added and moved, and sprites whose
+            location or frame changed outside of the canvas (see Sprite.watch) are re-rasterized when this is called.
+            Each cell is steplength x steplength pixels.
+        """
+        if self.occupancy is None:
+            self.occupancy = OccupancyGrid(self.size, self.steplength)
+            for sprite in self.sprites: self.occupancy.update(sprite)
+            self._staleoccupancy.clear()
+        for sprite in list(self._staleoccupancy):
+            self.occupancy.update(sprite)
+            del self._staleoccupancy[sprite]
+        return self.occupancy
+
+    def occupancy_grid(self, exclude: list = None)-> "np.ndarray":
+        """ Returns a boolean grid (indexed [y, x]) of the cells covered by the hitboxes of all sprites except those in exclude """
+        return self.get_occupancy().grid(exclude)
+
+    def passability_grid(self, sprite: Sprite, outside: bool = True)-> "np.ndarray":
+        """ Returns a boolean grid (indexed [y, x]) which is True for each cell that the sprite cannot be located in.
+
+            The occupancy grid (excluding the sprite itself) is inflated by the sprite's hitbox footprint, so whether
+            the sprite can move to a location is a single lookup: grid[cell[1], cell[0]] where cell = sprite_cell(sprite, location).
+            If outside is True, locations where the sprite's hitboxes would leave the canvas are also blocked.
+        """
+        grid = self.occupancy_grid(exclude = [sprite,])
+        return inflate_grid(grid, hitbox_footprint(sprite, self.steplength), outside = outside)
+
+    def sprite_cell(self, sprite: Sprite, location: tuple = None)-> tuple:
+        """ Returns the (x, y) occupancy grid cell containing location (defaults to the sprite's current location) """
+        x, y = (location or sprite.location)[:2]
+        return x // self.steplength, y // self.steplength
+
+    def cell_location(self, sprite: Sprite, cell: tuple)-> tuple:
+        """ Returns the location of the sprite when it is moved (in whole steps) into the given cell """
+        x, y = sprite.location[:2]
+        return cell[0]*self.steplength + x % self.steplength, cell[1]*self.steplength + y % self.steplength
+
+    def nearby_sprites(self, sprite: Sprite)-> list:
+        """ Returns the sprites which share a spatialindex cell with the given sprite's hitboxes at its current location """
+        self.refresh_index(exclude = sprite)
+        return self.spatialindex.query_sprite(sprite)
 
     def move_sprite(self, sprite: Sprite, direction: str = None, offset: tuple = None)-> None:
         """ Animates the given sprite and updates its location based on the provided movement """
@@ -52,6 +192,69 @@ class CanvasBase():
         deltas = [off*self.steplength for off in offset]
         self._handle_move(sprite, direction, deltas)
 
+    def move_sprites(self, sprites: list, offsets = None, directions: list = None)-> np.ndarray:
+        """ Moves many sprites at once (e.g.- every walker in a crowd for one tick) and returns a boolean array of which sprites moved.
+
+            offsets is an (n, 2) array of offsets (in steps, as for move_sprite) and/or directions is a list of directions,
+            with one entry per sprite.
+
+            Moves are simultaneous: movement listeners with a batch attribute (see MoveBatch) evaluate every move at once,
+            while other listeners are called with an Event for each move (as by move_sprite) until one returns False.
+            Batch listeners are re-run until no more moves are blocked, so that (for example) a sprite cannot move into
+            the spot of a sprite whose own move was blocked.
+        """
+        sprites = list(sprites)
+        if directions is None and offsets is None:
+            raise ValueError("Directions or offsets are needed")
+        if offsets is not None: offsets = np.asarray(offsets).reshape(len(sprites), -1)
+        if directions is not None and len(directions) != len(sprites):
+            raise ValueError("A direction is needed for each sprite")
+
+        ## Directions and offsets are only normalized once per coordinate system
+        normalized, resolved = dict(), []
+        for i, sprite in enumerate(sprites):
+            direction = directions[i] if directions is not None else None
+            offset = tuple(offsets[i].tolist()) if offsets is not None else None
+            key = (sprite.cs, direction, offset)
+            if key not in normalized:
+                if offset is None:
+                    offset = tuple(sprite.cs.determine_offset(direction))
+                determined = sprite.cs.determine_direction(offset = offset)
+                if direction is not None and sprite.cs.normalize_direction(direction) != determined:
+                    raise ValueError(f"Direction and Offset do not match: {direction}, {offset}")
+                normalized[key] = (direction or determined, offset[:2])
+            resolved.append(normalized[key])
+        deltas = np.array([offset for (direction, offset) in resolved]).reshape(-1, 2) * self.steplength
+        moves = MoveBatch(self, sprites, [direction for (direction, offset) in resolved], deltas)
+        allowed = np.ones(len(moves), dtype = bool)
+
+        instrumentation = self.instrumentation
+        listeners = [(callback, getattr(callback, "batch", None)) for callback in self.events["movement"]]
+        ## Responses of the per-move listeners do not depend on the other moves, so they are only called once per move
+        responses = dict()
+        changed = True
+        while changed and allowed.any():
+            before = allowed.copy()
+            for (callback, batch) in listeners:
+                if batch is not None:
+                    if instrumentation is not None: start = time.perf_counter()
+                    allowed &= batch(moves, allowed)
+                    if instrumentation is not None: instrumentation.add_time(f"event.movement.{listener_name(callback)}.batch", time.perf_counter() - start)
+                    continue
+                for i in np.flatnonzero(allowed).tolist():
+                    key = (callback, i)
+                    if key not in responses:
+                        if instrumentation is not None: start = time.perf_counter()
+                        responses[key] = callback(moves.event(i)) is not False
+                        if instrumentation is not None: instrumentation.add_time(f"event.movement.{listener_name(callback)}", time.perf_counter() - start)
+                    allowed[i] = responses[key]
+            changed = not np.array_equal(before, allowed)
+
+        for i in np.flatnonzero(allowed).tolist():
+            self._execute_move(sprites[i], moves.directions[i], moves.deltas[i].tolist())
+        if instrumentation is not None: instrumentation.count("move.blocked", int(len(moves) - allowed.sum()))
+        return allowed
+
     def _handle_move(self, sprite: Sprite, direction: str, deltas: tuple) -> None:
         dx, dy, *dz = deltas
         dz = dz[0] if dz else None
@@ -60,12 +263,22 @@ class CanvasBase():
         event = Event(canvas = self, sprite = sprite, x = x, y = y , z = z, dx = dx, dy = dy, dz = dz)
         for response in self.trigger_event("movement", event):
             if response is False:
+                if self.instrumentation is not None: self.instrumentation.count("move.blocked")
                 return
         self._execute_move(sprite, direction, deltas)
 
     def _execute_move(self, sprite: Sprite, direction: str, deltas: tuple) -> None:
+        instrumentation = self.instrumentation
+        if instrumentation is not None: start = time.perf_counter()
         sprite.move(direction)
         sprite.location = [loc+delta for (loc, delta) in zip(sprite.location, deltas)]
+        self.spatialindex.update(sprite)
+        self._stale.pop(sprite, None)
+        if self.occupancy is not None: self.occupancy.update(sprite)
+        self._staleoccupancy.pop(sprite, None)
+        if instrumentation is not None:
+            instrumentation.add_time("canvas.execute_move", time.perf_counter() - start)
+            instrumentation.count("move.executed")
 
     def cycle_animation(self, sprite: Sprite):
         """ Increments the animation frame for the given Sprite.
@@ -75,8 +288,15 @@ class CanvasBase():
         sprite.animations.cycle()
 
     def animate_idlesprites(self, idlesprites):
+        instrumentation = self.instrumentation
+        if instrumentation is not None: start = time.perf_counter()
+        count = 0
         for sprite in idlesprites:
             sprite.cycle_idle()
+            count += 1
+        if instrumentation is not None:
+            instrumentation.add_time("canvas.animate_idlesprites", time.perf_counter() - start)
+            instrumentation.count("canvas.idlesprites", count)
 
 class SinglePageMixin:
     def attach_singlepage(self):
@@ -91,6 +311,14 @@ class SinglePageMixin:
             or 0> (targety := event.y+event.dy) or targety > self.size[1]-1:
             return False
 
+def check_bounds_batch(moves: MoveBatch, allowed: np.ndarray)-> np.ndarray:
+    """ Batch form of SinglePageMixin.check_bounds (see MoveBatch) """
+    targets = moves.targets
+    width, height = moves.canvas.size[:2]
+    return allowed & (targets[:, 0] >= 0) & (targets[:, 0] <= width - 1) & (targets[:, 1] >= 0) & (targets[:, 1] <= height - 1)
+
+SinglePageMixin.check_bounds.batch = check_bounds_batch
+
 class SinglePageCanvas(CanvasBase, SinglePageMixin):
     def __init__(self, *args, **kw) -> None:
         super().__init__(*args, **kw)
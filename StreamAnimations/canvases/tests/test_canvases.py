@@ -0,0 +1,106 @@
+## Test Framework
+import unittest
+## Target Module
+from StreamAnimations import canvases
+## Test Helper functions
+from StreamAnimations.tests import utils as testutils
+
+## This Module
+from StreamAnimations.benchmarks import scenes
+from StreamAnimations.engine import utils
+
+class MoveSpritesTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.canvas = canvases.SinglePageCanvas((500, 500), steplength = testutils.STEPLENGTH)
+        self.canvas.add_listener("movement", utils.collision_stop_rule)
+
+    def add_walker(self, location: tuple):
+        sprite = testutils.load_testsprite(hitboxes = [testutils.create_sprite_hitbox(),])
+        self.canvas.add_sprite(sprite, location)
+        return sprite
+
+    def test_matches_move_sprite(self):
+        """ Tests that move_sprites moves sprites which do not interact with each other exactly as move_sprite does """
+        for walkers in (16, 50):
+            with self.subTest(walkers = walkers):
+                sequential, sprites, directions = scenes.crowd_scene(walkers, seed = walkers)
+                batched, batchsprites, _ = scenes.crowd_scene(walkers, seed = walkers)
+                for i in range(2):
+                    for (sprite, direction) in zip(sprites, directions): sequential.move_sprite(sprite, direction)
+                    moved = batched.move_sprites(batchsprites, directions = directions)
+                    self.assertEqual(moved.shape, (walkers,))
+                self.assertEqual([sprite.location for sprite in sprites], [sprite.location for sprite in batchsprites])
+
+    def test_offsets(self):
+        """ Tests that offsets can be used instead of (or alongside) directions """
+        sprite = self.add_walker((100, 100))
+        other = self.add_walker((200, 100))
+        moved = self.canvas.move_sprites([sprite, other], offsets = [(1, 0), (0, 1)])
+        self.assertEqual(moved.tolist(), [True, True])
+        self.assertEqual(sprite.location, (100 + testutils.STEPLENGTH, 100))
+        self.assertEqual(other.location, (200, 100 + testutils.STEPLENGTH))
+
+        self.canvas.move_sprites([sprite, other], offsets = [(-1, 0), (0, -1)], directions = ["left", "up"])
+        self.assertEqual(sprite.location, (100, 100))
+        self.assertEqual(other.location, (200, 100))
+
+        for (offsets, directions) in [
+            (None, None),
+            ([(1, 0), (0, 1)], ["left", "up"]),
+            (None, ["left"]),
+            ]:
+            with self.subTest(offsets = offsets, directions = directions):
+                with self.assertRaises(ValueError):
+                    self.canvas.move_sprites([sprite, other], offsets = offsets, directions = directions)
+
+        with self.assertRaises(ValueError):
+            self.canvas.move_sprites([sprite, sprite], directions = ["left", "left"])
+
+    def test_simultaneous_moves(self):
+        """ Tests that moves are evaluated against each other's targets """
+        ## Note: the walkers' hitboxes are limited to their feet, which are 8 pixels wide (12 pixels from the left of the sprite)
+        tests = [
+            ## locations,                               directions (None if not moving),  moved
+            ## A sprite moves into the spot being vacated by the sprite ahead of it
+            ([(100, 100), (108, 100)],                  ["right", "right"],               [True, True]),
+            ## Two sprites moving into the same spot: only the first one moves
+            ([(100, 100), (116, 100)],                  ["right", "left"],                [True, False]),
+            ## The sprite ahead is blocked by a sprite which is not moving, so the sprite behind it is blocked as well
+            ([(100, 100), (108, 100), (116, 100)],      ["right", "right", None],         [False, False]),
+            ## The sprite ahead is blocked by a sprite which is blocked by the edge of the canvas
+            ([(463, 100), (487, 100), (495, 100)],      ["right", "right", "right"],      [True, False, False]),
+            ]
+        for (locations, directions, moved) in tests:
+            with self.subTest(locations = locations, directions = directions):
+                self.setUp()
+                sprites = [self.add_walker(location) for location in locations]
+                movers = [(sprite, direction) for (sprite, direction) in zip(sprites, directions) if direction is not None]
+                result = self.canvas.move_sprites([sprite for (sprite, direction) in movers], directions = [direction for (sprite, direction) in movers])
+                self.assertEqual(result.tolist(), moved)
+                for ((sprite, direction), location, m) in zip(movers, locations, moved):
+                    dx, dy = sprite.cs.determine_offset(direction)[:2] if m else (0, 0)
+                    self.assertEqual(tuple(sprite.location), (location[0] + dx * testutils.STEPLENGTH, location[1] + dy * testutils.STEPLENGTH))
+
+    def test_check_bounds(self):
+        """ Tests that moves off of a SinglePageCanvas are blocked """
+        sprites = [self.add_walker(location) for location in [(0, 100), (499, 200), (200, 0), (300, 499), (250, 250)]]
+        moved = self.canvas.move_sprites(sprites, directions = ["left", "right", "up", "down", "down"])
+        self.assertEqual(moved.tolist(), [False, False, False, False, True])
+        self.assertEqual([tuple(sprite.location) for sprite in sprites], [(0, 100), (499, 200), (200, 0), (300, 499), (250, 250 + testutils.STEPLENGTH)])
+
+    def test_event_listeners(self):
+        """ Tests that listeners without a batch form are called with an Event for each move """
+        sprites = [self.add_walker(location) for location in [(100, 100), (200, 100), (300, 100)]]
+        events = []
+        def listener(event: canvases.Event):
+            events.append(event)
+            if event.sprite is sprites[1]: return False
+        self.canvas.add_listener("movement", listener)
+        moved = self.canvas.move_sprites(sprites, directions = ["right", "right", "right"])
+        self.assertEqual(moved.tolist(), [True, False, True])
+        self.assertEqual([event.sprite for event in events], sprites)
+        self.assertEqual([(event.x, event.y, event.dx, event.dy) for event in events], [(100, 100, 8, 0), (200, 100, 8, 0), (300, 100, 8, 0)])
+        self.assertEqual(sprites[1].location, (200, 100))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,238 @@
+## Test Framework
+import unittest
+## Test Target
+from StreamAnimations.canvases import utils
+## Test Utilities
+from StreamAnimations.tests import utils as testutils
+
+## This Module
+from StreamAnimations.sprite import hitbox
+## Third Party
+import numpy as np
+
+class SpatialHashTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.index = utils.SpatialHash(cellsize = 32)
+        self.sprite = testutils.load_testsprite(hitboxes=[testutils.create_sprite_hitbox(),])
+        self.desk = testutils.load_terrain_sprite(hitboxes=[testutils.create_terrain_hitbox(),])
+
+    def test_cells_for_bbox(self):
+        """ Tests that the cells overlapped by a bbox are returned (bboxes exclude their right and bottom edges) """
+        tests = [
+            ## bbox,    result
+            ( (  0,  0, 32, 32),    [(0, 0),] ),
+            ( (  0,  0, 33, 32),    [(0, 0), (1, 0)] ),
+            ( ( 31, 31, 33, 33),    [(0, 0), (0, 1), (1, 0), (1, 1)] ),
+            ( (-1, -1,  1,  1),     [(-1, -1), (-1, 0), (0, -1), (0, 0)] ),
+            ( ( 64, 64, 64, 64),    [(2, 2),] ),
+        ]
+        for (bbox, result) in tests:
+            with self.subTest(bbox = bbox, result = result):
+                self.assertEqual(self.index.cells_for_bbox(bbox), result)
+
+    def test_query_sprite(self):
+        """ Tests that only sprites sharing a cell are returned and that update rehashes a moved sprite """
+        self.desk.location = (0, 0)
+        self.index.update(self.desk)
+
+        self.sprite.location = (0, 0)
+        self.assertEqual(self.index.query_sprite(self.sprite), [self.desk,])
+
+        self.sprite.location = (200, 200)
+        self.assertEqual(self.index.query_sprite(self.sprite), [])
+
+        ## Moving the desk without updating leaves it in its old cells
+        self.desk.location = (200, 200)
+        self.assertEqual(self.index.query_sprite(self.sprite), [])
+        self.index.update(self.desk)
+        self.assertEqual(self.index.query_sprite(self.sprite), [self.desk,])
+
+        ## A sprite is never returned as its own neighbour
+        self.index.update(self.sprite)
+        self.assertEqual(self.index.query_sprite(self.sprite), [self.desk,])
+
+        self.index.remove(self.desk)
+        self.assertNotIn(self.desk, self.index)
+        self.assertEqual(self.index.query_sprite(self.sprite), [])
+        self.assertEqual(self.index.query((200, 200, 201, 201)), [self.sprite,])
+
+class OccupancyGridTestCase(unittest.TestCase):
+    def test_hitbox_cells(self):
+        """ Tests that every cell containing a hitbox pixel is returned and that cells outside the grid are ignored """
+        tests = [
+            ## location, cellsize, result
+            ( (0, 0),   1,  [y*10 + x for y in range(3) for x in range(4)]),
+            ( (0, 0),   4,  [0,]),
+            ( (3, 2),   4,  [0, 1, 10, 11]),
+            ( (-2, -2), 1,  [0, 1]),
+            ( (8, 0),   1,  [8, 9, 18, 19, 28, 29]),
+            ( (20, 20), 1,  []),
+        ]
+        for (location, cellsize, result) in tests:
+            with self.subTest(location = location, cellsize = cellsize, result = result):
+                block = testutils.create_block(location)
+                self.assertEqual(utils.hitbox_cells(block, cellsize, (5, 10)).tolist(), result)
+
+    def test_occupancy_grid(self):
+        """ Tests that the hitboxes of all sprites (except excluded ones) are rasterized """
+        blocks = [testutils.create_block((0, 0)), testutils.create_block((14, 8)), testutils.create_block((30, 30))]
+        grid = utils.occupancy_grid(blocks, (17, 10), cellsize = 4)
+        self.assertEqual(grid.shape, (3, 5))
+        expected = np.zeros((3, 5), dtype = bool)
+        expected[0, 0] = expected[2, 3] = expected[2, 4] = True
+        self.assertTrue(np.array_equal(grid, expected))
+
+        grid = utils.occupancy_grid(blocks, (17, 10), cellsize = 4, exclude = [blocks[0],])
+        expected[0, 0] = False
+        self.assertTrue(np.array_equal(grid, expected))
+
+    def test_masked_hitbox(self):
+        """ Tests that only the set pixels of a MaskedHitbox are rasterized """
+        testsprite = testutils.load_testsprite(hitboxes = [testutils.create_sprite_hitbox(),])
+        testsprite.location = (0, 0)
+        grid = utils.occupancy_grid([testsprite,], (32, 32))
+        hitbox = testsprite.hitboxes[0]
+        expected = np.zeros((32, 32), dtype = bool)
+        x0, y0, x1, y1 = hitbox.bbox
+        expected[y0:y1, x0:x1] = np.asarray(hitbox.image, dtype = bool)
+        self.assertTrue(np.array_equal(grid, expected))
+        self.assertLess(grid.sum(), 32*10)
+
+class OccupancyGridClassTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.grid = utils.OccupancyGrid((20, 12), cellsize = 4)
+        self.blocks = [testutils.create_block(location) for location in [(0, 0), (2, 2), (12, 8)]]
+        for block in self.blocks: self.grid.update(block)
+
+    def test_update(self):
+        """ Tests that cells are counted per sprite and that moved sprites are re-rasterized """
+        self.assertEqual(self.grid.shape, (3, 5))
+        self.assertEqual(self.grid.counts[0, 0], 2)
+        self.assertTrue(np.array_equal(self.grid.grid(), utils.occupancy_grid(self.blocks, (20, 12), cellsize = 4)))
+
+        self.blocks[0].location = (16, 0)
+        self.grid.update(self.blocks[0])
+        self.assertEqual(self.grid.counts[0, 0], 1)
+        self.assertEqual(self.grid.counts[0, 4], 1)
+        self.assertTrue(np.array_equal(self.grid.grid(), utils.occupancy_grid(self.blocks, (20, 12), cellsize = 4)))
+
+        self.grid.remove(self.blocks[1])
+        self.assertNotIn(self.blocks[1], self.grid)
+        self.assertEqual(self.grid.counts.sum(), 2)
+
+    def test_exclude(self):
+        """ Tests that excluded sprites are not included in the grid """
+        tests = [
+            ## exclude, blocked cells
+            ([],                                [(0, 0), (1, 0), (0, 1), (1, 1), (3, 2)]),
+            ([0,],                              [(0, 0), (1, 0), (0, 1), (1, 1), (3, 2)]),
+            ([1,],                              [(0, 0), (3, 2)]),
+            ([0, 1, 2],                         []),
+        ]
+        for (exclude, result) in tests:
+            with self.subTest(exclude = exclude, result = result):
+                grid = self.grid.grid(exclude = [self.blocks[i] for i in exclude])
+                self.assertEqual(sorted((x, y) for (y, x) in zip(*np.nonzero(grid))), sorted(result))
+        ## Excluding does not modify the counts
+        self.assertEqual(self.grid.counts.sum(), 6)
+
+    def test_changed_since(self):
+        """ Tests that the cells changed since a version are tracked """
+        version = self.grid.version
+        self.assertEqual(self.grid.changed_since(version).tolist(), [])
+        ## Not moving does not create a new version
+        self.grid.update(self.blocks[2])
+        self.assertEqual(self.grid.version, version)
+
+        self.blocks[2].location = (16, 8)
+        self.grid.update(self.blocks[2])
+        self.assertEqual(self.grid.changed_since(version).tolist(), [13, 14])
+        self.blocks[0].location = (4, 0)
+        self.grid.update(self.blocks[0])
+        self.assertEqual(self.grid.changed_since(version).tolist(), [0, 1, 13, 14])
+        self.assertEqual(self.grid.changed_since(version + 1).tolist(), [0, 1])
+        self.assertIsNone(self.grid.changed_since(-5))
+
+class InflateGridTestCase(unittest.TestCase):
+    def test_footprint(self):
+        """ Tests that footprints are relative to the cell containing the sprite's location """
+        block = testutils.create_block((0, 0), size = (5, 3))
+        for location in [(0, 0), (8, 4), (1, 0)]:
+            with self.subTest(location = location):
+                block.location = location
+                self.assertEqual(utils.hitbox_footprint(block, 4).tolist(), [[0, 0], [1, 0]])
+        block.location = (3, 2)
+        self.assertEqual(utils.hitbox_footprint(block, 4).tolist(), [[0, 0], [0, 1], [1, 0], [1, 1]])
+
+    def test_inflate_grid(self):
+        """ Tests that a cell is blocked if a sprite's footprint located there would overlap a blocked cell """
+        grid = np.zeros((4, 5), dtype = bool)
+        grid[2, 2] = True
+        footprint = [(0, 0), (1, 0)]
+        expected = np.zeros((4, 5), dtype = bool)
+        expected[2, 1] = expected[2, 2] = True
+        self.assertTrue(np.array_equal(utils.inflate_grid(grid, footprint, outside = False), expected))
+        ## The footprint cannot extend past the right edge
+        expected[:, 4] = True
+        self.assertTrue(np.array_equal(utils.inflate_grid(grid, footprint), expected))
+        ## Negative offsets
+        expected = np.zeros((4, 5), dtype = bool)
+        expected[2, 2] = expected[3, 2] = True
+        expected[0, :] = True
+        self.assertTrue(np.array_equal(utils.inflate_grid(grid, [(0, 0), (0, -1)]), expected))
+
+class CanvasOccupancyTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.canvas = testutils.load_canvas(size = (64, 48))
+        self.desk = testutils.load_terrain_sprite(hitboxes=[testutils.create_terrain_hitbox(),])
+        ## Mobile sprite with a single 8x8 (1x1 cell) hitbox
+        self.block = testutils.load_testsprite(hitboxes = [hitbox.Hitbox(hitbox.create_rect_hitbox_image(8, 8)),])
+        self.canvas.add_sprite(self.desk, (0, 0))
+        self.canvas.add_sprite(self.block, (40, 8))
+
+    def test_incremental(self):
+        """ Tests that the canvas' occupancy grid is updated as sprites are added and moved """
+        self.assertIsNone(self.canvas.occupancy)
+        grid = self.canvas.occupancy_grid()
+        self.assertEqual(grid.shape, (6, 8))
+        self.assertTrue(np.array_equal(grid, utils.occupancy_grid(self.canvas.sprites, self.canvas.size, testutils.STEPLENGTH)))
+
+        for direction in [(0, 1), (0, 1), (1, 0)]:
+            self.canvas.move_sprite(self.block, offset = direction)
+        other = testutils.create_block(None, size = (8, 8))
+        self.canvas.add_sprite(other, (0, 40))
+        self.assertTrue(np.array_equal(self.canvas.occupancy_grid(), utils.occupancy_grid(self.canvas.sprites, self.canvas.size, testutils.STEPLENGTH)))
+        self.assertTrue(self.canvas.occupancy_grid()[3, 6])
+        self.assertFalse(self.canvas.occupancy_grid(exclude = [self.block,])[3, 6])
+
+    def test_passability_grid(self):
+        """ Tests that passability is a single lookup in the inflated grid """
+        grid = self.canvas.passability_grid(self.block)
+        ## The block is 1x1 cells, so it is only blocked by the desk's hitbox
+        self.assertTrue(np.array_equal(grid, self.canvas.occupancy_grid(exclude = [self.block,])))
+        ## The desk's hitbox covers 6x2 cells (at the bottom of the desk), so it is blocked wherever it would overlap the block
+        self.block.location = (8, 32)
+        grid = self.canvas.passability_grid(self.desk)
+        self.assertTrue(grid[self.canvas.sprite_cell(self.desk, (0, 16))[::-1]])
+        self.assertTrue(grid[self.canvas.sprite_cell(self.desk, (0, 8))[::-1]])
+        self.assertFalse(grid[self.canvas.sprite_cell(self.desk, (0, 0))[::-1]])
+        ## Desk would stick out of the canvas
+        self.assertTrue(grid[self.canvas.sprite_cell(self.desk, (24, 0))[::-1]])
+
+    def test_external_changes(self):
+        """ Tests that the occupancy grid follows sprites which are moved outside of the canvas """
+        expected = lambda: utils.occupancy_grid(self.canvas.sprites, self.canvas.size, testutils.STEPLENGTH)
+        self.canvas.get_occupancy()
+        ## valid_moves moves the sprite through the canvas and then returns it to its location
+        list(self.block.valid_moves(self.canvas, (16, 32)))
+        self.assertEqual(self.block.location, (40, 8))
+        self.assertTrue(np.array_equal(self.canvas.occupancy_grid(), expected()))
+        self.block.location = (8, 40)
+        self.assertTrue(np.array_equal(self.canvas.occupancy_grid(), expected()))
+        self.assertTrue(self.canvas.occupancy_grid()[5, 1])
+
+    def test_cells(self):
+        """ Tests conversions between locations and cells """
+        self.block.location = (42, 9)
+        self.assertEqual(self.canvas.sprite_cell(self.block), (5, 1))
+        self.assertEqual(self.canvas.cell_location(self.block, (0, 3)), (2, 25))
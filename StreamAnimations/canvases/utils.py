@@ -1 +1,218 @@
+## Builtin
+import collections
+import math
+## Third Party
+import numpy as np
 
+class SpatialHash():
+    """ A uniform grid which buckets sprites by the bounding boxes of their hitboxes.
+
+        The grid is used as a broad-phase lookup: querying it returns every sprite which has
+        a hitbox in a cell overlapped by the query bbox. Callers are still responsible for
+        checking the actual bboxes of the returned sprites.
+
+        Sprites are only rehashed when update is called: CanvasBase tracks which of its sprites have moved
+        or changed frame (see Sprite.watch) and rehashes them before it is queried (see CanvasBase.refresh_index).
+    """
+    def __init__(self, cellsize: int) -> None:
+        if cellsize < 1: raise ValueError("cellsize must be a positive integer")
+        self.cellsize = cellsize
+        ## Cell coordinate => {sprite: None} (dicts are used as insertion-ordered sets)
+        self.cells = dict()
+        ## Sprite => list of cells the sprite is currently hashed into
+        self.spritecells = dict()
+
+    def __contains__(self, sprite)-> bool:
+        return sprite in self.spritecells
+
+    def cells_for_bbox(self, bbox)-> list:
+        """ Returns all cell coordinates overlapped by the given bbox """
+        x0, y0, x1, y1 = bbox
+        ## bboxes are exclusive of their right and bottom edges
+        cx0, cy0 = math.floor(x0 / self.cellsize), math.floor(y0 / self.cellsize)
+        cx1, cy1 = math.floor((max(x0, x1-1)) / self.cellsize), math.floor(max(y0, y1-1) / self.cellsize)
+        return [(cx, cy) for cx in range(cx0, cx1+1) for cy in range(cy0, cy1+1)]
+
+    def cells_for_sprite(self, sprite)-> list:
+        """ Returns all cell coordinates overlapped by the sprite's hitboxes """
+        if not sprite.hitboxes or sprite.location is None: return []
+        cells = dict()
+        for hitbox in sprite.hitboxes:
+            for cell in self.cells_for_bbox(hitbox.bbox):
+                cells[cell] = None
+        return list(cells)
+
+    def update(self, sprite)-> None:
+        """ Adds the sprite to the grid or rehashes it based on its current location """
+        newcells = self.cells_for_sprite(sprite)
+        oldcells = self.spritecells.get(sprite, [])
+        if newcells == oldcells and sprite in self.spritecells: return
+        self.remove(sprite)
+        for cell in newcells:
+            self.cells.setdefault(cell, dict())[sprite] = None
+        self.spritecells[sprite] = newcells
+
+    def remove(self, sprite)-> None:
+        """ Removes the sprite from the grid """
+        for cell in self.spritecells.pop(sprite, []):
+            bucket = self.cells[cell]
+            del bucket[sprite]
+            if not bucket: del self.cells[cell]
+
+    def query(self, bbox)-> list:
+        """ Returns all sprites hashed into cells overlapped by the bbox """
+        output = dict()
+        for cell in self.cells_for_bbox(bbox):
+            for sprite in self.cells.get(cell, ()):
+                output[sprite] = None
+        return list(output)
+
+    def query_sprite(self, sprite)-> list:
+        """ Returns all other sprites hashed into the cells overlapped by the given sprite's hitboxes at its current location """
+        output = dict()
+        for cell in self.cells_for_sprite(sprite):
+            for other in self.cells.get(cell, ()):
+                if other is not sprite: output[other] = None
+        return list(output)
+
+def hitbox_pixels(sprite)-> tuple:
+    """ Returns the (x, y) canvas coordinates of every set pixel of the sprite's hitboxes as two arrays """
+    if not sprite.hitboxes or sprite.location is None:
+        return np.zeros(0, dtype = np.intp), np.zeros(0, dtype = np.intp)
+    xs, ys = [], []
+    for hitbox in sprite.hitboxes:
+        x0, y0 = hitbox.bbox[:2]
+        mask = hitbox.bitmask
+        hy, hx = np.nonzero(mask.region(0, 0, mask.width, mask.height))
+        xs.append(hx + x0)
+        ys.append(hy + y0)
+    return np.concatenate(xs), np.concatenate(ys)
+
+def hitbox_cells(sprite, cellsize: int, shape: tuple)-> np.ndarray:
+    """ Returns the (sorted, unique) flat ids of the cells of a grid covered by any set pixel of the sprite's hitboxes.
+
+        shape is the (rows, columns) of the grid, each cell being cellsize x cellsize pixels.
+        A cell's flat id is row * columns + column; cells outside of the grid are ignored.
+    """
+    rows, columns = shape
+    xs, ys = hitbox_pixels(sprite)
+    cx, cy = xs // cellsize, ys // cellsize
+    inside = (cx >= 0) & (cx < columns) & (cy >= 0) & (cy < rows)
+    return np.unique(cy[inside] * columns + cx[inside]).astype(np.intp)
+
+def hitbox_footprint(sprite, cellsize: int)-> np.ndarray:
+    """ Returns the (dx, dy) offsets (as an (n, 2) array) of the cells covered by the sprite's hitboxes
+        relative to the cell containing the sprite's location.
+
+        The footprint is the same at any location reached by moving the sprite in multiples of cellsize.
+    """
+    xs, ys = hitbox_pixels(sprite)
+    if not len(xs): return np.zeros((0, 2), dtype = np.intp)
+    x, y = sprite.location[:2]
+    offsets = np.stack([xs // cellsize - x // cellsize, ys // cellsize - y // cellsize], axis = 1)
+    return np.unique(offsets, axis = 0)
+
+def inflate_grid(grid: np.ndarray, footprint: np.ndarray, outside: bool = True)-> np.ndarray:
+    """ Returns the Minkowski sum of the blocked cells of grid and the (reflected) footprint.
+
+        A cell of the returned grid is True if a sprite with the given footprint (see hitbox_footprint)
+        located in that cell would overlap a blocked cell. If outside is True, footprints which extend
+        past the edge of the grid are also considered blocked.
+    """
+    rows, columns = grid.shape
+    output = np.zeros_like(grid, dtype = bool)
+    for (dx, dy) in np.asarray(footprint).reshape(-1, 2).tolist():
+        ## output[y, x] |= grid[y + dy, x + dx] wherever (x + dx, y + dy) is on the grid
+        sy0, sy1, sx0, sx1 = max(0, dy), min(rows, rows + dy), max(0, dx), min(columns, columns + dx)
+        if sy0 < sy1 and sx0 < sx1:
+            output[sy0-dy:sy1-dy, sx0-dx:sx1-dx] |= grid[sy0:sy1, sx0:sx1]
+        if outside:
+            ## Cells from which the footprint leaves the grid
+            if dy > 0: output[max(0, rows-dy):] = True
+            if dy < 0: output[:min(rows, -dy)] = True
+            if dx > 0: output[:, max(0, columns-dx):] = True
+            if dx < 0: output[:, :min(columns, -dx)] = True
+    return output
+
+class OccupancyGrid():
+    """ Tracks the cells of a canvas (at cellsize resolution) covered by its sprites' hitboxes.
+
+        Each cell stores the number of sprites covering it, so sprites can be added, moved, and removed
+        incrementally and excluded from the grid (e.g.- the sprite which is pathfinding) without
+        rasterizing every sprite again.
+
+        version is incremented whenever a sprite's cells change, and the cells which changed are kept
+        (see changed_since) so that cached routes can be invalidated selectively.
+        Like SpatialHash, sprites are only re-rasterized when update is called.
+    """
+    ## Number of versions whose changed cells are kept
+    HISTORY = 1024
+
+    def __init__(self, size: tuple, cellsize: int) -> None:
+        if cellsize < 1: raise ValueError("cellsize must be a positive integer")
+        self.cellsize = cellsize
+        self.shape = (math.ceil(size[1] / cellsize), math.ceil(size[0] / cellsize))
+        self.counts = np.zeros(self.shape, dtype = np.int32)
+        ## Sprite => flat ids of the cells the sprite currently covers
+        self.spritecells = dict()
+        self.version = 0
+        ## (version, flat ids of the cells which changed in that version)
+        self.history = collections.deque(maxlen = self.HISTORY)
+
+    def __contains__(self, sprite)-> bool:
+        return sprite in self.spritecells
+
+    def _set_cells(self, sprite, cells: np.ndarray)-> None:
+        oldcells = self.spritecells.get(sprite)
+        if oldcells is None: oldcells = np.zeros(0, dtype = np.intp)
+        if np.array_equal(oldcells, cells): return
+        flat = self.counts.ravel()
+        flat[oldcells] -= 1
+        flat[cells] += 1
+        self.version += 1
+        self.history.append((self.version, np.setxor1d(oldcells, cells)))
+
+    def update(self, sprite)-> None:
+        """ Adds the sprite to the grid or re-rasterizes it based on its current location """
+        cells = hitbox_cells(sprite, self.cellsize, self.shape)
+        self._set_cells(sprite, cells)
+        self.spritecells[sprite] = cells
+
+    def remove(self, sprite)-> None:
+        """ Removes the sprite from the grid """
+        if sprite not in self.spritecells: return
+        self._set_cells(sprite, np.zeros(0, dtype = np.intp))
+        del self.spritecells[sprite]
+
+    def grid(self, exclude = None)-> np.ndarray:
+        """ Returns a boolean grid (indexed [y, x]) of the cells covered by any sprite other than those in exclude """
+        if not exclude: return self.counts > 0
+        counts = self.counts.copy()
+        flat = counts.ravel()
+        for sprite in exclude:
+            cells = self.spritecells.get(sprite)
+            if cells is not None: flat[cells] -= 1
+        return counts > 0
+
+    def changed_since(self, version: int)-> np.ndarray:
+        """ Returns the flat ids of all cells which changed after the given version.
+
+            Returns None if the changes are no longer available (in which case everything should be assumed to have changed).
+        """
+        if version >= self.version: return np.zeros(0, dtype = np.intp)
+        if not self.history or self.history[0][0] > version + 1: return None
+        return np.unique(np.concatenate([cells for (v, cells) in self.history if v > version]))
+
+def occupancy_grid(sprites, size: tuple, cellsize: int = 1, exclude = None)-> np.ndarray:
+    """ Rasterizes the hitboxes of the given sprites into a boolean grid (indexed [y, x]) for a canvas of the given size.
+
+        Each cell is cellsize x cellsize pixels and is True if any set pixel of a hitbox falls within it.
+        Sprites in exclude (e.g.- the sprite which is pathfinding) are not included.
+    """
+    exclude = exclude or ()
+    shape = (math.ceil(size[1] / cellsize), math.ceil(size[0] / cellsize))
+    grid = np.zeros(shape, dtype = bool)
+    for sprite in sprites:
+        if sprite in exclude: continue
+        grid.ravel()[hitbox_cells(sprite, cellsize, shape)] = True
+    return grid
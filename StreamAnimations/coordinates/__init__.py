@@ -90,4 +90,5 @@ def mixeddirection(coordinatesystem: CoordinateSystem):
     coordinatesystem._DIRECTIONS = []
     for i in range(len(coordinatesystem._AXES)+1):
         coordinatesystem._DIRECTIONS.extend(itertools.combinations(coordinatesystem._AXES, i))
+    return coordinatesystem
     
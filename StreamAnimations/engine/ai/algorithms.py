@@ -1,6 +1,12 @@
+## This Module
+from StreamAnimations.engine.ai.heuristics import distances
+## Builtin
 import collections
+import functools
 import heapq
 import math
+## Third Party
+import numpy as np
 
 def astar(start: tuple, target: tuple, adjacent: "function", heuristic: "function") -> list:
     Node = collections.namedtuple("Node", ("cost", "heuristiccost", "coord", "previous"))
@@ -46,4 +52,156 @@ def astar(start: tuple, target: tuple, adjacent: "function", heuristic: "functio
             route.append(currentnode.coord)
         return reversed(route)
 
-    return None
\ No newline at end of file
+    return None
+
+## (dx, dy, cost) of the moves available to astar_grid
+ORTHOGONALMOVES = [(1, 0, 1), (0, 1, 1), (-1, 0, 1), (0, -1, 1)]
+DIAGONALMOVES = [(1, 1, math.sqrt(2)), (-1, 1, math.sqrt(2)), (-1, -1, math.sqrt(2)), (1, -1, math.sqrt(2))]
+
+def _node_distance(width: int, diagonal: bool)-> "function":
+    """ Returns distances.octile (or distances.manhattan) computed directly on the flat node ids of a grid of the given width """
+    if diagonal:
+        diagonalcost = distances.DIAGONALCOST
+        def distance(a, b):
+            ay, ax = divmod(a, width)
+            by, bx = divmod(b, width)
+            dx, dy = abs(ax - bx), abs(ay - by)
+            return dy + diagonalcost * dx if dx < dy else dx + diagonalcost * dy
+    else:
+        def distance(a, b):
+            ay, ax = divmod(a, width)
+            by, bx = divmod(b, width)
+            return abs(ax - bx) + abs(ay - by)
+    return distance
+
+class GridGraph():
+    """ A 2d occupancy grid prepared for repeated searches (see astar_grid).
+
+        grid is a boolean array indexed [y, x] in which True cells are blocked. If diagonal is True, diagonal
+        moves (which cost sqrt(2)) are allowed as long as they do not cut the corner of a blocked cell.
+
+        Nodes are flat ids into the grid padded with a blocked border (so neighbors never need to be bounds-checked),
+        with costs and parents stored in flat arrays so that no per-node objects are created.
+        Only the destination of a move needs to be passable, so searches can start from a blocked cell.
+    """
+    def __init__(self, grid: "np.ndarray", diagonal: bool = False) -> None:
+        rows, columns = grid.shape
+        self.shape = grid.shape
+        self.diagonal = diagonal
+        self.width = columns + 2
+        padded = np.ones((rows + 2, self.width), dtype = bool)
+        padded[1:-1, 1:-1] = grid
+        self.blocked = padded.ravel().tolist()
+        ## (flat offset to neighbor, move cost, flat offsets of the cells whose corners a diagonal move clips)
+        self.moves = [(dy*self.width + dx, movecost, (dx, dy*self.width) if dx and dy else ()) for (dx, dy, movecost) in
+                      (ORTHOGONALMOVES + DIAGONALMOVES if diagonal else ORTHOGONALMOVES)]
+        ## distance(a, b): the default heuristic between two node ids
+        self.distance = _node_distance(self.width, diagonal)
+
+    def node(self, cell: tuple)-> int:
+        """ Returns the node id of an (x, y) cell, raising a ValueError if it is outside of the grid """
+        x, y = cell
+        if not (0 <= x < self.shape[1] and 0 <= y < self.shape[0]):
+            raise ValueError(f"Cell {(x, y)} is outside of the grid")
+        return (y + 1)*self.width + x + 1
+
+    def cell(self, node: int)-> tuple:
+        return node % self.width - 1, node // self.width - 1
+
+    def astar(self, start: tuple, target: tuple, heuristic: "function" = None)-> list:
+        """ Returns the list of (x, y) cells from start to target (inclusive), or None if the target cannot be reached.
+
+            heuristic is called as heuristic(cell, target): it defaults to distances.manhattan
+            (or distances.octile for diagonal grids).
+        """
+        width, blocked, moves = self.width, self.blocked, self.moves
+        startid, targetid = self.node(start), self.node(target)
+        if blocked[targetid]: return None
+
+        if heuristic is None:
+            ## Only the nodes the search reaches are scored
+            estimate = functools.partial(self.distance, targetid)
+        else:
+            def estimate(node):
+                return heuristic((node % width - 1, node // width - 1), target)
+
+        cost = [math.inf] * len(blocked)
+        parent = [-1] * len(blocked)
+        closed = [False] * len(blocked)
+        cost[startid] = 0
+        ## (estimated total cost, estimated remaining cost, node): ties prefer nodes closer to the target
+        h = estimate(startid)
+        heap = [(h, h, startid)]
+        heappush, heappop = heapq.heappush, heapq.heappop
+        while heap:
+            f, h, node = heappop(heap)
+            if node == targetid: break
+            ## Stale entry for a node which was already expanded at a lower cost
+            if closed[node]: continue
+            closed[node] = True
+            nodecost = cost[node]
+            for (offset, movecost, corners) in moves:
+                neighbor = node + offset
+                if blocked[neighbor] or closed[neighbor]: continue
+                ## Diagonal moves cannot squeeze between two blocked cells or clip a corner
+                if corners and (blocked[node + corners[0]] or blocked[node + corners[1]]): continue
+                newcost = nodecost + movecost
+                if newcost < cost[neighbor]:
+                    cost[neighbor] = newcost
+                    parent[neighbor] = node
+                    h = estimate(neighbor)
+                    heappush(heap, (newcost + h, h, neighbor))
+        else:
+            return None
+
+        route = [targetid]
+        while route[-1] != startid:
+            route.append(parent[route[-1]])
+        return [self.cell(node) for node in reversed(route)]
+
+    def dijkstra(self, goals: list)-> tuple:
+        """ Computes the cost of the cheapest route from every cell to the nearest of the goals.
+
+            Returns (cost, next) as flat lists indexed by node: cost is math.inf for cells which cannot reach a goal,
+            and next is the node to move to from each cell (-1 for goals and unreachable cells).
+        """
+        width, blocked, moves = self.width, self.blocked, self.moves
+        cost = [math.inf] * len(blocked)
+        following = [-1] * len(blocked)
+        heap = []
+        for goal in goals:
+            node = self.node(goal)
+            if blocked[node]: continue
+            cost[node] = 0
+            heap.append((0, node))
+        heapq.heapify(heap)
+        heappush, heappop = heapq.heappush, heapq.heappop
+        while heap:
+            nodecost, node = heappop(heap)
+            if nodecost > cost[node]: continue
+            ## Blocked cells can be left but not entered, so no route passes through them
+            if blocked[node]: continue
+            ## Search backward: each neighbor can move to node using the reverse of move
+            for (offset, movecost, corners) in moves:
+                neighbor = node - offset
+                if corners and (blocked[neighbor + corners[0]] or blocked[neighbor + corners[1]]): continue
+                newcost = nodecost + movecost
+                if newcost < cost[neighbor]:
+                    cost[neighbor] = newcost
+                    following[neighbor] = node
+                    heappush(heap, (newcost, neighbor))
+        return cost, following
+
+def astar_grid(grid: "np.ndarray", start: tuple, target: tuple, diagonal: bool = False, heuristic: "function" = None)-> list:
+    """ A* specialized for a 2d occupancy grid (e.g.- canvases.utils.occupancy_grid).
+
+        grid is a boolean array indexed [y, x] in which True cells are blocked.
+        start and target are (x, y) cells. If diagonal is True, diagonal moves (which cost sqrt(2))
+        are allowed as long as they do not cut the corner of a blocked cell.
+        heuristic is called as heuristic(cell, target): it defaults to distances.manhattan
+        (or distances.octile if diagonal is True).
+
+        Returns the list of (x, y) cells from start to target (inclusive), or None if the target cannot be reached.
+        To run several searches on the same grid, use GridGraph.astar.
+    """
+    return GridGraph(grid, diagonal).astar(start, target, heuristic)
@@ -0,0 +1,176 @@
+## This Module
+from StreamAnimations.engine.ai.algorithms import GridGraph
+## Builtin
+import concurrent.futures
+import math
+import os
+from multiprocessing import shared_memory
+## Third Party
+import numpy as np
+
+class SharedGrid():
+    """ A copy of an occupancy grid in shared memory, so that worker processes can attach to it by name
+        instead of receiving a pickled copy.
+
+        The shared memory is released by close (or when used as a context manager).
+    """
+    def __init__(self, grid: np.ndarray) -> None:
+        grid = np.asarray(grid, dtype = bool)
+        self.shape = grid.shape
+        self._memory = shared_memory.SharedMemory(create = True, size = max(1, grid.nbytes))
+        self.name = self._memory.name
+        self.array = np.ndarray(self.shape, dtype = bool, buffer = self._memory.buf)
+        self.array[...] = grid
+
+    @staticmethod
+    def read(name: str, shape: tuple)-> np.ndarray:
+        """ Returns a copy of the grid stored in the shared memory with the given name """
+        memory = shared_memory.SharedMemory(name = name)
+        try:
+            return np.ndarray(shape, dtype = bool, buffer = memory.buf).copy()
+        finally:
+            memory.close()
+
+    def close(self)-> None:
+        if self._memory is None: return
+        ## The array has to be released before the memory can be closed
+        self.array = None
+        self._memory.close()
+        self._memory.unlink()
+        self._memory = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class FlowField():
+    """ The cheapest route from every cell of a grid to the nearest of a set of goals.
+
+        A single (multi-source) Dijkstra search is shared by every agent heading to the same goal(s):
+        an agent follows the field by repeatedly moving to next_cell (or by the offset returned by direction).
+        Moves and costs are the same as GridGraph.
+
+        cost - array (indexed [y, x]) of the cost from each cell to the nearest goal (math.inf if no goal can be reached)
+        next - array (indexed [y, x]) of the flat id (y * width + x) of the cell to move to from each cell (-1 at goals and unreachable cells)
+    """
+    def __init__(self, grid: np.ndarray, goals: list, diagonal: bool = False) -> None:
+        graph = GridGraph(grid, diagonal)
+        rows, columns = grid.shape
+        self.goals = [tuple(goal) for goal in goals]
+        self.diagonal = diagonal
+        cost, following = graph.dijkstra(self.goals)
+        self.cost = np.array(cost).reshape(rows + 2, graph.width)[1:-1, 1:-1]
+        ## Convert node ids of the padded grid to flat ids of the grid
+        following = np.array(following).reshape(rows + 2, graph.width)[1:-1, 1:-1]
+        ny, nx = np.divmod(following, graph.width)
+        self.next = np.where(following >= 0, (ny - 1)*columns + nx - 1, -1)
+
+    @property
+    def shape(self)-> tuple:
+        return self.cost.shape
+
+    def reachable(self, cell: tuple)-> bool:
+        return not math.isinf(self.cost[cell[1], cell[0]])
+
+    def next_cell(self, cell: tuple)-> tuple:
+        """ Returns the (x, y) cell to move to from cell, or None if cell is a goal or cannot reach one """
+        following = int(self.next[cell[1], cell[0]])
+        if following < 0: return None
+        return following % self.shape[1], following // self.shape[1]
+
+    def direction(self, cell: tuple)-> tuple:
+        """ Returns the (dx, dy) offset to move by from cell (e.g.- for CanvasBase.move_sprite), or None """
+        following = self.next_cell(cell)
+        if following is None: return None
+        return following[0] - cell[0], following[1] - cell[1]
+
+    def directions(self, cells: np.ndarray)-> np.ndarray:
+        """ Returns the (dx, dy) offset for each of an (n, 2) array of (x, y) cells ((0, 0) for goals and unreachable cells) """
+        cells = np.asarray(cells).reshape(-1, 2)
+        following = self.next[cells[:, 1], cells[:, 0]]
+        fy, fx = np.divmod(following, self.shape[1])
+        offsets = np.stack([fx - cells[:, 0], fy - cells[:, 1]], axis = 1)
+        offsets[following < 0] = 0
+        return offsets
+
+    def path(self, start: tuple)-> list:
+        """ Returns the list of (x, y) cells from start to the nearest goal (inclusive), or None if no goal can be reached """
+        start = tuple(start)
+        if not self.reachable(start): return None
+        route = [start]
+        while (following := self.next_cell(route[-1])) is not None:
+            route.append(following)
+        return route
+
+## GridGraph for the current worker process (see _init_worker)
+_WORKERGRAPH = None
+
+def _init_worker(name: str, shape: tuple, diagonal: bool)-> None:
+    """ Process pool initializer: the grid is read once per worker from shared memory """
+    global _WORKERGRAPH
+    _WORKERGRAPH = GridGraph(SharedGrid.read(name, shape), diagonal)
+
+def _astar(graph: GridGraph, pair: tuple)-> list:
+    return graph.astar(*pair)
+
+def _flowfield(graph: GridGraph, task: tuple)-> list:
+    """ Routes each start of task (goal, starts) to the goal using a single search from the goal """
+    goal, starts = task
+    cost, following = graph.dijkstra([goal,])
+    output = []
+    for start in starts:
+        node = graph.node(start)
+        if math.isinf(cost[node]):
+            output.append(None)
+            continue
+        route = [node]
+        while following[route[-1]] >= 0:
+            route.append(following[route[-1]])
+        output.append([graph.cell(node) for node in route])
+    return output
+
+def _astar_in_worker(pair: tuple)-> list:
+    return _astar(_WORKERGRAPH, pair)
+
+def _flowfield_in_worker(task: tuple)-> list:
+    return _flowfield(_WORKERGRAPH, task)
+
+def solve_batch(grid: np.ndarray, pairs: list, workers: int = None, diagonal: bool = False, mode: str = "astar", chunksize: int = None)-> list:
+    """ Finds a route for each (start, goal) pair of cells on the same grid, returning a list of routes
+        (lists of (x, y) cells, or None) in the same order as pairs.
+
+        Pairs are solved across a pool of worker processes (os.cpu_count() if workers is None) which read the grid
+        from shared memory. If workers is 1, pairs are solved in this process.
+        mode can be "astar" (each pair is searched separately) or "flowfield" (pairs are grouped by goal, and
+        a single Dijkstra search from each goal is shared by all of its starts).
+    """
+    if mode not in ("astar", "flowfield"):
+        raise ValueError(f"Invalid mode: {mode}")
+    pairs = [(tuple(start), tuple(goal)) for (start, goal) in pairs]
+    if mode == "astar":
+        tasks = pairs
+    else:
+        groups = dict()
+        for i, (start, goal) in enumerate(pairs):
+            groups.setdefault(goal, []).append(i)
+        tasks = [(goal, [pairs[i][0] for i in indices]) for goal, indices in groups.items()]
+
+    if workers is None: workers = os.cpu_count() or 1
+    if workers <= 1 or len(tasks) <= 1:
+        graph = GridGraph(np.asarray(grid, dtype = bool), diagonal)
+        function = _astar if mode == "astar" else _flowfield
+        results = [function(graph, task) for task in tasks]
+    else:
+        function = _astar_in_worker if mode == "astar" else _flowfield_in_worker
+        with SharedGrid(grid) as shared:
+            with concurrent.futures.ProcessPoolExecutor(max_workers = workers, initializer = _init_worker, initargs = (shared.name, shared.shape, diagonal)) as pool:
+                results = list(pool.map(function, tasks, chunksize = chunksize or max(1, len(tasks) // (workers * 4))))
+
+    if mode == "astar": return results
+    output = [None] * len(pairs)
+    for (goal, indices), routes in zip(groups.items(), results):
+        for i, route in zip(indices, routes):
+            output[i] = route
+    return output
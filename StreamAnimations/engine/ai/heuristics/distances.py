@@ -1,9 +1,68 @@
+## Builtin
 import math
+## Third Party
+import numpy as np
 
-def squaredistance(pointa,pointb):
-    """ Returns the sum of the absolute difference across all axes between two points """
+## Extra cost of a diagonal step over a single orthogonal step
+DIAGONALCOST = math.sqrt(2) - 1
+
+def manhattan(pointa, pointb):
+    """ Returns the sum of the absolute difference across all axes between two points (for orthogonal moves) """
     return sum(abs(a-b) for a,b in zip(pointa,pointb))
 
+def squaredistance(pointa,pointb):
+    """ Returns the sum of the absolute difference across all axes between two points (see manhattan) """
+    return manhattan(pointa, pointb)
+
+def euclidean(pointa, pointb):
+    """ Returns the straight-line distance between two points """
+    return math.sqrt(sum((a-b)**2 for a,b in zip(pointa,pointb)))
+
 def lineardistance(pointa,pointb):
-    """ Returns the cartesian distance betwen two points """
-    return (abs(pointa[0] - pointb[0])**2 + abs(pointa[1] - pointb[1])**2)**.05
\ No newline at end of file
+    """ Returns the cartesian distance betwen two points (see euclidean) """
+    return (abs(pointa[0] - pointb[0])**2 + abs(pointa[1] - pointb[1])**2)**.5
+
+def chebyshev(pointa, pointb):
+    """ Returns the largest absolute difference on any axis between two points (for diagonal moves which cost the same as orthogonal moves) """
+    return max(abs(a-b) for a,b in zip(pointa,pointb))
+
+def octile(pointa, pointb):
+    """ Returns the distance between two 2d points when diagonal moves cost sqrt(2) """
+    dx, dy = abs(pointa[0] - pointb[0]), abs(pointa[1] - pointb[1])
+    return max(dx, dy) + DIAGONALCOST * min(dx, dy)
+
+## Batch forms: points is an array of shape (..., axes) which is scored against a single goal point.
+## The result has the shape of points without its last axis.
+
+def _deltas(points, goal)-> np.ndarray:
+    points = np.asarray(points)
+    return np.abs(points - np.asarray(goal, dtype = points.dtype if points.dtype.kind == "f" else np.int64))
+
+def manhattan_batch(points, goal)-> np.ndarray:
+    return _deltas(points, goal).sum(axis = -1)
+
+def euclidean_batch(points, goal)-> np.ndarray:
+    return np.sqrt((_deltas(points, goal).astype(float)**2).sum(axis = -1))
+
+def chebyshev_batch(points, goal)-> np.ndarray:
+    return _deltas(points, goal).max(axis = -1)
+
+def octile_batch(points, goal)-> np.ndarray:
+    deltas = _deltas(points, goal)
+    dx, dy = deltas[..., 0], deltas[..., 1]
+    return np.maximum(dx, dy) + DIAGONALCOST * np.minimum(dx, dy)
+
+## Heuristic => its batch form
+BATCH = {manhattan: manhattan_batch, squaredistance: manhattan_batch, euclidean: euclidean_batch, lineardistance: euclidean_batch,
+         chebyshev: chebyshev_batch, octile: octile_batch}
+
+def heuristic_for(coordinatesystem: "coordinates.CoordinateSystem", batch: bool = False)-> "function":
+    """ Returns the admissible heuristic for a grid using the coordinate system's moves.
+
+        Coordinate systems with mixed (diagonal) directions, such as TwoDimensional_8Way, use octile
+        (matching diagonal moves which cost sqrt(2)); others, such as TwoDimensional_4Way, use manhattan.
+        If batch is True, the batch form of the heuristic is returned.
+    """
+    diagonal = any(len(direction) > 1 for direction in coordinatesystem.directions())
+    heuristic = octile if diagonal else manhattan
+    return BATCH[heuristic] if batch else heuristic
@@ -0,0 +1,347 @@
+## This Module
+from StreamAnimations.engine.ai.algorithms import GridGraph, astar_grid
+from StreamAnimations.canvases.utils import hitbox_footprint
+## Builtin
+import collections
+import heapq
+import math
+## Third Party
+import numpy as np
+
+## Tolerance used when comparing DStarLite keys: diagonal costs are sums of floats, so the same
+## cost reached along different routes can differ in its last bits
+EPSILON = 1e-9
+
+def _key_before(a: tuple, b: tuple)-> bool:
+    """ Returns whether key a sorts before or level with key b (within EPSILON) """
+    if a[0] < b[0] - EPSILON: return True
+    if a[0] > b[0] + EPSILON: return False
+    return a[1] <= b[1] + EPSILON
+
+def _key_less(a: tuple, b: tuple)-> bool:
+    """ Returns whether key a sorts strictly before key b (beyond EPSILON) """
+    return not _key_before(b, a)
+
+class AgentGrid():
+    """ A sprite's passability grid (see CanvasBase.passability_grid) which is kept up to date incrementally.
+
+        update only re-evaluates the cells whose value depends on a cell of the canvas' OccupancyGrid which
+        changed since the last update, so its cost scales with the size of the change rather than the canvas.
+
+        The sprite's footprint is taken when the AgentGrid is created: if the sprite's hitboxes change shape
+        (e.g.- a MaskedHitbox on an animated sprite), rebuild should be called.
+    """
+    def __init__(self, canvas: "CanvasBase", sprite: "Sprite", outside: bool = True) -> None:
+        self.canvas = canvas
+        self.sprite = sprite
+        self.outside = outside
+        self.occupancy = canvas.get_occupancy()
+        self.rebuild()
+
+    def rebuild(self)-> None:
+        """ Rebuilds the whole grid """
+        self.footprint = hitbox_footprint(self.sprite, self.canvas.steplength)
+        self.grid = self.canvas.passability_grid(self.sprite, outside = self.outside)
+        self.version = self.occupancy.version
+
+    def evaluate(self, cells: np.ndarray)-> np.ndarray:
+        """ Returns whether each of the given (flat) cells is impassable for the sprite, based on the current OccupancyGrid """
+        rows, columns = self.grid.shape
+        counts = self.occupancy.counts.ravel()
+        owncells = self.occupancy.spritecells.get(self.sprite, np.zeros(0, dtype = np.intp))
+        y, x = np.divmod(cells, columns)
+        output = np.zeros(len(cells), dtype = bool)
+        for (dx, dy) in self.footprint.tolist():
+            nx, ny = x + dx, y + dy
+            inside = (nx >= 0) & (nx < columns) & (ny >= 0) & (ny < rows)
+            neighbors = ny[inside]*columns + nx[inside]
+            ## The sprite does not block itself
+            output[inside] |= (counts[neighbors] - np.isin(neighbors, owncells)) > 0
+            if self.outside: output[~inside] = True
+        return output
+
+    def update(self)-> np.ndarray:
+        """ Brings the grid up to date with the OccupancyGrid.
+
+            Returns the flat ids of the cells whose passability changed, or None if the whole grid was rebuilt.
+        """
+        ## Re-rasterizes any sprites which changed outside of the canvas
+        self.canvas.get_occupancy()
+        changed = self.occupancy.changed_since(self.version)
+        if changed is None:
+            self.rebuild()
+            return None
+        self.version = self.occupancy.version
+        if not len(changed): return changed
+        rows, columns = self.grid.shape
+        ## A cell depends on every occupancy cell its footprint covers
+        cy, cx = np.divmod(changed, columns)
+        ax = (cx[:, None] - self.footprint[None, :, 0]).ravel()
+        ay = (cy[:, None] - self.footprint[None, :, 1]).ravel()
+        inside = (ax >= 0) & (ax < columns) & (ay >= 0) & (ay < rows)
+        cells = np.unique(ay[inside]*columns + ax[inside])
+        values = self.evaluate(cells)
+        flat = self.grid.ravel()
+        flipped = cells[flat[cells] != values]
+        flat[flipped] = values[flat[cells] != values]
+        return flipped
+
+class DStarLite():
+    """ Incremental shortest paths on a boolean occupancy grid (indexed [y, x], True being blocked) toward a fixed goal.
+
+        The search runs backward from the goal, so when the agent moves (move_start) or cells change (update_cells)
+        only the affected part of the previous search is repaired instead of searching again from scratch.
+        Moves and costs are the same as algorithms.GridGraph.
+
+        Based on the optimized D* Lite of Koenig & Likhachev (2002). Keys are compared within EPSILON, and queued
+        nodes whose key ties the start's are expanded as well, so rounding in diagonal costs cannot end a repair early.
+    """
+    def __init__(self, grid: np.ndarray, start: tuple, goal: tuple, diagonal: bool = False) -> None:
+        self.graph = GridGraph(grid, diagonal)
+        self.shape = grid.shape
+        self.diagonal = diagonal
+        self.width, self.blocked, self.moves = self.graph.width, self.graph.blocked, self.graph.moves
+        padding = np.ones((self.shape[0] + 2, self.width), dtype = bool)
+        padding[1:-1, 1:-1] = False
+        self.padding = padding.ravel().tolist()
+        ## heuristic(a, b): distances.octile (or distances.manhattan) computed directly on node ids
+        self.heuristic = self.graph.distance
+
+        self.start = self.node(start)
+        self.goal = self.node(goal)
+        ## Priority queue with lazy deletion: self.keys holds the current key of each queued node (see reset)
+        self.heap = []
+        self.keys = dict()
+        ## Number of nodes expanded by compute (over the lifetime of the planner)
+        self.expanded = 0
+
+        self.reset()
+
+    def reset(self)-> None:
+        """ Discards the previous search and searches again from scratch """
+        size = len(self.blocked)
+        self.g = [math.inf] * size
+        self.rhs = [math.inf] * size
+        self.km = 0
+        self.last = self.start
+        self.heap = []
+        self.keys = dict()
+        self.rhs[self.goal] = 0
+        self._push(self.goal)
+        self.compute()
+
+    def node(self, cell: tuple)-> int:
+        return self.graph.node(cell)
+
+    def cell(self, node: int)-> tuple:
+        return self.graph.cell(node)
+
+    def cost(self, node: int, move: tuple)-> float:
+        """ Cost of moving from node using move (as stored in self.moves).
+
+            As with GridGraph, only the destination (and the corners cut by diagonal moves) need to be passable,
+            so an agent can always leave a blocked cell.
+        """
+        offset, movecost, corners = move
+        blocked = self.blocked
+        if blocked[node + offset]: return math.inf
+        if corners and (blocked[node + corners[0]] or blocked[node + corners[1]]): return math.inf
+        return movecost
+
+    def _key(self, node: int)-> tuple:
+        m = min(self.g[node], self.rhs[node])
+        return (m + self.heuristic(self.start, node) + self.km, m)
+
+    def _push(self, node: int)-> None:
+        key = self.keys[node] = self._key(node)
+        heapq.heappush(self.heap, (key, node))
+
+    def _update_vertex(self, node: int)-> None:
+        ## The border is never part of a path
+        if self.padding[node]: return
+        if node != self.goal:
+            g = self.g
+            self.rhs[node] = min(self.cost(node, move) + g[node + move[0]] for move in self.moves)
+        if self.g[node] != self.rhs[node]:
+            self._push(node)
+        else:
+            self.keys.pop(node, None)
+
+    def _top(self):
+        """ Returns the (key, node) with the lowest key, discarding stale heap entries """
+        heap = self.heap
+        while heap and self.keys.get(heap[0][1]) != heap[0][0]:
+            heapq.heappop(heap)
+        return heap[0] if heap else None
+
+    def compute(self)-> None:
+        """ Repairs the search until the start's cost is correct """
+        g, rhs, start = self.g, self.rhs, self.start
+        while (top := self._top()) is not None and (_key_before(top[0], self._key(start)) or rhs[start] != g[start]):
+            key, node = heapq.heappop(self.heap)
+            del self.keys[node]
+            self.expanded += 1
+            newkey = self._key(node)
+            if _key_less(key, newkey):
+                self._push(node)
+            elif g[node] > rhs[node]:
+                g[node] = rhs[node]
+                for move in self.moves: self._update_vertex(node + move[0])
+            else:
+                g[node] = math.inf
+                self._update_vertex(node)
+                for move in self.moves: self._update_vertex(node + move[0])
+
+    def move_start(self, start: tuple)-> None:
+        """ Sets the agent's current cell (call compute or update_cells afterwards) """
+        node = self.node(start)
+        if node == self.start: return
+        ## The keys already queued were computed from the previous start: km keeps them lower bounds
+        self.km += self.heuristic(self.last, node)
+        self.last = self.start = node
+
+    def update_cells(self, cells, grid: np.ndarray)-> None:
+        """ Updates the blocked state of the given cells (flat ids of grid, i.e.- y * width + x) from grid and repairs the search """
+        columns = self.shape[1]
+        flat = grid.ravel()
+        affected = dict()
+        for cell in np.asarray(cells).tolist():
+            node = self.node((cell % columns, cell // columns))
+            blocked = bool(flat[cell])
+            if self.blocked[node] == blocked: continue
+            self.blocked[node] = blocked
+            ## Every move into the cell (or, for diagonal moves, cutting its corner) starts from one of its neighbors
+            for move in self.moves: affected[node + move[0]] = None
+        for node in affected:
+            self._update_vertex(node)
+        self.compute()
+
+    def path(self)-> list:
+        """ Returns the list of (x, y) cells from the start to the goal (inclusive), or None if the goal cannot be reached """
+        self.compute()
+        route = self._follow()
+        if route is False:
+            ## The repaired search is inconsistent along the route: search again from scratch
+            self.reset()
+            route = self._follow()
+        return [self.cell(node) for node in route] if route else None
+
+    def _follow(self):
+        """ Follows the cheapest moves from the start to the goal.
+
+            Returns the list of nodes, None if the goal cannot be reached, or False if a node along the way is
+            inconsistent (its g differs from its rhs) or the route loops back on itself.
+        """
+        node, g, rhs = self.start, self.g, self.rhs
+        if math.isinf(rhs[node]) and node != self.goal: return None
+        route, seen = [node], {node}
+        while node != self.goal:
+            if abs(g[node] - rhs[node]) > EPSILON: return False
+            ## Follow the cheapest move toward the goal
+            cost, node = min((self.cost(node, move) + g[node + move[0]], node + move[0]) for move in self.moves)
+            if math.isinf(cost) or node in seen: return False
+            route.append(node)
+            seen.add(node)
+        return route
+
+class PathService():
+    """ Finds paths for sprites on a canvas, caching recent routes.
+
+        Routes are cached per sprite on (start cell, goal cell). Before each query, the sprite's AgentGrid is brought
+        up to date and only the cached routes which pass through a cell whose passability changed are discarded.
+        Cells that became passable do not invalidate routes, so a cached route may no longer be the shortest one.
+
+        For agents whose goal stays fixed, replan uses a DStarLite planner which is repaired incrementally.
+        Paths are returned as lists of canvas locations (see CanvasBase.cell_location).
+    """
+    def __init__(self, canvas: "CanvasBase", diagonal: bool = False, cachesize: int = 64, outside: bool = True) -> None:
+        self.canvas = canvas
+        self.diagonal = diagonal
+        self.cachesize = cachesize
+        self.outside = outside
+        ## Sprite => AgentGrid
+        self.agents = dict()
+        ## Sprite => OrderedDict of (start, goal) => (cells, set of flat cell ids)
+        self.routes = dict()
+        ## Sprite => {goal cell: DStarLite}
+        self.planners = dict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def agent(self, sprite: "Sprite")-> AgentGrid:
+        """ Returns the sprite's AgentGrid, updating it (and discarding invalidated routes) """
+        agent = self.agents.get(sprite)
+        if agent is None:
+            agent = self.agents[sprite] = AgentGrid(self.canvas, sprite, outside = self.outside)
+            return agent
+        flipped = agent.update()
+        routes = self.routes.get(sprite)
+        if flipped is None:
+            if routes: self.invalidations += len(routes)
+            self.routes.pop(sprite, None)
+            self.planners.pop(sprite, None)
+        elif len(flipped):
+            flipped = flipped.tolist()
+            if routes:
+                for key in [key for key, (cells, ids) in routes.items() if any(cell in ids for cell in flipped)]:
+                    del routes[key]
+                    self.invalidations += 1
+            planners = self.planners.get(sprite)
+            if planners:
+                ## The start is moved first so that the repair already uses the sprite's current cell
+                start = self.canvas.sprite_cell(sprite)
+                for planner in planners.values():
+                    planner.move_start(start)
+                    planner.update_cells(flipped, agent.grid)
+        return agent
+
+    def _locations(self, sprite: "Sprite", cells: list)-> list:
+        return [self.canvas.cell_location(sprite, cell) for cell in cells]
+
+    def find_path(self, sprite: "Sprite", goal: tuple)-> list:
+        """ Returns the list of locations from the sprite's location to goal (inclusive), or None if goal cannot be reached """
+        agent = self.agent(sprite)
+        start, goalcell = self.canvas.sprite_cell(sprite), self.canvas.sprite_cell(sprite, goal)
+        routes = self.routes.setdefault(sprite, collections.OrderedDict())
+        cached = routes.get((start, goalcell))
+        if cached is not None:
+            routes.move_to_end((start, goalcell))
+            self.hits += 1
+            return self._locations(sprite, cached[0])
+
+        self.misses += 1
+        cells = astar_grid(agent.grid, start, goalcell, diagonal = self.diagonal)
+        ## Unreachable goals are not cached: they could become reachable without crossing any cached cells
+        if cells is None: return None
+        columns = agent.grid.shape[1]
+        routes[(start, goalcell)] = (cells, {y*columns + x for (x, y) in cells})
+        if len(routes) > self.cachesize: routes.popitem(last = False)
+        return self._locations(sprite, cells)
+
+    def planner(self, sprite: "Sprite", goal: tuple)-> DStarLite:
+        """ Returns the (up to date) DStarLite planner for the sprite and goal, creating it if necessary """
+        agent = self.agent(sprite)
+        start, goalcell = self.canvas.sprite_cell(sprite), self.canvas.sprite_cell(sprite, goal)
+        planners = self.planners.setdefault(sprite, dict())
+        planner = planners.get(goalcell)
+        if planner is None:
+            planner = planners[goalcell] = DStarLite(agent.grid, start, goalcell, diagonal = self.diagonal)
+        else:
+            planner.move_start(start)
+        return planner
+
+    def replan(self, sprite: "Sprite", goal: tuple)-> list:
+        """ Like find_path, but uses an incremental DStarLite planner for the sprite's goal """
+        cells = self.planner(sprite, goal).path()
+        return None if cells is None else self._locations(sprite, cells)
+
+    def forget(self, sprite: "Sprite")-> None:
+        """ Discards all state kept for the sprite """
+        for store in (self.agents, self.routes, self.planners):
+            store.pop(sprite, None)
+
+    def stats(self)-> dict:
+        total = self.hits + self.misses
+        return dict(hits = self.hits, misses = self.misses, invalidations = self.invalidations,
+                    hitrate = self.hits / total if total else 0)
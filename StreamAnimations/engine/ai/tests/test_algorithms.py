@@ -4,6 +4,8 @@ from StreamAnimations.engine.ai import algorithms
 import unittest
 ## Utilities
 from StreamAnimations.engine.ai.heuristics import distances
+## Third Party
+import numpy as np
 
 class AStarTestCase(unittest.TestCase):
     def adjacents2d(self, coord):
@@ -38,4 +40,114 @@ class AStarTestCase(unittest.TestCase):
                         heuristic=distances.squaredistance
                         )),
                         result
-                )
\ No newline at end of file
+                )
+
+def parse_grid(rows: list)-> "np.ndarray":
+    """ Converts a list of strings (where "#" is a blocked cell) into an occupancy grid """
+    return np.array([[cell == "#" for cell in row] for row in rows], dtype = bool)
+
+class AStarGridTestCase(unittest.TestCase):
+    def assertValidRoute(self, grid, route, start, target, diagonal = False):
+        self.assertEqual(route[0], start)
+        self.assertEqual(route[-1], target)
+        for (x0, y0), (x1, y1) in zip(route, route[1:]):
+            self.assertFalse(grid[y1, x1])
+            self.assertLessEqual(max(abs(x1 - x0), abs(y1 - y0)), 1)
+            if not diagonal: self.assertEqual(abs(x1 - x0) + abs(y1 - y0), 1)
+
+    def test_returnstart(self):
+        """ Tests that astar_grid returns the start cell when start and target are the same """
+        grid = parse_grid(["...", "...", "..."])
+        for startend in [(0, 0), (1, 1), (2, 0)]:
+            with self.subTest(startend = startend):
+                self.assertEqual(algorithms.astar_grid(grid, startend, startend), [startend,])
+
+    def test_routes(self):
+        """ Tests that astar_grid finds the shortest route around blocked cells """
+        maze = parse_grid([
+            ".#....",
+            ".#.##.",
+            ".#..#.",
+            ".##.#.",
+            "....#.",
+        ])
+        tests = [
+            ## grid,   start,   target,  diagonal, route length (in cells)
+            (maze,      (0, 0), (0, 4),  False,    5),
+            (maze,      (0, 0), (5, 4),  False,    20),
+            ## Every diagonal shortcut in the maze would clip the corner of a blocked cell
+            (maze,      (0, 0), (5, 4),  True,     20),
+            (maze,      (2, 2), (5, 0),  False,    6),
+            (maze,      (2, 2), (5, 0),  True,     6),
+            (parse_grid(["..........",]*10), (0, 0), (9, 9), False, 19),
+            (parse_grid(["..........",]*10), (0, 0), (9, 9), True,  10),
+        ]
+        for (grid, start, target, diagonal, length) in tests:
+            with self.subTest(start = start, target = target, diagonal = diagonal, length = length):
+                route = algorithms.astar_grid(grid, start, target, diagonal = diagonal)
+                self.assertEqual(len(route), length)
+                self.assertValidRoute(grid, route, start, target, diagonal)
+
+    def test_matches_astar(self):
+        """ Tests that astar_grid finds routes as short as astar when given a heuristic """
+        grid = parse_grid([
+            "........",
+            ".######.",
+            "......#.",
+            "#####.#.",
+            "........",
+        ])
+        rows, columns = grid.shape
+        def adjacent(coord):
+            for (dx, dy) in [(1, 0), (0, 1), (-1, 0), (0, -1)]:
+                x, y = coord[0] + dx, coord[1] + dy
+                if 0 <= x < columns and 0 <= y < rows and not grid[y, x]:
+                    yield (x, y), 1
+        for target in [(0, 4), (7, 4), (0, 2), (5, 3)]:
+            with self.subTest(target = target):
+                expected = list(algorithms.astar((0, 0), target, adjacent, distances.squaredistance))
+                route = algorithms.astar_grid(grid, (0, 0), target, heuristic = distances.squaredistance)
+                self.assertEqual(len(route), len(expected))
+                self.assertValidRoute(grid, route, (0, 0), target)
+
+    def test_default_heuristic(self):
+        """ Tests that the default heuristic finds routes as short as passing distances.manhattan or distances.octile """
+        rng = np.random.default_rng(0)
+        for diagonal, heuristic in [(False, distances.manhattan), (True, distances.octile)]:
+            for trial in range(10):
+                grid = rng.random((15, 20)) < .3
+                start, target = (0, 0), (19, 14)
+                grid[0, 0] = grid[14, 19] = False
+                with self.subTest(diagonal = diagonal, trial = trial):
+                    graph = algorithms.GridGraph(grid, diagonal)
+                    route, expected = graph.astar(start, target), graph.astar(start, target, heuristic)
+                    if expected is None:
+                        self.assertIsNone(route)
+                        continue
+                    lengths = [sum(((x1 - x0)**2 + (y1 - y0)**2)**.5 for (x0, y0), (x1, y1) in zip(r, r[1:])) for r in (route, expected)]
+                    self.assertAlmostEqual(*lengths)
+                    self.assertValidRoute(grid, route, start, target, diagonal)
+
+    def test_distance(self):
+        """ Tests that GridGraph.distance on node ids matches distances.manhattan and distances.octile on cells """
+        rng = np.random.default_rng(0)
+        for diagonal, heuristic in [(False, distances.manhattan), (True, distances.octile)]:
+            graph = algorithms.GridGraph(np.zeros((7, 9), dtype = bool), diagonal)
+            for (a, b) in rng.integers(0, (9, 7), (20, 2, 2)).tolist():
+                with self.subTest(diagonal = diagonal, a = a, b = b):
+                    self.assertAlmostEqual(graph.distance(graph.node(a), graph.node(b)), heuristic(a, b))
+
+    def test_unreachable(self):
+        """ Tests that astar_grid returns None when the target is blocked or enclosed and raises an error for cells outside the grid """
+        grid = parse_grid([
+            "..#..",
+            "..#.#",
+            "..##.",
+        ])
+        self.assertIsNone(algorithms.astar_grid(grid, (0, 0), (2, 0)))
+        self.assertIsNone(algorithms.astar_grid(grid, (0, 0), (3, 0)))
+        ## (4, 2) is enclosed: it can only be reached diagonally by cutting corners
+        self.assertIsNone(algorithms.astar_grid(grid, (3, 0), (4, 2), diagonal = True))
+        for cell in [(-1, 0), (5, 0), (0, 3)]:
+            with self.subTest(cell = cell), self.assertRaises(ValueError):
+                algorithms.astar_grid(grid, (0, 0), cell)
@@ -0,0 +1,99 @@
+## Test Target
+from StreamAnimations.engine.ai import batch
+## Test Framework
+import unittest
+## Test Utilities
+from StreamAnimations.engine.ai.tests.test_algorithms import parse_grid
+from StreamAnimations.engine.ai.tests.test_pathfinding import route_length
+## This Module
+from StreamAnimations.engine.ai import algorithms
+## Builtin
+from multiprocessing import shared_memory
+## Third Party
+import numpy as np
+
+class BatchTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        rng = np.random.default_rng(0)
+        self.grid = rng.random((16, 24)) < .25
+        free = [(x, y) for y in range(16) for x in range(24) if not self.grid[y, x]]
+        indices = rng.choice(len(free), 24, replace = False)
+        ## Several starts share each goal
+        self.pairs = [(free[indices[i]], free[indices[i % 4 + 20]]) for i in range(20)]
+
+    def assertRoutesEqual(self, routes, expected):
+        self.assertEqual(len(routes), len(expected))
+        for i, (route, other) in enumerate(zip(routes, expected)):
+            with self.subTest(pair = i):
+                if other is None:
+                    self.assertIsNone(route)
+                    continue
+                self.assertEqual(route[0], other[0])
+                self.assertEqual(route[-1], other[-1])
+                self.assertAlmostEqual(route_length(route), route_length(other))
+
+    def test_solve_batch(self):
+        """ Tests that batches solved in worker processes (with either mode) match solving each pair separately """
+        for diagonal in [False, True]:
+            expected = [algorithms.astar_grid(self.grid, start, goal, diagonal = diagonal) for (start, goal) in self.pairs]
+            for mode in ["astar", "flowfield"]:
+                for workers in [1, 2]:
+                    with self.subTest(diagonal = diagonal, mode = mode, workers = workers):
+                        routes = batch.solve_batch(self.grid, self.pairs, workers = workers, diagonal = diagonal, mode = mode)
+                        self.assertRoutesEqual(routes, expected)
+
+    def test_invalid_mode(self):
+        with self.assertRaises(ValueError):
+            batch.solve_batch(self.grid, self.pairs, mode = "foobar")
+
+    def test_shared_grid(self):
+        """ Tests that the shared grid can be read by name and is released when closed """
+        with batch.SharedGrid(self.grid) as shared:
+            self.assertTrue(np.array_equal(batch.SharedGrid.read(shared.name, shared.shape), self.grid))
+        with self.assertRaises(FileNotFoundError):
+            shared_memory.SharedMemory(name = shared.name)
+
+class FlowFieldTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.grid = parse_grid([
+            ".#....",
+            ".#.##.",
+            ".#..#.",
+            ".##.#.",
+            "....#.",
+        ])
+
+    def test_cost(self):
+        """ Tests that the field's cost from each cell is the length of the shortest route to the goal """
+        for diagonal in [False, True]:
+            field = batch.FlowField(self.grid, [(5, 4),], diagonal = diagonal)
+            for y in range(5):
+                for x in range(6):
+                    with self.subTest(diagonal = diagonal, cell = (x, y)):
+                        expected = algorithms.astar_grid(self.grid, (x, y), (5, 4), diagonal = diagonal)
+                        if expected is None:
+                            self.assertFalse(field.reachable((x, y)))
+                            self.assertIsNone(field.path((x, y)))
+                            continue
+                        self.assertAlmostEqual(field.cost[y, x], route_length(expected))
+                        self.assertAlmostEqual(route_length(field.path((x, y))), route_length(expected))
+
+    def test_multiple_goals(self):
+        """ Tests that each cell is routed to its nearest goal """
+        field = batch.FlowField(self.grid, [(0, 0), (5, 4)])
+        self.assertEqual(field.path((0, 3)), [(0, 3), (0, 2), (0, 1), (0, 0)])
+        self.assertEqual(field.path((5, 2)), [(5, 2), (5, 3), (5, 4)])
+        self.assertEqual(field.cost[0, 0], 0)
+        self.assertIsNone(field.next_cell((0, 0)))
+        ## Routes can leave blocked cells (as with astar_grid) but never enter them
+        self.assertEqual(field.path((1, 0)), [(1, 0), (0, 0)])
+        following = field.next[field.next >= 0]
+        self.assertFalse(self.grid.ravel()[following].any())
+
+    def test_directions(self):
+        """ Tests that directions returns the offset to the next cell for many cells at once """
+        field = batch.FlowField(self.grid, [(5, 4),])
+        cells = np.array([(5, 3), (0, 0), (5, 4), (1, 0)])
+        expected = [field.direction(tuple(cell)) or (0, 0) for cell in cells.tolist()]
+        self.assertEqual(field.directions(cells).tolist(), [list(offset) for offset in expected])
+        self.assertEqual(field.direction((5, 3)), (0, 1))
@@ -0,0 +1,54 @@
+## Test Target
+from StreamAnimations.engine.ai.heuristics import distances
+## Test Framework
+import unittest
+## This Module
+from StreamAnimations.systems import twodimensional
+## Third Party
+import numpy as np
+
+class DistancesTestCase(unittest.TestCase):
+    def test_distances(self):
+        """ Tests each heuristic against known distances """
+        tests = [
+            ## pointa,  pointb,     manhattan,  euclidean,  chebyshev,  octile
+            ((0, 0),    (0, 0),     0,          0,          0,          0),
+            ((0, 0),    (3, 4),     7,          5,          4,          4 + 3*distances.DIAGONALCOST),
+            ((-1, 2),   (2, -2),    7,          5,          4,          4 + 3*distances.DIAGONALCOST),
+            ((5, 5),    (5, 0),     5,          5,          5,          5),
+            ((0, 0),    (2, 2),     4,          8**.5,      2,          8**.5),
+        ]
+        for (pointa, pointb, manhattan, euclidean, chebyshev, octile) in tests:
+            with self.subTest(pointa = pointa, pointb = pointb):
+                self.assertEqual(distances.manhattan(pointa, pointb), manhattan)
+                self.assertEqual(distances.squaredistance(pointa, pointb), manhattan)
+                self.assertAlmostEqual(distances.euclidean(pointa, pointb), euclidean)
+                self.assertAlmostEqual(distances.lineardistance(pointa, pointb), euclidean)
+                self.assertEqual(distances.chebyshev(pointa, pointb), chebyshev)
+                self.assertAlmostEqual(distances.octile(pointa, pointb), octile)
+
+    def test_batch(self):
+        """ Tests that the batch forms match scoring each point separately """
+        rng = np.random.default_rng(0)
+        points = rng.integers(-20, 20, (50, 2))
+        goal = (3, -7)
+        for heuristic, batch in distances.BATCH.items():
+            with self.subTest(heuristic = heuristic.__name__):
+                expected = [heuristic(tuple(point), goal) for point in points.tolist()]
+                result = batch(points, goal)
+                self.assertEqual(result.shape, (50,))
+                self.assertTrue(np.allclose(result, expected))
+                ## Arrays of any shape can be scored
+                self.assertEqual(batch(points.reshape(5, 10, 2), goal).shape, (5, 10))
+
+    def test_heuristic_for(self):
+        """ Tests that heuristics are matched to the moves of the coordinate system """
+        tests = [
+            ## coordinate system,                      heuristic,              batch
+            (twodimensional.TwoDimensional_4Way,    distances.manhattan,    distances.manhattan_batch),
+            (twodimensional.TwoDimensional_8Way,    distances.octile,       distances.octile_batch),
+        ]
+        for (system, heuristic, batch) in tests:
+            with self.subTest(system = system.__name__):
+                self.assertIs(distances.heuristic_for(system), heuristic)
+                self.assertIs(distances.heuristic_for(system, batch = True), batch)
@@ -0,0 +1,197 @@
+## Test Target
+from StreamAnimations.engine.ai import pathfinding
+## Test Framework
+import unittest
+## Test Utilities
+from StreamAnimations.tests import utils as testutils
+from StreamAnimations.engine.ai.tests.test_algorithms import parse_grid
+## This Module
+from StreamAnimations.engine.ai import algorithms
+from StreamAnimations.sprite import hitbox
+## Builtin
+import random
+## Third Party
+import numpy as np
+
+def route_length(route: list)-> float:
+    return sum(((x1 - x0)**2 + (y1 - y0)**2)**.5 for (x0, y0), (x1, y1) in zip(route, route[1:]))
+
+class DStarLiteTestCase(unittest.TestCase):
+    def test_path(self):
+        """ Tests that DStarLite finds routes as short as astar_grid """
+        grid = parse_grid([
+            ".#....",
+            ".#.##.",
+            ".#..#.",
+            ".##.#.",
+            "....#.",
+        ])
+        for diagonal in [False, True]:
+            for (start, goal) in [((0, 0), (5, 4)), ((2, 2), (5, 0)), ((3, 3), (3, 3))]:
+                with self.subTest(diagonal = diagonal, start = start, goal = goal):
+                    expected = algorithms.astar_grid(grid, start, goal, diagonal = diagonal)
+                    route = pathfinding.DStarLite(grid, start, goal, diagonal = diagonal).path()
+                    self.assertEqual(route[0], start)
+                    self.assertEqual(route[-1], goal)
+                    self.assertAlmostEqual(route_length(route), route_length(expected))
+
+    def test_replan(self):
+        """ Tests that replanning after the start moves and cells change matches searching from scratch """
+        rng = np.random.default_rng(0)
+        for diagonal in [False, True]:
+            for trial in range(10):
+                grid = rng.random((12, 16)) < .25
+                start, goal = (0, 0), (15, 11)
+                grid[0, 0] = grid[11, 15] = False
+                planner = pathfinding.DStarLite(grid, start, goal, diagonal = diagonal)
+                for step in range(5):
+                    with self.subTest(diagonal = diagonal, trial = trial, step = step):
+                        expected = algorithms.astar_grid(grid, start, goal, diagonal = diagonal)
+                        route = planner.path()
+                        if expected is None:
+                            self.assertIsNone(route)
+                        else:
+                            self.assertAlmostEqual(route_length(route), route_length(expected))
+                    if route and len(route) > 2:
+                        start = route[2]
+                        planner.move_start(start)
+                    cells = rng.integers(0, grid.size, 4)
+                    grid.ravel()[cells] = ~grid.ravel()[cells]
+                    grid[goal[1], goal[0]] = False
+                    planner.update_cells(cells, grid)
+
+    def test_replan_diagonal(self):
+        """ Tests replanning on random diagonal grids, where costs reached along different routes can differ by rounding """
+        ## Includes seeds where comparing keys exactly ended the repair too early
+        for seed in list(range(40)) + [2179, 2284, 2619, 2950]:
+            rng = random.Random(seed)
+            width, height = rng.randint(4, 12), rng.randint(4, 12)
+            grid = np.array([[rng.random() < .3 for x in range(width)] for y in range(height)])
+            start, goal = (rng.randrange(width), rng.randrange(height)), (rng.randrange(width), rng.randrange(height))
+            grid[goal[1], goal[0]] = False
+            planner = pathfinding.DStarLite(grid, start, goal, diagonal = True)
+            for step in range(6):
+                with self.subTest(seed = seed, step = step):
+                    expected = algorithms.astar_grid(grid, start, goal, diagonal = True)
+                    route = planner.path()
+                    if expected is None:
+                        self.assertIsNone(route)
+                    else:
+                        self.assertIsNotNone(route)
+                        self.assertAlmostEqual(route_length(route), route_length(expected))
+                if route and len(route) > 1 and rng.random() < .5:
+                    start = route[1]
+                    planner.move_start(start)
+                cells = [rng.randrange(grid.size) for i in range(rng.randint(1, 3))]
+                for cell in cells: grid.ravel()[cell] = not grid.ravel()[cell]
+                grid[goal[1], goal[0]] = False
+                planner.update_cells(cells, grid)
+
+    def test_move_start(self):
+        """ Tests that moving the start accumulates km before any cells are updated """
+        grid = np.zeros((10, 10), dtype = bool)
+        planner = pathfinding.DStarLite(grid, (0, 0), (9, 9), diagonal = True)
+        planner.move_start((1, 1))
+        planner.move_start((3, 1))
+        self.assertAlmostEqual(planner.km, 2**.5 + 2)
+        self.assertEqual(planner.last, planner.node((3, 1)))
+        grid[5, 5] = True
+        planner.update_cells([55,], grid)
+        self.assertAlmostEqual(planner.km, 2**.5 + 2)
+        self.assertAlmostEqual(route_length(planner.path()), route_length(algorithms.astar_grid(grid, (3, 1), (9, 9), diagonal = True)))
+
+    def test_incremental(self):
+        """ Tests that a change away from the current route does not require searching again """
+        grid = np.zeros((20, 30), dtype = bool)
+        planner = pathfinding.DStarLite(grid, (0, 10), (29, 10), diagonal = True)
+        expanded = planner.expanded
+        grid[0, 0] = True
+        planner.update_cells([0,], grid)
+        self.assertLess(planner.expanded - expanded, 5)
+        ## Blocking the route
+        grid[5:15, 15] = True
+        planner.update_cells(np.nonzero(grid.ravel())[0], grid)
+        route = planner.path()
+        self.assertTrue(all(not grid[y, x] for (x, y) in route))
+        self.assertLess(planner.expanded - expanded, grid.size)
+
+class PathServiceTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.canvas = testutils.load_canvas(size = (128, 96))
+        ## Mobile sprite with a single 8x8 (1x1 cell) hitbox
+        self.walker = testutils.load_testsprite(hitboxes = [hitbox.Hitbox(hitbox.create_rect_hitbox_image(8, 8)),])
+        self.canvas.add_sprite(self.walker, (0, 40))
+        ## A wall across the middle of the canvas with a gap at the top
+        self.wall = testutils.create_block((64, 8), (8, 88))
+        self.canvas.add_sprite(self.wall)
+        self.service = pathfinding.PathService(self.canvas)
+
+    def test_find_path(self):
+        """ Tests that routes are returned as locations and that repeated queries are cached """
+        route = self.service.find_path(self.walker, (120, 40))
+        self.assertEqual(route[0], (0, 40))
+        self.assertEqual(route[-1], (120, 40))
+        ## The route goes through the gap at the top of the wall
+        self.assertIn((64, 0), route)
+        self.assertEqual(self.service.stats()['misses'], 1)
+        self.assertEqual(self.service.find_path(self.walker, (120, 40)), route)
+        self.assertEqual(self.service.stats()['hits'], 1)
+        ## Inside the wall
+        self.assertIsNone(self.service.find_path(self.walker, (64, 40)))
+
+    def test_invalidation(self):
+        """ Tests that only routes crossing changed cells are invalidated """
+        route = self.service.find_path(self.walker, (120, 40))
+        shortroute = self.service.find_path(self.walker, (0, 88))
+
+        ## A block placed away from both routes does not invalidate them
+        block = testutils.create_block((120, 88), (8, 8))
+        self.canvas.add_sprite(block)
+        self.assertEqual(self.service.find_path(self.walker, (120, 40)), route)
+        self.assertEqual(self.service.find_path(self.walker, (0, 88)), shortroute)
+        self.assertEqual(self.service.stats()['invalidations'], 0)
+
+        ## Closing the gap invalidates the route through it
+        self.canvas.add_sprite(testutils.create_block((64, 0), (8, 8)))
+        self.assertIsNone(self.service.find_path(self.walker, (120, 40)))
+        self.assertEqual(self.service.stats()['invalidations'], 1)
+        self.assertEqual(self.service.find_path(self.walker, (0, 88)), shortroute)
+
+        ## Probing the walker's moves elsewhere (see MobileSprite.valid_moves) returns it to its location without invalidating anything
+        list(self.walker.valid_moves(self.canvas, (120, 0)))
+        self.assertEqual(self.service.find_path(self.walker, (0, 88)), shortroute)
+        self.assertEqual(self.service.stats()['invalidations'], 1)
+        ## Moving the block outside of the canvas into the short route invalidates it
+        block.location = (0, 64)
+        self.assertNotEqual(self.service.find_path(self.walker, (0, 88)), shortroute)
+        self.assertEqual(self.service.stats()['invalidations'], 2)
+
+    def test_agent_grid(self):
+        """ Tests that AgentGrid stays identical to the canvas' passability grid as sprites move """
+        desk = testutils.load_terrain_sprite(hitboxes = [testutils.create_terrain_hitbox(),])
+        self.canvas.add_sprite(desk, (0, 0))
+        agent = pathfinding.AgentGrid(self.canvas, desk)
+        for (sp, offset) in [(self.walker, (1, 0)), (self.walker, (0, -1)), (self.walker, (1, 0))]:
+            self.canvas.move_sprite(sp, offset = offset)
+            agent.update()
+            self.assertTrue(np.array_equal(agent.grid, self.canvas.passability_grid(desk)))
+        ## Sprites moved outside of the canvas are picked up as well
+        self.wall.location = (32, 8)
+        flipped = agent.update()
+        self.assertGreater(len(flipped), 0)
+        self.assertTrue(np.array_equal(agent.grid, self.canvas.passability_grid(desk)))
+
+    def test_replan(self):
+        """ Tests that replan follows changes to the canvas """
+        goal = (120, 40)
+        self.assertEqual(len(self.service.replan(self.walker, goal)), len(self.service.find_path(self.walker, goal)))
+        for direction in [(1, 0), (1, 0), (0, -1)]:
+            self.canvas.move_sprite(self.walker, offset = direction)
+        route = self.service.replan(self.walker, goal)
+        self.assertEqual(route[0], tuple(self.walker.location))
+        self.assertEqual(len(route), len(self.service.find_path(self.walker, goal)))
+
+        self.canvas.add_sprite(testutils.create_block((64, 0), (8, 8)))
+        self.assertIsNone(self.service.replan(self.walker, goal))
+        self.service.forget(self.walker)
+        self.assertNotIn(self.walker, self.service.agents)
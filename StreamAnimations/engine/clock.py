@@ -0,0 +1,198 @@
+""" Fixed-timestep scheduling: the canvas simulation (moves and idle animation) is advanced at a fixed tick rate
+    which is independent of the rate at which frames are rendered.
+
+    FixedStepClock decides how many ticks are due and when the next frame should be rendered (measuring how late
+    each tick and frame was), and Simulation runs the ticks against a canvas.
+"""
+## This Module
+from StreamAnimations.sprite import Sprite
+## Builtin
+import collections
+import math
+import time
+
+## Default number of recent timing errors kept by JitterStats
+DEFAULT_HISTORY = 120
+## Tolerance used when dividing elapsed time into ticks (so that e.g.- 4 * (1/60) seconds is 4 ticks, not 3)
+EPSILON = 1e-9
+
+class JitterStats():
+    """ Running statistics of how late (in seconds) a series of scheduled events were """
+    def __init__(self, history: int = DEFAULT_HISTORY) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent = collections.deque(maxlen = history)
+
+    def add(self, error: float)-> None:
+        error = abs(error)
+        self.count += 1
+        self.total += error
+        self.max = max(self.max, error)
+        self.recent.append(error)
+
+    @property
+    def mean(self)-> float:
+        return self.total / self.count if self.count else 0.0
+
+    def to_dict(self)-> dict:
+        recent = sorted(self.recent)
+        return dict(count = self.count, mean = self.mean, max = self.max,
+            recentmean = sum(recent) / len(recent) if recent else 0.0,
+            recentp95 = recent[min(len(recent) - 1, int(len(recent) * .95))] if recent else 0.0)
+
+class FixedStepClock():
+    """ Schedules simulation ticks at tickrate and frames at framerate (which defaults to tickrate).
+
+        advance accumulates elapsed time and returns the number of ticks which are due: at most maxticks
+        (None for no limit) are run at once, so that a long stall does not freeze the loop while it catches up;
+        ticks beyond that are skipped. alpha is how far (0 to 1) the clock is between the last tick and the next one,
+        which can be used to interpolate what is rendered (see Simulation.location).
+
+        Frames are scheduled against fixed deadlines (start + n / framerate) rather than relative to the previous
+        frame, so that the time spent rendering does not accumulate as drift: see frame and delay.
+
+        timer returns the current time in seconds; every method which takes now uses timer() if now is None.
+    """
+    def __init__(self, tickrate: float, framerate: float = None, maxticks: int = 5, timer = time.perf_counter) -> None:
+        if tickrate <= 0 or (framerate is not None and framerate <= 0):
+            raise ValueError("tickrate and framerate must be positive")
+        self.tickrate = tickrate
+        self.framerate = framerate or tickrate
+        self.maxticks = maxticks
+        self.timer = timer
+        self.reset()
+
+    def reset(self)-> None:
+        """ Stops the clock and resets its statistics """
+        self.started = None
+        self.last = None
+        self.accumulator = 0.0
+        self.nextframe = None
+        ## ticks/frames - number run; skippedticks/skippedframes - number dropped to catch up
+        self.ticks = self.frames = self.skippedticks = self.skippedframes = 0
+        self.tickjitter = JitterStats()
+        self.framejitter = JitterStats()
+
+    @property
+    def tickinterval(self)-> float:
+        return 1 / self.tickrate
+
+    @property
+    def frameinterval(self)-> float:
+        return 1 / self.framerate
+
+    def now(self, now: float = None)-> float:
+        return self.timer() if now is None else now
+
+    def start(self, now: float = None)-> None:
+        """ Starts (or restarts) the clock: the first frame is due immediately and the first tick one tickinterval later """
+        now = self.now(now)
+        self.started = self.last = now
+        self.accumulator = 0.0
+        self.nextframe = now
+
+    @property
+    def alpha(self)-> float:
+        """ Fraction of a tick which has elapsed since the last tick """
+        return min(1.0, self.accumulator / self.tickinterval)
+
+    def advance(self, now: float = None)-> int:
+        """ Adds the time elapsed since the last call and returns the number of ticks to run """
+        now = self.now(now)
+        if self.last is None: self.start(now)
+        self.accumulator += now - self.last
+        self.last = now
+        interval = self.tickinterval
+        due = int(self.accumulator / interval + EPSILON)
+        if self.maxticks is not None and due > self.maxticks:
+            self.skippedticks += due - self.maxticks
+            self.accumulator -= (due - self.maxticks) * interval
+            due = self.maxticks
+        ## The k-th due tick was scheduled (accumulator - (k+1) * interval) seconds ago
+        for k in range(due):
+            self.tickjitter.add(self.accumulator - (k + 1) * interval)
+        self.accumulator = max(0.0, self.accumulator - due * interval)
+        self.ticks += due
+        return due
+
+    def frame(self, now: float = None)-> None:
+        """ Records that a frame is being rendered now and schedules the next frame deadline.
+
+            If rendering has fallen more than a frame behind, the missed deadlines are skipped.
+        """
+        now = self.now(now)
+        if self.nextframe is None: self.start(now)
+        self.framejitter.add(now - self.nextframe)
+        self.frames += 1
+        self.nextframe += self.frameinterval
+        if self.nextframe <= now:
+            missed = math.floor((now - self.nextframe) / self.frameinterval) + 1
+            self.skippedframes += missed
+            self.nextframe += missed * self.frameinterval
+
+    def delay(self, now: float = None)-> float:
+        """ Returns the number of seconds until the next frame is due (0 if it is already due) """
+        if self.nextframe is None: return 0.0
+        return max(0.0, self.nextframe - self.now(now))
+
+    def stats(self)-> dict:
+        return dict(ticks = self.ticks, frames = self.frames, skippedticks = self.skippedticks, skippedframes = self.skippedframes,
+            tickjitter = self.tickjitter.to_dict(), framejitter = self.framejitter.to_dict())
+
+class Tick():
+    """ A single simulation step (the equivalent of renderers.gif.Frame for Simulation).
+
+        Sprites moved with move_sprite are not idle-animated during the tick.
+    """
+    def __init__(self, canvas: "CanvasBase", index: int) -> None:
+        self.canvas = canvas
+        self.index = index
+        self.activesprites = []
+
+    def move_sprite(self, sprite: Sprite, *args, **kw):
+        self.canvas.move_sprite(sprite, *args, **kw)
+        self.activesprites.append(sprite)
+
+    def animate_idlesprites(self):
+        self.canvas.animate_idlesprites([sprite for sprite in self.canvas.sprites if sprite not in self.activesprites])
+
+class Simulation():
+    """ Advances a canvas at the clock's tick rate.
+
+        update(tick) is called once per tick to run the scene logic (it should move sprites with tick.move_sprite),
+        after which every sprite which was not moved is idle-animated.
+        The location of each sprite before the latest tick is kept so that locations can be interpolated.
+    """
+    def __init__(self, canvas: "CanvasBase", update = None, clock: FixedStepClock = None) -> None:
+        self.canvas = canvas
+        self.update = update
+        self.clock = clock
+        self.ticks = 0
+        self.previous = dict()
+
+    def tick(self)-> Tick:
+        """ Runs a single tick """
+        self.previous = {sprite: tuple(sprite.location) for sprite in self.canvas.sprites if sprite.location is not None}
+        tick = Tick(self.canvas, self.ticks)
+        if self.update is not None: self.update(tick)
+        tick.animate_idlesprites()
+        self.ticks += 1
+        return tick
+
+    def run(self, now: float = None)-> int:
+        """ Runs every tick which is due according to the clock and returns the number of ticks run """
+        due = self.clock.advance(now)
+        for i in range(due):
+            self.tick()
+        return due
+
+    def location(self, sprite: Sprite, alpha: float = None)-> tuple:
+        """ Returns the sprite's location interpolated between the previous tick and the latest tick by alpha
+            (which defaults to the clock's alpha)
+        """
+        current = sprite.location
+        previous = self.previous.get(sprite)
+        if previous is None or current is None: return current
+        if alpha is None: alpha = self.clock.alpha if self.clock else 1.0
+        return tuple(p + (c - p) * alpha for p, c in zip(previous, current))
@@ -0,0 +1,145 @@
+""" Optional timers and counters for the phases of each frame (event listeners, moves, idle animation, rendering).
+
+    Instrumentation is enabled by assigning an Instrumentation to CanvasBase.instrumentation (it is None by default,
+    in which case each hook costs a single attribute check). Renderers use their canvas' instrumentation.
+
+    Timers recorded by the built-in hooks:
+        event.{eventname}.{listener} - each call of an event listener (see CanvasBase.trigger_event)
+        event.movement.{listener}.batch - each call of a movement listener's batch form (see CanvasBase.move_sprites)
+        canvas.execute_move - CanvasBase._execute_move
+        canvas.animate_idlesprites - CanvasBase.animate_idlesprites
+        frame.record - Frame.record_frame
+        gif.render - GifRenderer.render
+        tkinter.render - TkinterCanvas.render
+    Counters recorded by the built-in hooks:
+        move.executed, move.blocked - moves which were executed or stopped by a listener
+        canvas.idlesprites - sprites passed to animate_idlesprites
+"""
+## Builtin
+import bisect
+import collections
+import contextlib
+import time
+
+## Upper bounds (in seconds) of the default Histogram buckets: 1 microsecond doubling up to ~16 seconds
+DEFAULT_BOUNDS = tuple(1e-6 * 2**i for i in range(25))
+## Default number of frame records kept by an Instrumentation
+DEFAULT_HISTORY = 256
+
+def listener_name(callback)-> str:
+    """ Returns the name used for a listener's timer """
+    return getattr(callback, "__qualname__", None) or getattr(callback, "__name__", None) or type(callback).__name__
+
+class Histogram():
+    """ Aggregate of timings in fixed (by default, logarithmic) buckets.
+
+        counts[i] is the number of values <= bounds[i] (and greater than bounds[i-1]);
+        the last count is for values greater than every bound.
+    """
+    def __init__(self, bounds: tuple = DEFAULT_BOUNDS) -> None:
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, value: float)-> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min: self.min = value
+        if self.max is None or value > self.max: self.max = value
+
+    @property
+    def mean(self)-> float:
+        return self.total / self.count if self.count else None
+
+    def percentile(self, percent: float)-> float:
+        """ Returns an estimate of the given percentile (0-100): the upper bound of the bucket which contains it (at most max) """
+        if not self.count: return None
+        rank = percent / 100 * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank and seen: return min(bound, self.max)
+        return self.max
+
+    def to_dict(self)-> dict:
+        """ Returns the histogram as a JSON-serializable dict (only buckets with values are listed, as [upper bound, count]) """
+        buckets = [[bound, count] for bound, count in zip(self.bounds + (None,), self.counts) if count]
+        return dict(count = self.count, total = self.total, mean = self.mean, min = self.min, max = self.max,
+            p50 = self.percentile(50), p90 = self.percentile(90), p99 = self.percentile(99), buckets = buckets)
+
+class Instrumentation():
+    """ Collects timers and counters, both as aggregate Histograms/totals and as per-frame records.
+
+        timers - name => Histogram of every time recorded for the timer
+        counters - name => total of the counter
+        frames - the most recent (up to history) completed frame records (see end_frame)
+        current - the record of the frame in progress: dict(index, timers = {name: total seconds}, counters = {name: total})
+    """
+    def __init__(self, history: int = DEFAULT_HISTORY, bounds: tuple = DEFAULT_BOUNDS) -> None:
+        self.bounds = bounds
+        self.timers = dict()
+        self.counters = collections.Counter()
+        self.frames = collections.deque(maxlen = history)
+        self._framestart = None
+        self.current = self._new_frame(0)
+
+    def _new_frame(self, index: int)-> dict:
+        return dict(index = index, timers = dict(), counters = dict())
+
+    def add_time(self, name: str, seconds: float)-> None:
+        """ Records a time (in seconds) for the given timer """
+        histogram = self.timers.get(name)
+        if histogram is None: histogram = self.timers[name] = Histogram(self.bounds)
+        histogram.add(seconds)
+        timers = self.current["timers"]
+        timers[name] = timers.get(name, 0.0) + seconds
+
+    def count(self, name: str, value: int = 1)-> None:
+        """ Increments the given counter """
+        self.counters[name] += value
+        counters = self.current["counters"]
+        counters[name] = counters.get(name, 0) + value
+
+    @contextlib.contextmanager
+    def timer(self, name: str):
+        """ Context manager which records the time spent in its block to the given timer """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def end_frame(self)-> dict:
+        """ Completes the current frame record, adds it to frames, and starts a new one.
+
+            The record's duration is the time since the previous end_frame (None for the first frame).
+            This is called by Frame (when the frame is added to a GifRenderer) and by TkinterCanvas.animation_loop.
+        """
+        now = time.perf_counter()
+        record = self.current
+        record["duration"] = now - self._framestart if self._framestart is not None else None
+        self._framestart = now
+        self.frames.append(record)
+        self.current = self._new_frame(record["index"] + 1)
+        return record
+
+    def reset(self)-> None:
+        """ Discards all timers, counters and frame records """
+        self.timers.clear()
+        self.counters.clear()
+        self.frames.clear()
+        self._framestart = None
+        self.current = self._new_frame(0)
+
+    def summary(self)-> dict:
+        """ Returns the aggregate timers and counters as a JSON-serializable dict """
+        return dict(frames = self.current["index"], timers = {name: histogram.to_dict() for name, histogram in self.timers.items()},
+            counters = dict(self.counters))
+
+    def to_dict(self)-> dict:
+        """ Returns the summary along with the recent frame records (e.g.- to be sent to a dashboard) """
+        return dict(self.summary(), records = list(self.frames))
@@ -0,0 +1,43 @@
+## Builtin
+from collections import OrderedDict
+
+class LRUCache():
+    """ A bounded, least-recently-used cache for values derived from a source object (e.g.- a scaled Sprite frame).
+
+        Entries are keyed on the identity of the source object and an additional key (e.g.- the scale).
+        A reference to the source is kept with each entry so that its id cannot be reused while it is cached.
+    """
+    def __init__(self, maxsize: int = 256) -> None:
+        if maxsize < 1: raise ValueError("maxsize must be a positive integer")
+        self.maxsize = maxsize
+        self._cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self)-> int:
+        return len(self._cache)
+
+    def get(self, source, key, factory: "function"):
+        """ Returns the cached value for (source, key), calling factory() to create it if it is not cached """
+        cachekey = (id(source), key)
+        entry = self._cache.get(cachekey)
+        if entry is not None and entry[0] is source:
+            self._cache.move_to_end(cachekey)
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        value = factory()
+        self._cache[cachekey] = (source, value)
+        if len(self._cache) > self.maxsize:
+            self._cache.popitem(last = False)
+        return value
+
+    def clear(self)-> None:
+        """ Removes all entries (statistics are not reset) """
+        self._cache.clear()
+
+    def stats(self)-> dict:
+        """ Returns the cache's hit/miss statistics """
+        total = self.hits + self.misses
+        return dict(hits = self.hits, misses = self.misses, size = len(self._cache), maxsize = self.maxsize,
+            hitrate = self.hits / total if total else 0.0)
@@ -1,6 +1,293 @@
 from StreamAnimations.canvases import CanvasBase
 from StreamAnimations import sprite, utils
-from PIL import Image
+from StreamAnimations.engine.clock import FixedStepClock, Simulation
+from StreamAnimations.engine.renderers.cache import LRUCache
+from StreamAnimations.engine.renderers.ndarray import ArrayCompositor
+from StreamAnimations.engine.renderers.palette import GlobalPalette
+## Builtin
+import collections
+import concurrent.futures
+import os
+import struct
+import time
+## Third Party
+from PIL import Image, ImageChops, GifImagePlugin
+import numpy as np
+
+def quantize_frame(image: Image.Image, colors: int = 256)-> Image.Image:
+    """ Converts a rendered frame to an (opaque) "P" image whose palette is trimmed to the colors it uses """
+    image = image.convert("RGB").convert("P", palette = Image.Palette.ADAPTIVE, colors = colors)
+    ncolors = image.getextrema()[1] + 1
+    image.putpalette(image.getpalette()[:ncolors*3])
+    return image
+
+def _encode_image(image: Image.Image)-> tuple:
+    """ Converts an image to a picklable (mode, size, bytes) tuple """
+    return image.mode, image.size, image.tobytes()
+
+def _decode_image(encoded: tuple)-> Image.Image:
+    return Image.frombytes(*encoded)
+
+class FrameCompositor():
+    """ Composites frames from a table of (unscaled) sprite frames.
+
+        Used by GifRenderer.render_frames to render frames in a worker pool: each draw list is a list of
+        (image, location) where image is either an index into self.images or an encoded image
+        (see _encode_image) for images that are unique to that frame (e.g.- frames with hitboxes).
+    """
+    def __init__(self, images: list, background: Image.Image, scale: int):
+        self.images = images
+        self.background = utils.scale_image(background, scale)
+        self.scale = scale
+        self._scaled = dict()
+
+    def scaled(self, key)-> Image.Image:
+        if not isinstance(key, int): return utils.scale_image(_decode_image(key), self.scale)
+        image = self._scaled.get(key)
+        if image is None:
+            image = self._scaled[key] = utils.scale_image(self.images[key], self.scale)
+        return image
+
+    def composite(self, draws: list)-> Image.Image:
+        bg = self.background.copy()
+        for (key, location) in draws:
+            sp = self.scaled(key)
+            bg.paste(sp, (location[0]*self.scale, location[1]*self.scale), sp)
+        return bg
+
+## FrameCompositor for the current worker process (see _init_worker)
+_WORKERCOMPOSITOR = None
+
+def _init_worker(images: list, background: tuple, scale: int)-> None:
+    """ Process pool initializer: sprite frames are sent once per worker instead of once per frame """
+    global _WORKERCOMPOSITOR
+    _WORKERCOMPOSITOR = FrameCompositor([_decode_image(image) for image in images], _decode_image(background), scale)
+
+def _composite_in_worker(draws: list)-> tuple:
+    return _encode_image(_WORKERCOMPOSITOR.composite(draws))
+
+class IncrementalCompositor():
+    """ Renders consecutive frames by only redrawing the areas which changed since the previous frame.
+
+        A draw is considered unchanged if the same image is drawn at the same location. The bboxes of all
+        changed draws (both their previous and new positions) are redrawn from the background up, including
+        any unchanged sprites overlapping them (in draw order). If the draw order of unchanged sprites changes,
+        or the dirty area covers most of the canvas, the whole frame is redrawn instead.
+    """
+    ## Ratio of dirty area to canvas area above which the whole frame is redrawn
+    FULLREDRAW = .5
+
+    def __init__(self, renderer: "GifRenderer", scale: int = 1):
+        self.renderer = renderer
+        self.scale = utils.integer_scale(scale)
+        self.image = None
+        self.draws = []
+        ## Dirty rects (in scaled coordinates) redrawn by the last call to render (None if the frame was fully redrawn)
+        self.dirty = None
+
+    def _draws(self, frame: "Frame")-> list:
+        """ Returns (image, location, scaledimage, scaledbbox) for each visible sprite in draw order """
+        output = []
+        scale = self.scale
+        for record in self.renderer.draw_order(frame):
+            image, location = self.renderer.resolve(record), record.location
+            if record.hitboxes:
+                scaled = utils.scale_image(image, scale)
+            else:
+                scaled = self.renderer.scalecache.get(image, scale, lambda: utils.scale_image(image, scale))
+            x, y = location[0]*scale, location[1]*scale
+            output.append((image, tuple(location), scaled, (x, y, x + scaled.width, y + scaled.height)))
+        return output
+
+    @staticmethod
+    def _merge(rects: list)-> list:
+        """ Merges overlapping rects until none overlap """
+        rects = list(rects)
+        merged = True
+        while merged:
+            merged = False
+            output = []
+            for rect in rects:
+                for i, other in enumerate(output):
+                    if utils.check_boundingbox_overlap(rect, other):
+                        output[i] = utils.find_overall_boundingbox(rect, other)
+                        merged = True
+                        break
+                else:
+                    output.append(rect)
+            rects = output
+        return rects
+
+    def render(self, frame: "Frame")-> Image.Image:
+        """ Renders the frame on top of the previously rendered frame and returns a copy of the result """
+        draws = self._draws(frame)
+        previous, self.draws = self.draws, draws
+        if self.image is None:
+            return self._full_render(frame)
+
+        prevkeys = [(id(image), location) for (image, location, scaled, bbox) in previous]
+        keys = [(id(image), location) for (image, location, scaled, bbox) in draws]
+        unchanged = set(prevkeys) & set(keys)
+        ## Unchanged sprites were reordered, so overlaps may have changed
+        if [key for key in prevkeys if key in unchanged] != [key for key in keys if key in unchanged]:
+            return self._full_render(frame)
+
+        rects = [draw[3] for (key, draw) in zip(prevkeys, previous) if key not in unchanged]
+        rects += [draw[3] for (key, draw) in zip(keys, draws) if key not in unchanged]
+        width, height = self.image.size
+        rects = [(max(0, x0), max(0, y0), min(width, x1), min(height, y1)) for (x0, y0, x1, y1) in rects]
+        rects = self._merge([rect for rect in rects if rect[0] < rect[2] and rect[1] < rect[3]])
+        if sum((x1-x0)*(y1-y0) for (x0, y0, x1, y1) in rects) > width*height*self.FULLREDRAW:
+            return self._full_render(frame)
+
+        background = self.renderer.get_scaled_background(self.scale)
+        for rect in rects:
+            region = background.crop(rect)
+            for (image, location, scaled, bbox) in draws:
+                if utils.check_boundingbox_overlap(rect, bbox):
+                    region.paste(scaled, (bbox[0] - rect[0], bbox[1] - rect[1]), scaled)
+            self.image.paste(region, rect[:2])
+        self.dirty = rects
+        return self.image.copy()
+
+    def _full_render(self, frame: "Frame")-> Image.Image:
+        self.image = self.renderer.render(frame = frame, scale = self.scale)
+        self.dirty = None
+        return self.image.copy()
+
+class GifStream():
+    """ Encodes frames to a GIF file (or file-like object) as they are written.
+
+        Only the most recently written frame is held in memory: it is written out once the
+        next (different) frame arrives so that runs of identical frames can be merged into a
+        single frame with a longer duration.
+
+        If optimize is True, each frame after the first is cropped to the area which changed since the
+        previous frame and any unchanged pixels in that area are set to a transparent index (the previous
+        frame is left in place using disposal method 1).
+
+        If a GlobalPalette is provided, it is written as the GIF's global color table and every frame
+        is mapped to it instead of being quantized separately.
+
+        Can be used as a context manager, in which case the stream is closed on exit.
+    """
+    def __init__(self, output, size: tuple, duration: int, loop: int = 0, optimize: bool = False, palette: GlobalPalette = None):
+        if isinstance(output, (str, os.PathLike)):
+            self.fp = open(output, "wb")
+            self._ownsfile = True
+        else:
+            self.fp = output
+            self._ownsfile = False
+        self.size = tuple(size)
+        self.duration = duration
+        self.loop = loop
+        self.optimize = optimize
+        self.palette = palette
+        self.closed = False
+        ## Number of GIF frames and bytes written to self.fp
+        self.framecount = 0
+        self.byteswritten = 0
+        ## Total seconds spent encoding frames
+        self.encodetime = 0.0
+        ## [image, duration] of the frame which has not been written yet
+        self._pending = None
+        ## Last frame written (used by optimize)
+        self._previous = None
+
+    def _write(self, data: bytes)-> None:
+        self.fp.write(data)
+        self.byteswritten += len(data)
+
+    def _write_header(self)-> None:
+        if self.palette is None:
+            ## Signature, Logical Screen Descriptor (no global color table)
+            self._write(b"GIF89a" + struct.pack("<HHBBB", *self.size, 0, 0, 0))
+        else:
+            ## Signature, Logical Screen Descriptor, Global Color Table
+            palette = self.palette.palette_bytes()
+            tablesize = (len(palette) // 3).bit_length() - 2
+            self._write(b"GIF89a" + struct.pack("<HHBBB", *self.size, 0x80 | tablesize, 0, 0) + palette)
+        ## NETSCAPE2.0 looping extension
+        if self.loop is not None:
+            self._write(b"!\xff\x0bNETSCAPE2.0\x03\x01" + struct.pack("<H", self.loop) + b"\x00")
+
+    def _delta_frame(self, image: Image.Image)-> tuple:
+        """ Returns the area of image which changed since the previous frame as a "P" image (with unchanged
+            pixels set to its transparency index), the offset of that area, and the transparency index
+        """
+        bbox = ImageChops.difference(self._previous, image).getbbox() or (0, 0, 1, 1)
+        crop = image.crop(bbox)
+        unchanged = np.all(np.asarray(crop) == np.asarray(self._previous.crop(bbox)), axis = 2)
+        if self.palette is None:
+            ## Reserve the last index for transparency
+            delta = quantize_frame(crop, colors = 255)
+            transparency = delta.getextrema()[1] + 1
+            palette = delta.getpalette()[:transparency*3] + [0, 0, 0]
+        else:
+            delta = self.palette.map(crop)
+            transparency, palette = self.palette.transparency, self.palette.palette()
+        indices = np.asarray(delta).copy()
+        indices[unchanged] = transparency
+        output = Image.frombytes("P", delta.size, indices.tobytes())
+        output.putpalette(palette)
+        return output, bbox[:2], transparency
+
+    def _write_frame(self, image: Image.Image, duration: int)-> None:
+        start = time.perf_counter()
+        if not self.framecount: self._write_header()
+        image = image.convert("RGB")
+        ## Frames only need their own color table if there is no global palette
+        localpalette = self.palette is None
+        if self.optimize and self._previous is not None:
+            delta, offset, transparency = self._delta_frame(image)
+            chunks = GifImagePlugin.getdata(delta, offset, duration = duration, transparency = transparency, disposal = 1, include_color_table = localpalette)
+        else:
+            frame = quantize_frame(image) if localpalette else self.palette.map(image)
+            chunks = GifImagePlugin.getdata(frame, (0, 0), duration = duration, disposal = 1 if self.optimize else 0, include_color_table = localpalette)
+        for chunk in chunks:
+            self._write(chunk)
+        if self.optimize: self._previous = image
+        self.framecount += 1
+        self.encodetime += time.perf_counter() - start
+
+    def write(self, image: Image.Image)-> None:
+        """ Adds a rendered frame to the stream """
+        if self.closed: raise ValueError("Cannot write to a closed GifStream")
+        if image.size != self.size: raise ValueError("Frame size does not match GifStream size")
+        if self._pending:
+            ## This frame is identical to the previous frame
+            if ImageChops.difference(self._pending[0].convert("RGB"), image.convert("RGB")).getbbox() is None:
+                self._pending[1] += self.duration
+                return
+            self._write_frame(*self._pending)
+        self._pending = [image, self.duration]
+
+    def close(self)-> None:
+        """ Writes any pending frame and the GIF trailer """
+        if self.closed: return
+        if self._pending:
+            self._write_frame(*self._pending)
+            self._pending = None
+        if self.framecount: self._write(b";")
+        if self._ownsfile: self.fp.close()
+        self._previous = None
+        self.closed = True
+
+    def stats(self)-> dict:
+        """ Returns the number of frames and bytes written and the total time spent encoding them """
+        return dict(frames = self.framecount, bytes = self.byteswritten, encodetime = self.encodetime)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+## A compact reference to the image displayed by a sprite on a given frame.
+##  spriteid - index of the sprite in GifRenderer.spritetable
+##  animation, index - the key of the sprite's AnimationLoop and the index of its current frame
+##  hitboxes - None, or a tuple of (mask, local offset) for each of the sprite's hitboxes
+SpriteRecord = collections.namedtuple("SpriteRecord", ("spriteid", "animation", "index", "location", "zindex", "hitboxes"))
 
 class Frame():
     def __init__(self, renderer: "GifRenderer", record_hitboxes:bool = False):
@@ -17,9 +304,16 @@ class Frame():
         self.renderer.canvas.animate_idlesprites([sprite for sprite in self.renderer.canvas.sprites if sprite not in self.activesprites])
 
     def record_frame(self):
-        ## DEVNOTE- We save resolution as a tuple for each sprite because otherwise
-        ## we'd need to copy the Sprite to avoid it being mutated by future frames
-        self.resolution = [ (sprite.location, sprite.get_image(with_hitboxes = self.record_hitboxes), sprite.zindex) for sprite in self.renderer.canvas.sprites ]
+        ## DEVNOTE- We save resolution as a SpriteRecord for each sprite because otherwise
+        ## we'd need to copy the Sprite to avoid it being mutated by future frames.
+        ## Images are resolved by the renderer when the frame is rendered (see GifRenderer.resolve)
+        renderer = self.renderer
+        instrumentation = renderer.canvas.instrumentation
+        if instrumentation is not None: start = time.perf_counter()
+        self.resolution = [ SpriteRecord(renderer.sprite_id(sprite), sprite.animations.current_name(), sprite.animations.current_loop().current_index,
+                                sprite.location, sprite.zindex, tuple(sprite.hitbox_overlays()) if self.record_hitboxes else None)
+                            for sprite in renderer.canvas.sprites ]
+        if instrumentation is not None: instrumentation.add_time("frame.record", time.perf_counter() - start)
     
     def __enter__(self):
         return self
@@ -28,13 +322,24 @@ class Frame():
         self.animate_idlesprites()
         self.record_frame()
         self.renderer.add_frame(self)
+        if self.renderer.canvas.instrumentation is not None: self.renderer.canvas.instrumentation.end_frame()
 
 class GifRenderer():
     def default_sorter(*resolution):
-        result = sorted(enumerate(resolution), key = lambda res: res[1][2], reverse=True)
+        result = sorted(enumerate(resolution), key = lambda res: res[1][1], reverse=True)
         return [enum for enum, res in result]
 
-    def __init__(self, canvas: CanvasBase, background: Image.Image = None, *, sorter = default_sorter):
+    ## Valid values for GifRenderer.backend
+    BACKENDS = ("pil", "numpy")
+
+    def __init__(self, canvas: CanvasBase, background: Image.Image = None, *, sorter = default_sorter, cachesize: int = 256, backend: str = "pil"):
+        """ backend determines how render composites frames: "pil" pastes scaled sprite frames onto the scaled background,
+            while "numpy" composites onto a preallocated array (see ndarray.ArrayCompositor) and scales the finished frame.
+            Both produce identical frames.
+        """
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Invalid backend: {backend}")
+        self.backend = backend
         self.canvas = canvas
         self.frames = []
         if background and not isinstance(background, Image.Image):
@@ -44,42 +349,230 @@ class GifRenderer():
         self.background = background
 
         self.sorter = sorter
+        ## Sprites referenced by SpriteRecords (SpriteRecord.spriteid is the index of the sprite)
+        self.spritetable = []
+        self._spriteids = dict()
+        ## Scaled Sprite frames keyed on (frame, scale)
+        self.scalecache = LRUCache(cachesize)
+        ## Scaled backgrounds keyed on (background, scale)
+        self.backgroundcache = LRUCache(4)
+        self._defaultbackground = None
+        ## GifStream which frames are encoded to as they are added (see GifRenderer.stream)
+        self.outputstream = None
+        self.streamscale = 1
+        self.streamcompositor = None
+        self.arraycompositor = ArrayCompositor(self, cachesize) if backend == "numpy" else None
 
     def get_background(self):
-        if not self.background: return Image.new("RGBA", self.canvas.size, color = (255, 255, 255, 255))
+        if not self.background:
+            ## The default background is only created once (and recreated if the canvas is resized)
+            if self._defaultbackground is None or self._defaultbackground.size != tuple(self.canvas.size):
+                self._defaultbackground = Image.new("RGBA", self.canvas.size, color = (255, 255, 255, 255))
+            return self._defaultbackground
         return self.background
 
+    def get_scaled_background(self, scale: int = 1)-> Image.Image:
+        """ Returns the background scaled by scale. The returned image is cached and should be copied before it is modified. """
+        background = self.get_background()
+        return self.backgroundcache.get(background, scale, lambda: utils.scale_image(background, scale))
+
+    def build_palette(self)-> GlobalPalette:
+        """ Builds a GlobalPalette from the background and every frame of every sprite on the canvas (or previously recorded).
+
+            The color used to draw hitboxes (see Sprite.paste_hitboxes) is always included.
+        """
+        sprites = list(self.spritetable) + [sprite for sprite in self.canvas.sprites if sprite not in self._spriteids]
+        images = [self.get_background(),] + [image for sprite in sprites for loop in sprite.animations.animations.values() for image in loop.frames]
+        return GlobalPalette.from_images(images, extracolors = [(255, 0, 0),])
+
+    def _get_palette(self, palette)-> GlobalPalette:
+        """ Helper function for the palette argument of save and stream """
+        if palette is True: return self.build_palette()
+        return palette or None
+
+    def sprite_id(self, sprite: sprite.Sprite)-> int:
+        """ Returns the sprite's index in self.spritetable, adding it if necessary """
+        spriteid = self._spriteids.get(sprite)
+        if spriteid is None:
+            spriteid = self._spriteids[sprite] = len(self.spritetable)
+            self.spritetable.append(sprite)
+        return spriteid
+
+    def resolve(self, record: SpriteRecord)-> Image.Image:
+        """ Returns the image referenced by the given SpriteRecord """
+        sprite = self.spritetable[record.spriteid]
+        image = sprite.animations.animations[record.animation].frames[record.index]
+        if record.hitboxes:
+            image = sprite.paste_hitboxes(image.copy(), record.hitboxes)
+        return image
+
+    def resolve_scaled(self, record: SpriteRecord, scale: int)-> Image.Image:
+        """ Returns the image referenced by the given SpriteRecord scaled by scale.
+        
+            Sprite frames are cached (images with hitboxes are always unique, so they are not).
+        """
+        if record.hitboxes: return utils.scale_image(self.resolve(record), scale)
+        image = self.resolve(record)
+        return self.scalecache.get(image, scale, lambda: utils.scale_image(image, scale))
+
     def add_frame(self, frame: Frame):
-        """ Add the given Frame Instance to the frames list"""
+        """ Add the given Frame Instance to the frames list.
+        
+            If the renderer is streaming, the frame is rendered and encoded immediately instead.
+        """
+        if self.outputstream is not None and not self.outputstream.closed:
+            if self.streamcompositor is not None:
+                self.outputstream.write(self.streamcompositor.render(frame))
+            else:
+                self.outputstream.write(self.render(frame = frame, scale = self.streamscale))
+            return
         self.frames.append(frame)
 
-    def render(self, scale:int = 1, background: Image.Image = None, frame: Frame):
-        """ Composite an image of all sprites visible on the canvas """
+    def stream(self, output, framerate: int, scale: int = 1, incremental: bool = False, optimize: bool = False, palette = None)-> GifStream:
+        """ Encodes each frame to output (a filepath or file-like object) as soon as it is added,
+            instead of storing it in self.frames until save is called.
+
+            If incremental is True, frames are rendered using an IncrementalCompositor.
+            optimize is passed to the GifStream.
+            palette can be a GlobalPalette or True (in which case one is created with build_palette).
+
+            The returned GifStream should be closed (or used as a context manager) once all frames
+            have been added.
+        """
+        w, h = self.canvas.size
+        scale = utils.integer_scale(scale)
+        self.streamscale = scale
+        self.streamcompositor = IncrementalCompositor(self, scale) if incremental else None
+        self.outputstream = GifStream(output, (w*scale, h*scale), duration = 1000//framerate, optimize = optimize, palette = self._get_palette(palette))
+        return self.outputstream
+
+    def render(self, scale:int = 1, background: Image.Image = None, *, frame: Frame):
+        """ Composite an image of all sprites visible on the canvas.
+
+            scale must be a whole number (see utils.integer_scale), since sprites are placed at location * scale.
+        """
+        scale = utils.integer_scale(scale)
+        instrumentation = self.canvas.instrumentation
+        if instrumentation is None: return self._render(scale, background, frame)
+        start = time.perf_counter()
+        image = self._render(scale, background, frame)
+        instrumentation.add_time("gif.render", time.perf_counter() - start)
+        return image
+
+    def _render(self, scale: int, background: Image.Image, frame: Frame)-> Image.Image:
+        if background is None and self.arraycompositor is not None:
+            return self.arraycompositor.render(frame, scale)
         if background is None:
-            bg = self.get_background()
-            bg = utils.scale_image(bg, scale)
+            bg = self.get_scaled_background(scale).copy()
         else:
             bg = background.copy()
 
-        spritelocations = [(location, zindex) for (location, image, zindex) in frame.resolution]
-        ## Sorters should return sprite indices based on how close they are to
-        ## the camera, but we draw them furthest away first (hence reveresed)
-        for spriteindex in reversed(self.sorter(*spritelocations)):
-            sprite = frame.resolution[spriteindex]
-            [location, image, zindex] = sprite
-            if location == None: continue
-            sp = utils.scale_image(image, scale)
+        for record in self.draw_order(frame):
+            location = record.location
+            sp = self.resolve_scaled(record, scale)
             bg.paste(sp, (location[0]*scale, location[1]*scale), sp)
         return bg
-                    
-    def save(self, output: str, framerate: int, scale: int = 1)-> None:
-        """ Output Canvas to gif file """
+
+    def draw_order(self, frame: Frame)-> list:
+        """ Returns the frame's visible SpriteRecords in the order they should be drawn """
+        spritelocations = [(record.location, record.zindex) for record in frame.resolution]
+        ## Sorters should return sprite indices based on how close they are to
+        ## the camera, but we draw them furthest away first (hence reveresed)
+        return [frame.resolution[spriteindex] for spriteindex in reversed(self.sorter(*spritelocations))
+                if frame.resolution[spriteindex].location is not None]
+
+    def render_frames(self, scale: int = 1, workers: int = None, executor: str = "process", incremental: bool = False)-> list:
+        """ Renders all frames in self.frames (in order).
+
+            If workers is provided, frames are composited across a pool of that many workers.
+            executor can be "process" or "thread".
+            Otherwise, if incremental is True, frames are rendered using an IncrementalCompositor.
+        """
+        scale = utils.integer_scale(scale)
+        if not workers:
+            if incremental:
+                compositor = IncrementalCompositor(self, scale)
+                return [compositor.render(frame) for frame in self.frames]
+            return [self.render(frame = frame, scale = scale) for frame in self.frames]
+        if executor not in ("process", "thread"):
+            raise ValueError(f"Invalid executor: {executor}")
+
+        ## Each unique sprite frame is added to a table once; draw lists reference it by index
+        images, imageids, tasks = [], dict(), []
+        for frame in self.frames:
+            draws = []
+            for record in self.draw_order(frame):
+                image = self.resolve(record)
+                if record.hitboxes:
+                    draws.append((_encode_image(image), record.location))
+                    continue
+                if id(image) not in imageids:
+                    imageids[id(image)] = len(images)
+                    images.append(image)
+                draws.append((imageids[id(image)], record.location))
+            tasks.append(draws)
+
+        if executor == "thread":
+            compositor = FrameCompositor(images, self.get_background(), scale)
+            ## Populate the scaled frames up front so that threads do not race to scale them
+            for key in range(len(images)): compositor.scaled(key)
+            with concurrent.futures.ThreadPoolExecutor(max_workers = workers) as pool:
+                return list(pool.map(compositor.composite, tasks))
+
+        initargs = ([_encode_image(image) for image in images], _encode_image(self.get_background()), scale)
+        chunksize = max(1, len(tasks) // (workers * 4))
+        with concurrent.futures.ProcessPoolExecutor(max_workers = workers, initializer = _init_worker, initargs = initargs) as pool:
+            return [_decode_image(image) for image in pool.map(_composite_in_worker, tasks, chunksize = chunksize)]
+
+    def save(self, output: str, framerate: int, scale: int = 1, workers: int = None, executor: str = "process", incremental: bool = False, optimize: bool = False, palette = None)-> dict:
+        """ Output Canvas to gif file.
+
+            workers, executor, and incremental are passed to render_frames.
+            If optimize is True, frames are encoded with a GifStream which only stores the changed area of each frame.
+            palette can be a GlobalPalette or True (in which case one is created with build_palette): if provided,
+            frames are encoded with a GifStream using that palette.
+
+            Returns a dict with the number of frames rendered, the number of bytes written, and the time spent encoding.
+        """
         if not self.frames:
             raise AttributeError("No frames created: Gif would be empty")
         duration = 1000//framerate
-        background = utils.scale_image(self.get_background(), scale)
-        self.render(frame = self.frames[0], scale = scale, background= background)\
-            .save(output, save_all = True, append_images = [self.render(frame=frame, scale=scale) for frame in self.frames[1:]], duration = duration)
+        images = self.render_frames(scale = scale, workers = workers, executor = executor, incremental = incremental)
+        palette = self._get_palette(palette)
+        if optimize or palette:
+            with GifStream(output, images[0].size, duration = duration, optimize = optimize, palette = palette) as stream:
+                for image in images: stream.write(image)
+            return dict(frames = len(images), bytes = stream.byteswritten, encodetime = stream.encodetime)
+
+        start = time.perf_counter()
+        if isinstance(output, (str, os.PathLike)):
+            images[0].save(output, format = "GIF", save_all = True, append_images = images[1:], duration = duration)
+            size = os.path.getsize(output)
+        else:
+            position = output.tell()
+            images[0].save(output, format = "GIF", save_all = True, append_images = images[1:], duration = duration)
+            size = output.tell() - position
+        return dict(frames = len(images), bytes = size, encodetime = time.perf_counter() - start)
 
     def frame(self, *args, **kw)-> Frame:
-        return Frame(self, *args, **kw)
\ No newline at end of file
+        return Frame(self, *args, **kw)
+
+    def simulate(self, update, frames: int, tickrate: int, framerate: int, record_hitboxes: bool = False)-> FixedStepClock:
+        """ Records the given number of frames of a simulation which is advanced at tickrate (see engine.clock.Simulation)
+            but recorded at framerate (which should then be passed to save).
+
+            update(tick) is called once per tick. Time is simulated, so every tick is run (none are skipped).
+            The first frame is recorded before the first tick. Returns the clock that was used.
+        """
+        clock = FixedStepClock(tickrate, framerate, maxticks = None)
+        simulation = Simulation(self.canvas, update, clock)
+        clock.start(0)
+        for index in range(frames):
+            now = index / framerate
+            simulation.run(now)
+            clock.frame(now)
+            frame = Frame(self, record_hitboxes)
+            frame.record_frame()
+            self.add_frame(frame)
+            if self.canvas.instrumentation is not None: self.canvas.instrumentation.end_frame()
+        return clock
\ No newline at end of file
@@ -0,0 +1,105 @@
+## This Module
+from StreamAnimations import utils
+from StreamAnimations.engine.renderers.cache import LRUCache
+## Third Party
+from PIL import Image
+import numpy as np
+
+class SpriteArray():
+    """ An RGBA image stored as a uint8 array (indexed [y, x]) along with how its alpha should be blended.
+
+        binary - True if every pixel is either fully transparent or fully opaque (as with most pixel art),
+            in which case pixels are copied through mask instead of being blended.
+        mask - for binary images, a boolean array of the opaque pixels (None if every pixel is opaque)
+        alpha - for non-binary images, the alpha channel as a (height, width, 1) uint16 array
+
+        image may also be an RGBA array (e.g.- a view into a sprite.atlas.Atlas), which is used without being copied.
+    """
+    def __init__(self, image) -> None:
+        self.pixels = image if isinstance(image, np.ndarray) else np.asarray(image.convert("RGBA"))
+        alpha = self.pixels[..., 3]
+        opaque = alpha == 255
+        self.binary = bool(np.logical_or(opaque, alpha == 0).all())
+        self.mask, self.alpha = None, None
+        if self.binary:
+            if not opaque.all(): self.mask = opaque
+        else:
+            self.alpha = alpha[..., None].astype(np.uint16)
+
+    @property
+    def size(self):
+        return self.pixels.shape[1], self.pixels.shape[0]
+
+def blend(dest: np.ndarray, source: np.ndarray, alpha: np.ndarray)-> None:
+    """ Blends source onto dest (in place) using alpha, exactly as Image.paste does with a mask.
+
+        Each channel (including alpha) is computed as (dest*(255-alpha) + source*alpha) / 255,
+        using PIL's rounding division.
+    """
+    value = dest.astype(np.uint16) * (255 - alpha) + source.astype(np.uint16) * alpha
+    ## Fits in uint16: the maximum value is 255*255 + 128
+    value += 128
+    dest[...] = ((value >> 8) + value) >> 8
+
+class ArrayCompositor():
+    """ Composites frames for a GifRenderer onto a preallocated uint8 array.
+
+        Sprites are drawn unscaled and the scale is only applied to the finished frame.
+        The output is identical to GifRenderer's (PIL-based) render.
+    """
+    def __init__(self, renderer: "GifRenderer", cachesize: int = 256) -> None:
+        self.renderer = renderer
+        self.canvas = None
+        self._background = None
+        ## SpriteArrays of Sprite frames (images with hitboxes are unique to each frame, so they are not cached)
+        self.arraycache = LRUCache(cachesize)
+
+    def sprite_array(self, record)-> SpriteArray:
+        """ Returns the SpriteArray for the record's frame: frames of sprites attached to an Atlas are drawn from the atlas' array """
+        image = self.renderer.resolve(record)
+        if record.hitboxes: return SpriteArray(image)
+        loop = self.renderer.spritetable[record.spriteid].animations.animations[record.animation]
+        if loop.atlas is not None:
+            return self.arraycache.get(image, "array", lambda: SpriteArray(loop.view(record.index)))
+        return self.arraycache.get(image, "array", lambda: SpriteArray(image))
+
+    def _prepare(self)-> None:
+        """ (Re)allocates the canvas if the background changed and resets it to the background """
+        background = self.renderer.get_background()
+        if self._background is None or self._background[0] is not background:
+            self._background = (background, np.asarray(background.convert("RGBA")))
+            self.canvas = np.empty_like(self._background[1])
+        np.copyto(self.canvas, self._background[1])
+
+    def paste(self, sprite: SpriteArray, location)-> None:
+        """ Draws the sprite onto the canvas at location, clipping it to the canvas """
+        height, width = self.canvas.shape[:2]
+        x, y = location[0], location[1]
+        x0, y0 = max(x, 0), max(y, 0)
+        x1, y1 = min(x + sprite.size[0], width), min(y + sprite.size[1], height)
+        if x0 >= x1 or y0 >= y1: return
+        dest = self.canvas[y0:y1, x0:x1]
+        source = (slice(y0 - y, y1 - y), slice(x0 - x, x1 - x))
+        if not sprite.binary:
+            blend(dest, sprite.pixels[source], sprite.alpha[source])
+        elif sprite.mask is None:
+            dest[...] = sprite.pixels[source]
+        else:
+            mask = sprite.mask[source]
+            dest[mask] = sprite.pixels[source][mask]
+
+    def composite(self, frame: "Frame")-> np.ndarray:
+        """ Composites the (unscaled) frame and returns the canvas array. The array is reused by the next call. """
+        self._prepare()
+        for record in self.renderer.draw_order(frame):
+            self.paste(self.sprite_array(record), record.location)
+        return self.canvas
+
+    def render(self, frame: "Frame", scale: int = 1)-> Image.Image:
+        """ Composites the frame and returns it as an RGBA Image scaled by scale """
+        scale = utils.integer_scale(scale)
+        canvas = self.composite(frame)
+        ## The canvas is reused, so it is always copied
+        image = Image.fromarray(canvas.copy() if scale == 1 else utils.scale_array(canvas, scale))
+        mode = self._background[0].mode
+        return image if mode == "RGBA" else image.convert(mode)
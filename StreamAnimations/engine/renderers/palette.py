@@ -0,0 +1,95 @@
+## Third Party
+from PIL import Image
+import numpy as np
+
+## Maximum number of colors in a GlobalPalette: the last index of a GIF's 256 color table is
+## reserved for transparency (see GifStream's optimize option)
+MAXCOLORS = 255
+
+def _pack(rgb: np.ndarray)-> np.ndarray:
+    """ Packs an (..., 3) array of RGB values into integers """
+    rgb = rgb.astype(np.uint32)
+    return (rgb[..., 0] << 16) | (rgb[..., 1] << 8) | rgb[..., 2]
+
+class GlobalPalette():
+    """ A single palette shared by every frame of a GIF.
+
+        Colors are mapped to palette indices with a cached lookup: colors which are not in the palette
+        (e.g.- from semi-transparent pixels blended onto the background) are mapped to the nearest palette
+        color and cached.
+    """
+    def __init__(self, colors) -> None:
+        colors = np.asarray(colors, dtype = np.uint8).reshape(-1, 3)
+        if not len(colors): raise ValueError("GlobalPalette requires at least one color")
+        if len(colors) > MAXCOLORS: raise ValueError(f"GlobalPalette can have at most {MAXCOLORS} colors")
+        self.colors = colors
+        ## Sorted packed colors and their palette indices
+        packed = _pack(colors)
+        order = np.argsort(packed, kind = "stable")
+        self._keys, self._values = packed[order], order.astype(np.uint8)
+        ## Remove duplicates so that each color maps to its first index
+        self._keys, first = np.unique(self._keys, return_index = True)
+        self._values = self._values[first]
+
+    def __len__(self)-> int:
+        return len(self.colors)
+
+    @property
+    def transparency(self)-> int:
+        """ Palette index reserved for transparency """
+        return len(self.colors)
+
+    @classmethod
+    def from_images(cls, images: list, extracolors: list = None, maxcolors: int = MAXCOLORS)-> "GlobalPalette":
+        """ Builds a palette from the visible (non-fully transparent) colors of the given images.
+
+            If there are more than maxcolors unique colors, they are quantized down to maxcolors.
+        """
+        colors = [np.asarray(extracolors, dtype = np.uint8).reshape(-1, 3)] if extracolors else []
+        for image in images:
+            rgba = np.asarray(image.convert("RGBA")).reshape(-1, 4)
+            colors.append(rgba[rgba[:, 3] > 0, :3])
+        colors = np.unique(np.concatenate(colors), axis = 0) if colors else np.zeros((0, 3), dtype = np.uint8)
+        if len(colors) > maxcolors:
+            quantized = Image.fromarray(colors.reshape(1, -1, 3), mode = "RGB").quantize(maxcolors)
+            ncolors = quantized.getextrema()[1] + 1
+            colors = np.array(quantized.getpalette()[:ncolors*3], dtype = np.uint8).reshape(-1, 3)
+        return cls(colors)
+
+    def palette(self)-> list:
+        """ Returns the palette as a flat list of RGB values (including the transparency index) """
+        return self.colors.flatten().tolist() + [0, 0, 0]
+
+    def palette_bytes(self)-> bytes:
+        """ Returns the palette (including the transparency index) padded to a valid GIF color table size """
+        size = max(2, 1 << (len(self.colors)).bit_length())
+        return bytes(self.palette()) + bytes(3 * (size - len(self.colors) - 1))
+
+    def _nearest(self, packed: np.ndarray)-> np.ndarray:
+        """ Returns the index of the nearest palette color for each packed color """
+        rgb = np.stack([(packed >> 16) & 255, (packed >> 8) & 255, packed & 255], axis = -1).astype(np.int32)
+        distances = ((rgb[:, None, :] - self.colors[None, :, :].astype(np.int32))**2).sum(axis = 2)
+        return distances.argmin(axis = 1).astype(np.uint8)
+
+    def lookup(self, packed: np.ndarray)-> np.ndarray:
+        """ Returns the palette index for each packed RGB color, caching any colors which were not in the palette """
+        positions = np.searchsorted(self._keys, packed)
+        found = positions < len(self._keys)
+        found[found] = self._keys[positions[found]] == packed[found]
+        if not found.all():
+            missing = np.unique(packed[~found])
+            keys = np.concatenate([self._keys, missing])
+            order = np.argsort(keys, kind = "stable")
+            self._keys = keys[order]
+            self._values = np.concatenate([self._values, self._nearest(missing)])[order]
+            positions = np.searchsorted(self._keys, packed)
+        return self._values[positions]
+
+    def map(self, image: Image.Image)-> Image.Image:
+        """ Converts the image to a "P" image using this palette """
+        rgb = np.asarray(image.convert("RGB"))
+        uniques, inverse = np.unique(_pack(rgb).ravel(), return_inverse = True)
+        indices = self.lookup(uniques)[inverse]
+        output = Image.frombytes("P", image.size, indices.astype(np.uint8).tobytes())
+        output.putpalette(self.palette())
+        return output
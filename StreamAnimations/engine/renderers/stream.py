@@ -0,0 +1,221 @@
+""" Real-time rendering of a canvas to a raw video stream (e.g.- for ffmpeg or OBS) using asyncio.
+
+    StreamRenderer ticks the canvas at a fixed framerate: scene logic (the update callback, moves and idle animation)
+    runs in the event loop, frames are composited and encoded in a worker thread, and encoded frames are written
+    to a sink (a file descriptor, pipe, file or unix socket) as fast as it accepts them.
+"""
+## This Module
+from StreamAnimations import utils
+from StreamAnimations.canvases import CanvasBase
+from StreamAnimations.engine.renderers.gif import GifRenderer, Frame
+## Builtin
+import asyncio
+import concurrent.futures
+import inspect
+import io
+import os
+import stat
+## Third Party
+from PIL import Image
+
+class FileSink():
+    """ Writes frames to a binary file object or file descriptor (e.g.- a pipe to ffmpeg's stdin).
+
+        Writes block, so they are made in a thread (the loop's default executor).
+        File descriptors and file objects passed to the sink are not closed by it.
+    """
+    def __init__(self, output) -> None:
+        self._owned = isinstance(output, int)
+        self.file = os.fdopen(output, "wb", closefd = False) if self._owned else output
+
+    def _write(self, data: bytes)-> None:
+        self.file.write(data)
+        self.file.flush()
+
+    async def write(self, data: bytes)-> None:
+        await asyncio.get_running_loop().run_in_executor(None, self._write, data)
+
+    async def close(self)-> None:
+        if self._owned: self.file.close()
+
+class SocketSink():
+    """ Writes frames to an asyncio StreamWriter (e.g.- a unix socket, see connect).
+
+        The transport's flow control is used for backpressure: write waits until the buffer has drained.
+    """
+    def __init__(self, writer: asyncio.StreamWriter) -> None:
+        self.writer = writer
+
+    @classmethod
+    async def connect(cls, path)-> "SocketSink":
+        """ Connects to the unix socket at path """
+        reader, writer = await asyncio.open_unix_connection(os.fspath(path))
+        return cls(writer)
+
+    async def write(self, data: bytes)-> None:
+        self.writer.write(data)
+        await self.writer.drain()
+
+    async def close(self)-> None:
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except ConnectionError:
+            pass
+
+async def open_sink(output):
+    """ Returns a sink for output:
+            a sink (anything with async write and close methods) is returned as-is
+            an asyncio.StreamWriter is wrapped in a SocketSink
+            a file descriptor or binary file object is wrapped in a FileSink
+            a path to a unix socket is connected to, and any other path (e.g.- a named pipe) is opened for writing
+    """
+    if inspect.iscoroutinefunction(getattr(output, "write", None)): return output
+    if isinstance(output, asyncio.StreamWriter): return SocketSink(output)
+    if isinstance(output, int) or hasattr(output, "write"): return FileSink(output)
+    if os.path.exists(output) and stat.S_ISSOCK(os.stat(output).st_mode): return await SocketSink.connect(output)
+    ## Opening a named pipe blocks until it has a reader
+    file = await asyncio.get_running_loop().run_in_executor(None, open, output, "wb")
+    sink = FileSink(file)
+    sink._owned = True
+    return sink
+
+class StreamRenderer():
+    """ Renders a canvas in real time, writing each frame to a sink as raw RGBA pixels or as a PNG.
+
+        Each tick (at framerate), update(frame) is called in the event loop (it may be a coroutine function):
+        it should move sprites with frame.move_sprite so that they are not also idle-animated. Idle sprites are
+        then animated and the frame is recorded, and it is composited and encoded in a worker thread.
+
+        Backpressure: at most queuesize frames can wait to be written. If the queue is full when a frame is recorded,
+        the frame is dropped (the scene still advances). If a tick starts more than one frame late, the missed ticks
+        are skipped (counted as late) and idle animation is skipped for that tick to catch up.
+
+        background, sorter, backend and cachesize are passed to the GifRenderer used to composite frames.
+    """
+    ## Valid values for StreamRenderer.format
+    FORMATS = ("rgba", "png")
+
+    def __init__(self, canvas: CanvasBase, framerate: int, *, update = None, scale: int = 1, format: str = "rgba", queuesize: int = 2,
+            background: Image.Image = None, sorter = GifRenderer.default_sorter, backend: str = "pil", cachesize: int = 256) -> None:
+        if format not in self.FORMATS:
+            raise ValueError(f"Invalid format: {format}")
+        if framerate <= 0:
+            raise ValueError("framerate must be positive")
+        if queuesize < 1:
+            raise ValueError("queuesize must be a positive integer")
+        self.canvas = canvas
+        self.framerate = framerate
+        self.update = update
+        self.scale = utils.integer_scale(scale)
+        self.format = format
+        self.queuesize = queuesize
+        self.renderer = GifRenderer(canvas, background, sorter = sorter, backend = backend, cachesize = cachesize)
+        self.running = False
+        self._stopping = False
+        self.reset_stats()
+
+    def reset_stats(self)-> None:
+        ## ticks - frames recorded; written - frames written to the sink; dropped - frames not composited because the queue was full
+        ## late - ticks skipped because the loop was behind schedule; skippedidle - ticks which skipped idle animation
+        self.ticks = self.written = self.dropped = self.late = self.skippedidle = self.byteswritten = 0
+
+    def stats(self)-> dict:
+        return dict(ticks = self.ticks, written = self.written, dropped = self.dropped, late = self.late,
+            skippedidle = self.skippedidle, bytes = self.byteswritten)
+
+    @property
+    def interval(self)-> float:
+        """ Seconds per frame """
+        return 1 / self.framerate
+
+    @property
+    def framesize(self)-> tuple:
+        """ (width, height) of the output frames """
+        return self.canvas.size[0] * self.scale, self.canvas.size[1] * self.scale
+
+    def input_args(self)-> list:
+        """ Returns the ffmpeg input arguments which describe the stream read from stdin """
+        if self.format == "rgba":
+            return ["-f", "rawvideo", "-pix_fmt", "rgba", "-s", "{}x{}".format(*self.framesize), "-r", str(self.framerate), "-i", "-"]
+        return ["-f", "image2pipe", "-c:v", "png", "-r", str(self.framerate), "-i", "-"]
+
+    def encode(self, frame: Frame)-> bytes:
+        """ Composites and encodes the frame (called in the worker thread) """
+        image = self.renderer.render(frame = frame, scale = self.scale)
+        if self.format == "png":
+            output = io.BytesIO()
+            image.save(output, format = "PNG", compress_level = 1)
+            return output.getvalue()
+        return image.convert("RGBA").tobytes()
+
+    async def tick(self, behind: bool = False)-> Frame:
+        """ Runs the scene logic for one frame and returns the recorded Frame.
+
+            If behind is True, idle sprites are not animated.
+        """
+        frame = Frame(self.renderer)
+        if self.update is not None:
+            result = self.update(frame)
+            if inspect.isawaitable(result): await result
+        if behind:
+            self.skippedidle += 1
+        else:
+            frame.animate_idlesprites()
+        frame.record_frame()
+        self.ticks += 1
+        if self.canvas.instrumentation is not None: self.canvas.instrumentation.end_frame()
+        return frame
+
+    async def _write_frames(self, queue: asyncio.Queue, sink)-> None:
+        while (future := await queue.get()) is not None:
+            data = await future
+            await sink.write(data)
+            self.written += 1
+            self.byteswritten += len(data)
+
+    def stop(self)-> None:
+        """ Stops run after the current tick (frames already queued are still written) """
+        self._stopping = True
+
+    async def run(self, output, frames: int = None)-> dict:
+        """ Streams frames to output (see open_sink) until frames ticks have run (forever if None) or stop is called.
+
+            Returns stats once every queued frame has been written and the sink has been closed.
+        """
+        if self.running: raise RuntimeError("StreamRenderer is already running")
+        self.running, self._stopping = True, False
+        loop = asyncio.get_running_loop()
+        sink = await open_sink(output)
+        queue = asyncio.Queue(self.queuesize)
+        ## A single worker thread composites frames in order (and is the only user of the renderer's caches)
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers = 1)
+        writer = asyncio.ensure_future(self._write_frames(queue, sink))
+        try:
+            deadline = loop.time()
+            while not self._stopping and (frames is None or self.ticks < frames) and not writer.done():
+                now = loop.time()
+                if now < deadline:
+                    await asyncio.sleep(deadline - now)
+                    now = loop.time()
+                ## Skip the ticks which were missed entirely
+                missed = int((now - deadline) // self.interval)
+                if missed:
+                    self.late += missed
+                    deadline += missed * self.interval
+                frame = await self.tick(behind = bool(missed))
+                deadline += self.interval
+                if queue.full():
+                    self.dropped += 1
+                    if self.canvas.instrumentation is not None: self.canvas.instrumentation.count("stream.dropped")
+                    continue
+                queue.put_nowait(loop.run_in_executor(executor, self.encode, frame))
+            ## The writer may have finished early because the sink failed
+            if not writer.done(): await queue.put(None)
+            await writer
+        finally:
+            if not writer.done(): writer.cancel()
+            executor.shutdown(wait = True)
+            await sink.close()
+            self.running = False
+        return self.stats()
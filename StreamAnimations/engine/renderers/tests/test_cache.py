@@ -0,0 +1,35 @@
+## Test Framework
+import unittest
+## Test Target
+from StreamAnimations.engine.renderers import cache
+
+class LRUCacheTestCase(unittest.TestCase):
+    def test_get(self):
+        """ Tests that values are cached per (source, key) and that the factory is only called on a miss """
+        lru = cache.LRUCache(maxsize = 4)
+        sourcea, sourceb = object(), object()
+        calls = []
+        def factory(value):
+            calls.append(value)
+            return value
+
+        self.assertEqual(lru.get(sourcea, 1, lambda: factory("a1")), "a1")
+        self.assertEqual(lru.get(sourcea, 1, lambda: factory("other")), "a1")
+        self.assertEqual(lru.get(sourcea, 2, lambda: factory("a2")), "a2")
+        self.assertEqual(lru.get(sourceb, 1, lambda: factory("b1")), "b1")
+        self.assertEqual(calls, ["a1", "a2", "b1"])
+        self.assertEqual(lru.stats(), dict(hits = 1, misses = 3, size = 3, maxsize = 4, hitrate = .25))
+
+    def test_eviction(self):
+        """ Tests that the least recently used entry is evicted once maxsize is exceeded """
+        lru = cache.LRUCache(maxsize = 2)
+        sources = [object() for i in range(3)]
+        lru.get(sources[0], None, lambda: 0)
+        lru.get(sources[1], None, lambda: 1)
+        ## Use source 0 so that source 1 is the least recently used
+        lru.get(sources[0], None, lambda: 0)
+        lru.get(sources[2], None, lambda: 2)
+        self.assertEqual(len(lru), 2)
+
+        self.assertEqual(lru.get(sources[0], None, lambda: "miss"), 0)
+        self.assertEqual(lru.get(sources[1], None, lambda: "miss"), "miss")
@@ -0,0 +1,362 @@
+## Test Framework
+import unittest
+## Test Target
+from StreamAnimations.engine.renderers import gif, ndarray
+## Test Utilities
+from StreamAnimations.tests import utils as testutils
+## This Module
+from StreamAnimations import sprite
+from StreamAnimations.sprite import atlas
+from StreamAnimations.systems import twodimensional
+
+## Builtin
+import io
+import tempfile
+import pathlib
+## Third Party
+from PIL import Image, ImageChops, ImageSequence
+import numpy as np
+
+PATH = ["right", "right", "down", "down", "left", "up"]
+
+def read_gif(fp)-> list:
+    """ Returns a list of (RGB frame, duration) for each frame in the gif """
+    with Image.open(fp) as img:
+        return [(frame.convert("RGB"), frame.info.get("duration")) for frame in ImageSequence.Iterator(img)]
+
+class GifRendererTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.canvas = testutils.load_canvas(size = (100, 80))
+        self.sprite = testutils.load_testsprite(hitboxes=[testutils.create_sprite_hitbox(),])
+        self.desk = testutils.load_terrain_sprite(hitboxes=[testutils.create_terrain_hitbox(),])
+        self.canvas.add_sprite(self.desk, location = (40, 20))
+        self.canvas.add_sprite(self.sprite, location = (0, 0))
+        self.renderer = gif.GifRenderer(self.canvas, sorter = twodimensional.twod_sprite_sorter)
+
+    def animate(self, path = PATH, idleframes = 3):
+        """ Walks the sprite along the path and then lets it idle """
+        with self.renderer.frame(): pass
+        for direction in path:
+            with self.renderer.frame() as frame:
+                frame.move_sprite(self.sprite, direction)
+        ## Sprite is idle and the desk has a single frame, so these should be merged
+        self.sprite.animations.pause()
+        for i in range(idleframes):
+            with self.renderer.frame(): pass
+        self.sprite.animations.unpause()
+
+    def expected_frames(self, framerate, scale)-> list:
+        """ Renders all recorded frames, merging consecutive identical frames, as (RGB frame, duration) """
+        output = []
+        for frame in self.renderer.frames:
+            image = self.renderer.render(frame = frame, scale = scale).convert("RGB")
+            if output and ImageChops.difference(output[-1][0], image).getbbox() is None:
+                output[-1][1] += 1000//framerate
+            else:
+                output.append([image, 1000//framerate])
+        return [tuple(frame) for frame in output]
+
+    def assertFramesEqual(self, frames1, frames2):
+        self.assertEqual(len(frames1), len(frames2))
+        for i, ((frame1, duration1), (frame2, duration2)) in enumerate(zip(frames1, frames2)):
+            with self.subTest(frame = i):
+                self.assertEqual(duration1, duration2)
+                self.assertIsNone(ImageChops.difference(frame1, frame2).getbbox())
+
+class GifStreamTestCase(GifRendererTestCase):
+    def test_stream_matches_render(self):
+        """ Tests that streaming frames results in the same frames as rendering recorded frames """
+        for (scale, incremental) in [(1, False), (3, False), (1, True), (3, True)]:
+            with self.subTest(scale = scale, incremental = incremental):
+                self.setUp()
+                self.animate()
+                expected = self.expected_frames(10, scale)
+
+                self.setUp()
+                streamed = io.BytesIO()
+                with self.renderer.stream(streamed, 10, scale = scale, incremental = incremental) as stream:
+                    self.animate()
+                    ## Frames are not stored on the renderer
+                    self.assertEqual(self.renderer.frames, [])
+                self.assertTrue(stream.closed)
+                ## Identical idle frames were merged
+                self.assertEqual(stream.framecount, len(expected))
+                streamed.seek(0)
+
+                self.assertFramesEqual(read_gif(streamed), expected)
+
+    def test_stream_file(self):
+        """ Tests that GifStream opens and closes a file when given a path """
+        with tempfile.TemporaryDirectory() as directory:
+            output = pathlib.Path(directory) / "stream.gif"
+            stream = self.renderer.stream(output, 10)
+            self.animate()
+            stream.close()
+            self.assertTrue(stream.fp.closed)
+            self.assertEqual(len(read_gif(output)), stream.framecount)
+            with self.assertRaises(ValueError):
+                stream.write(Image.new("RGBA", self.canvas.size))
+
+class FrameTestCase(GifRendererTestCase):
+    def test_record_frame(self):
+        """ Tests that frames record references which resolve to the image displayed at the time """
+        images = []
+        with self.renderer.frame(): pass
+        images.append([sprite.get_image() for sprite in self.canvas.sprites])
+        for direction in PATH:
+            with self.renderer.frame() as frame:
+                frame.move_sprite(self.sprite, direction)
+            images.append([sprite.get_image() for sprite in self.canvas.sprites])
+
+        for frame, frameimages in zip(self.renderer.frames, images):
+            for record, image in zip(frame.resolution, frameimages):
+                with self.subTest(record = record):
+                    self.assertIsInstance(record, gif.SpriteRecord)
+                    self.assertIs(self.renderer.resolve(record), image)
+
+    def test_record_hitboxes(self):
+        """ Tests that recorded hitboxes are pasted onto a copy of the sprite's frame when rendered """
+        originals = {id(image): image.copy() for loop in self.sprite.animations.animations.values() for image in loop.frames}
+        with self.renderer.frame(record_hitboxes = True): pass
+        record = self.renderer.frames[0].resolution[1]
+        self.assertEqual(len(record.hitboxes), 1)
+
+        image = self.renderer.resolve(record)
+        original = self.sprite.animations.animations[record.animation].frames[record.index]
+        self.assertIsNot(image, original)
+        ## None of the sprite's frames were modified
+        for loop in self.sprite.animations.animations.values():
+            for frame in loop.frames:
+                self.assertIsNone(ImageChops.difference(originals[id(frame)], frame).getbbox())
+        ## Pixels covered by the hitbox's mask are red, all others are unchanged
+        mask, offset = record.hitboxes[0]
+        self.assertEqual(offset, (0, 22))
+        for x in range(image.width):
+            for y in range(image.height):
+                inmask = 0 <= y - offset[1] < mask.height and mask.getpixel((x - offset[0], y - offset[1]))
+                self.assertEqual(image.getpixel((x, y)), (255, 0, 0, 255) if inmask else original.getpixel((x, y)))
+
+class ScaleCacheTestCase(GifRendererTestCase):
+    def test_render_cache(self):
+        """ Tests that scaled sprite frames are reused between renders """
+        self.animate()
+        first = [self.renderer.render(frame = frame, scale = 2) for frame in self.renderer.frames]
+        stats = self.renderer.scalecache.stats()
+        self.assertGreater(stats['hits'], 0)
+        ## Each sprite is drawn once per frame
+        self.assertEqual(stats['hits'] + stats['misses'], 2 * len(self.renderer.frames))
+
+        ## Rendering again should only hit the cache
+        rendered = [self.renderer.render(frame = frame, scale = 2) for frame in self.renderer.frames]
+        self.assertEqual(self.renderer.scalecache.stats()['misses'], stats['misses'])
+        for image1, image2 in zip(first, rendered):
+            self.assertIsNone(ImageChops.difference(image1, image2).getbbox())
+
+    def test_background_cache(self):
+        """ Tests that the background is only scaled once per scale and that rendering does not modify the cached background """
+        self.animate()
+        for scale in [1, 2]:
+            with self.subTest(scale = scale):
+                misses = self.renderer.backgroundcache.misses
+                background = self.renderer.get_scaled_background(scale).copy()
+                for frame in self.renderer.frames:
+                    self.renderer.render(frame = frame, scale = scale)
+                self.assertEqual(self.renderer.backgroundcache.misses, misses + 1)
+                self.assertIsNone(ImageChops.difference(background, self.renderer.get_scaled_background(scale)).getbbox())
+        self.assertIs(self.renderer.get_background(), self.renderer.get_background())
+
+class ParallelRenderTestCase(GifRendererTestCase):
+    def test_render_frames(self):
+        """ Tests that rendering frames in a worker pool results in the same frames (in the same order) as rendering them serially """
+        self.animate()
+        with self.renderer.frame(record_hitboxes = True): pass
+        for scale in [1, 2]:
+            expected = self.renderer.render_frames(scale = scale)
+            for executor in ["thread", "process"]:
+                with self.subTest(scale = scale, executor = executor):
+                    frames = self.renderer.render_frames(scale = scale, workers = 2, executor = executor)
+                    self.assertEqual(len(frames), len(expected))
+                    for image1, image2 in zip(frames, expected):
+                        self.assertEqual(image1.size, image2.size)
+                        self.assertIsNone(ImageChops.difference(image1, image2).getbbox())
+
+    def test_invalid_executor(self):
+        self.animate()
+        with self.assertRaises(ValueError):
+            self.renderer.render_frames(workers = 2, executor = "foobar")
+
+class IncrementalCompositorTestCase(GifRendererTestCase):
+    def test_render(self):
+        """ Tests that incrementally rendered frames are identical to fully rendered frames """
+        self.animate()
+        ## Walk the sprite behind and in front of the desk so that overlapping sprites need to be redrawn
+        self.sprite.location = (40, 0)
+        with self.renderer.frame(): pass
+        for direction in ["down",]*6 + ["up",]*2:
+            with self.renderer.frame(record_hitboxes = True) as frame:
+                frame.move_sprite(self.sprite, direction)
+
+        for scale in [1, 3]:
+            with self.subTest(scale = scale):
+                expected = self.renderer.render_frames(scale = scale)
+                compositor = gif.IncrementalCompositor(self.renderer, scale)
+                partial = 0
+                for i, (frame, image) in enumerate(zip(self.renderer.frames, expected)):
+                    result = compositor.render(frame)
+                    if compositor.dirty is not None: partial += 1
+                    self.assertIsNone(ImageChops.difference(result, image).getbbox(), f"Frame {i}")
+                ## At least some frames should have been redrawn incrementally
+                self.assertGreater(partial, 0)
+
+    def test_unchanged(self):
+        """ Tests that nothing is redrawn when no sprite changes """
+        self.sprite.animations.pause()
+        self.desk.animations.pause()
+        for i in range(3):
+            with self.renderer.frame(): pass
+        compositor = gif.IncrementalCompositor(self.renderer)
+        for frame in self.renderer.frames:
+            compositor.render(frame)
+        self.assertEqual(compositor.dirty, [])
+
+class NumpyBackendTestCase(GifRendererTestCase):
+    def add_translucent_sprite(self, location):
+        """ Adds a sprite whose alpha is a gradient (so it has to be blended) to the canvas """
+        alpha = np.tile(np.linspace(0, 255, 30, dtype = np.uint8), (20, 1))
+        pixels = np.dstack([np.full((20, 30), 200, dtype = np.uint8), np.full((20, 30), 40, dtype = np.uint8), np.arange(20*30, dtype = np.uint8).reshape(20, 30), alpha])
+        translucent = sprite.StationarySprite(animations = {"idle": [Image.fromarray(pixels),]})
+        self.canvas.add_sprite(translucent, location = location)
+        return translucent
+
+    def test_render(self):
+        """ Tests that the numpy backend renders frames identical to the PIL backend """
+        ## Partially off-canvas and overlapping the sprite's path
+        translucent = self.add_translucent_sprite((-10, -5))
+        self.animate()
+        with self.renderer.frame(record_hitboxes = True): pass
+        background = Image.fromarray(np.random.default_rng(0).integers(0, 256, (80, 100, 4), dtype = np.uint8))
+        compositor = ndarray.ArrayCompositor(self.renderer)
+        for background in [None, background]:
+            self.renderer.background = background
+            for scale in [1, 3]:
+                for i, frame in enumerate(self.renderer.frames):
+                    with self.subTest(background = background is not None, scale = scale, frame = i):
+                        expected = self.renderer.render(frame = frame, scale = scale)
+                        result = compositor.render(frame, scale)
+                        self.assertEqual(result.mode, expected.mode)
+                        self.assertTrue(np.array_equal(np.asarray(result), np.asarray(expected)))
+
+    def test_3d_location(self):
+        """ Tests that sprites with (x, y, z) locations are drawn at (x, y) """
+        self.add_translucent_sprite((10, 10, 0))
+        with self.renderer.frame(): pass
+        compositor = ndarray.ArrayCompositor(self.renderer)
+        expected = self.renderer.render(frame = self.renderer.frames[0])
+        self.assertTrue(np.array_equal(np.asarray(compositor.render(self.renderer.frames[0])), np.asarray(expected)))
+
+    def test_sprite_array(self):
+        """ Tests that sprite frames are classified by their alpha """
+        translucent = self.add_translucent_sprite((0, 0))
+        tests = [
+            ## image, binary, has mask
+            (translucent.get_image(), False, False),
+            (self.sprite.get_image(), True, True),
+            (Image.new("RGBA", (4, 4), (1, 2, 3, 255)), True, False),
+        ]
+        for (image, binary, hasmask) in tests:
+            with self.subTest(binary = binary, hasmask = hasmask):
+                result = ndarray.SpriteArray(image)
+                self.assertEqual(result.binary, binary)
+                self.assertEqual(result.mask is not None, hasmask)
+                self.assertEqual(result.size, image.size)
+
+    def test_backend(self):
+        """ Tests that GifRenderer.render uses the numpy backend when requested """
+        renderer = gif.GifRenderer(self.canvas, sorter = twodimensional.twod_sprite_sorter, backend = "numpy")
+        self.sprite.animations.pause()
+        self.desk.animations.pause()
+        ## Sprites are paused, so both renderers record the same frame
+        with renderer.frame(): pass
+        with self.renderer.frame(): pass
+        expected = self.renderer.render(frame = self.renderer.frames[0], scale = 2)
+        ## PIL backend's cache is not used
+        misses = renderer.scalecache.misses
+        image = renderer.render(frame = renderer.frames[0], scale = 2)
+        self.assertEqual(renderer.scalecache.misses, misses)
+        self.assertGreater(renderer.arraycompositor.arraycache.misses, 0)
+        self.assertIsNone(ImageChops.difference(image, expected).getbbox())
+
+        with self.assertRaises(ValueError):
+            gif.GifRenderer(self.canvas, backend = "foobar")
+
+    def test_non_integer_scale(self):
+        """ Tests that non-integer scales are rejected by every rendering path """
+        renderer = gif.GifRenderer(self.canvas, backend = "numpy")
+        with renderer.frame(): pass
+        for (name, call) in [
+            ("pil", lambda: self.renderer.render(frame = renderer.frames[0], scale = 1.5)),
+            ("numpy", lambda: renderer.render(frame = renderer.frames[0], scale = 1.5)),
+            ("render_frames", lambda: renderer.render_frames(scale = 1.5)),
+            ("stream", lambda: renderer.stream(io.BytesIO(), 10, scale = 1.5)),
+            ]:
+            with self.subTest(name = name), self.assertRaises(ValueError):
+                call()
+
+    def test_atlas(self):
+        """ Tests that frames of sprites attached to an Atlas are drawn from the atlas' array """
+        self.animate()
+        expected = [self.renderer.render(frame = frame, scale = 2) for frame in self.renderer.frames]
+        sprites = {"me": self.sprite, "desk": self.desk}
+        atlas.Atlas.from_sprites(sprites, mirror = True).attach_sprites(sprites)
+        compositor = ndarray.ArrayCompositor(self.renderer)
+        for i, (frame, image) in enumerate(zip(self.renderer.frames, expected)):
+            with self.subTest(frame = i):
+                self.assertTrue(np.array_equal(np.asarray(compositor.render(frame, 2)), np.asarray(image)))
+        record = self.renderer.frames[-1].resolution[-1]
+        self.assertTrue(np.shares_memory(compositor.sprite_array(record).pixels, self.sprite.animations.current_loop().atlas.array))
+
+class OptimizedGifTestCase(GifRendererTestCase):
+    def test_optimize(self):
+        """ Tests that optimized gifs decode to the same frames while storing fewer bytes """
+        self.animate()
+        for scale in [1, 3]:
+            with self.subTest(scale = scale):
+                expected = self.expected_frames(10, scale)
+                optimized, unoptimized = io.BytesIO(), io.BytesIO()
+                optimizedstats = self.renderer.save(optimized, 10, scale = scale, optimize = True)
+                unoptimizedstats = self.renderer.save(unoptimized, 10, scale = scale)
+
+                for stats, output in [(optimizedstats, optimized), (unoptimizedstats, unoptimized)]:
+                    self.assertEqual(stats['frames'], len(self.renderer.frames))
+                    self.assertEqual(stats['bytes'], len(output.getvalue()))
+                    self.assertGreaterEqual(stats['encodetime'], 0)
+                self.assertLess(optimizedstats['bytes'], unoptimizedstats['bytes'])
+
+                optimized.seek(0)
+                self.assertFramesEqual(read_gif(optimized), expected)
+
+    def test_stream_optimize(self):
+        """ Tests that a stream can be optimized """
+        self.animate()
+        expected = self.expected_frames(10, 2)
+        self.setUp()
+        output = io.BytesIO()
+        with self.renderer.stream(output, 10, scale = 2, optimize = True) as stream:
+            self.animate()
+        self.assertEqual(stream.stats()['bytes'], len(output.getvalue()))
+        output.seek(0)
+        self.assertFramesEqual(read_gif(output), expected)
+
+    def test_palette(self):
+        """ Tests that gifs encoded with a global palette decode to the same frames """
+        self.animate()
+        expected = self.expected_frames(10, 2)
+        for optimize in [False, True]:
+            with self.subTest(optimize = optimize):
+                output = io.BytesIO()
+                stats = self.renderer.save(output, 10, scale = 2, optimize = optimize, palette = True)
+                self.assertEqual(stats['bytes'], len(output.getvalue()))
+                ## Global Color Table flag is set
+                self.assertTrue(output.getvalue()[10] & 0x80)
+                output.seek(0)
+                self.assertFramesEqual(read_gif(output), expected)
@@ -0,0 +1,64 @@
+## Test Framework
+import unittest
+## Test Target
+from StreamAnimations.engine.renderers import palette
+## Test Utilities
+from StreamAnimations.tests import utils as testutils
+
+## Third Party
+from PIL import Image, ImageChops
+import numpy as np
+
+class GlobalPaletteTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.sprite = testutils.load_testsprite()
+        self.frames = [image for loop in self.sprite.animations.animations.values() for image in loop.frames]
+
+    def test_from_images(self):
+        """ Tests that the palette contains every visible color of the images (and no transparent ones) """
+        pal = palette.GlobalPalette.from_images(self.frames, extracolors = [(1, 2, 3),])
+        expected = set()
+        for image in self.frames:
+            rgba = np.asarray(image.convert("RGBA")).reshape(-1, 4)
+            expected |= {tuple(color) for color in rgba[rgba[:, 3] > 0, :3].tolist()}
+        expected.add((1, 2, 3))
+        self.assertEqual({tuple(color) for color in pal.colors.tolist()}, expected)
+        self.assertEqual(pal.transparency, len(expected))
+
+    def test_from_images_quantized(self):
+        """ Tests that images with more than maxcolors colors are quantized """
+        red, green = np.meshgrid(np.arange(32, dtype = np.uint8)*8, np.arange(32, dtype = np.uint8)*8)
+        gradient = Image.fromarray(np.stack([red, green, np.zeros_like(red)], axis = -1))
+        pal = palette.GlobalPalette.from_images([gradient,], maxcolors = 16)
+        self.assertLessEqual(len(pal), 16)
+
+    def test_map(self):
+        """ Tests that images are mapped exactly to palette colors and unknown colors are mapped to the nearest color """
+        pal = palette.GlobalPalette.from_images(self.frames)
+        background = Image.new("RGBA", (32, 32), tuple(pal.colors[0].tolist()) + (255,))
+        for image in self.frames:
+            with self.subTest(image = image):
+                expected = background.copy()
+                expected.paste(image, (0, 0), image)
+                mapped = pal.map(expected)
+                self.assertEqual(mapped.mode, "P")
+                self.assertIsNone(ImageChops.difference(mapped.convert("RGB"), expected.convert("RGB")).getbbox())
+
+        pal = palette.GlobalPalette([(0, 0, 0), (255, 255, 255), (200, 0, 0)])
+        image = Image.new("RGB", (3, 1))
+        for x, color in enumerate([(10, 10, 10), (250, 240, 255), (180, 20, 0)]):
+            image.putpixel((x, 0), color)
+        mapped = pal.map(image)
+        self.assertEqual([mapped.getpixel((x, 0)) for x in range(3)], [0, 1, 2])
+        ## The lookup is cached
+        self.assertIn(palette._pack(np.array((10, 10, 10))), pal._keys)
+
+    def test_palette_bytes(self):
+        """ Tests that the palette is padded to a power of 2 with room for the transparency index """
+        for ncolors, size in [(1, 2), (3, 4), (4, 8), (255, 256)]:
+            with self.subTest(ncolors = ncolors, size = size):
+                pal = palette.GlobalPalette([(i, i, i) for i in range(ncolors)])
+                self.assertEqual(len(pal.palette_bytes()), size*3)
+
+        with self.assertRaises(ValueError):
+            palette.GlobalPalette([(i, i, i) for i in range(256)])
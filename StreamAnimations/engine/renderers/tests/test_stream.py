@@ -0,0 +1,166 @@
+## Test Framework
+import unittest
+## Test Target
+from StreamAnimations.engine.renderers import stream
+## Test Utilities
+from StreamAnimations.tests import utils as testutils
+## This Module
+from StreamAnimations.engine.renderers import gif
+from StreamAnimations.systems import twodimensional
+
+## Builtin
+import asyncio
+import io
+import os
+import pathlib
+import tempfile
+import time
+## Third Party
+from PIL import Image, ImageChops
+
+PATH = ["right", "right", "down", "left", "up"]
+
+class SlowSink():
+    """ Sink which takes delay seconds to write each frame """
+    def __init__(self, delay: float) -> None:
+        self.delay = delay
+        self.frames = []
+        self.closed = False
+
+    async def write(self, data: bytes)-> None:
+        await asyncio.sleep(self.delay)
+        self.frames.append(data)
+
+    async def close(self)-> None:
+        self.closed = True
+
+class StreamRendererTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.canvas = testutils.load_canvas(size = (100, 80))
+        self.sprite = testutils.load_testsprite(hitboxes=[testutils.create_sprite_hitbox(),])
+        self.desk = testutils.load_terrain_sprite(hitboxes=[testutils.create_terrain_hitbox(),])
+        self.canvas.add_sprite(self.desk, location = (40, 20))
+        self.canvas.add_sprite(self.sprite, location = (0, 0))
+
+    def walk(self, frame: gif.Frame)-> None:
+        """ update callback which walks the sprite along PATH """
+        index = len(self.walked)
+        self.walked.append(frame)
+        if index < len(PATH): frame.move_sprite(self.sprite, PATH[index])
+
+    def create_renderer(self, **kw)-> stream.StreamRenderer:
+        self.walked = []
+        return stream.StreamRenderer(self.canvas, kw.pop("framerate", 200), update = self.walk, sorter = twodimensional.twod_sprite_sorter, **kw)
+
+    def test_rgba(self):
+        """ Tests that raw frames match the frames rendered by GifRenderer """
+        for scale in [1, 2]:
+            with self.subTest(scale = scale):
+                self.setUp()
+                ## The queue can hold every frame, so none are dropped
+                renderer = self.create_renderer(scale = scale, queuesize = 10)
+                output = io.BytesIO()
+                stats = asyncio.run(renderer.run(output, frames = 6))
+                self.assertEqual(stats["ticks"], 6)
+                self.assertEqual(stats["written"], 6)
+
+                width, height = renderer.framesize
+                self.assertEqual((width, height), (100*scale, 80*scale))
+                data = output.getvalue()
+                self.assertEqual(len(data), stats["written"] * width * height * 4)
+                self.assertEqual(stats["bytes"], len(data))
+                last = Image.frombytes("RGBA", (width, height), data[-width*height*4:])
+                expected = renderer.renderer.render(frame = self.walked[-1], scale = scale)
+                self.assertIsNone(ImageChops.difference(last, expected).getbbox())
+
+    def test_png(self):
+        """ Tests that each frame is written as a PNG """
+        renderer = self.create_renderer(format = "png", queuesize = 10)
+        output = io.BytesIO()
+        stats = asyncio.run(renderer.run(output, frames = 4))
+        self.assertEqual(stats["written"], 4)
+        data = output.getvalue()
+        self.assertEqual(data.count(b"\x89PNG\r\n\x1a\n"), 4)
+        with Image.open(io.BytesIO(data)) as img:
+            self.assertEqual(img.size, (100, 80))
+        self.assertEqual(renderer.input_args()[:2], ["-f", "image2pipe"])
+
+    def test_backpressure(self):
+        """ Tests that frames are dropped (rather than queued indefinitely) when the sink is too slow """
+        renderer = self.create_renderer(framerate = 100, queuesize = 1)
+        sink = SlowSink(.05)
+        stats = asyncio.run(renderer.run(sink, frames = 20))
+        self.assertTrue(sink.closed)
+        self.assertEqual(stats["ticks"], 20)
+        self.assertGreater(stats["dropped"], 0)
+        self.assertEqual(stats["written"] + stats["dropped"], 20)
+        self.assertEqual(len(sink.frames), stats["written"])
+
+    def test_behind_schedule(self):
+        """ Tests that missed ticks are skipped and idle animation is skipped when the loop falls behind """
+        renderer = self.create_renderer(framerate = 100, queuesize = 10)
+        def update(frame):
+            ## Block the loop for several frames on the second tick
+            if renderer.ticks == 1: time.sleep(.05)
+        renderer.update = update
+        stats = asyncio.run(renderer.run(SlowSink(0), frames = 5))
+        self.assertEqual(stats["ticks"], 5)
+        self.assertGreaterEqual(stats["late"], 3)
+        self.assertGreaterEqual(stats["skippedidle"], 1)
+
+    def test_stop(self):
+        """ Tests that stop ends an unbounded stream """
+        renderer = self.create_renderer()
+        def update(frame):
+            if renderer.ticks == 3: renderer.stop()
+        renderer.update = update
+        stats = asyncio.run(renderer.run(SlowSink(0)))
+        self.assertEqual(stats["ticks"], 4)
+        self.assertFalse(renderer.running)
+
+    def test_socket(self):
+        """ Tests streaming to a unix socket and to a file descriptor """
+        async def serve(path, renderer):
+            received = []
+            async def handle(reader, writer):
+                received.append(await reader.read())
+                writer.close()
+            server = await asyncio.start_unix_server(handle, path)
+            async with server:
+                stats = await renderer.run(path, frames = 3)
+                ## Wait for the handler to read to EOF
+                for i in range(100):
+                    if received: break
+                    await asyncio.sleep(.01)
+            return stats, received[0]
+
+        with tempfile.TemporaryDirectory() as directory:
+            renderer = self.create_renderer(queuesize = 10)
+            stats, data = asyncio.run(serve(str(pathlib.Path(directory) / "stream.sock"), renderer))
+            self.assertEqual(stats["written"], 3)
+            self.assertEqual(len(data), 3 * 100 * 80 * 4)
+
+            renderer = self.create_renderer(queuesize = 10)
+            path = pathlib.Path(directory) / "frames.raw"
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT)
+            try:
+                stats = asyncio.run(renderer.run(fd, frames = 2))
+                ## The file descriptor is not closed by the renderer
+                os.fstat(fd)
+            finally:
+                os.close(fd)
+            self.assertEqual(path.stat().st_size, 2 * 100 * 80 * 4)
+
+    def test_new_file(self):
+        """ Tests streaming to a path which does not exist yet """
+        with tempfile.TemporaryDirectory() as directory:
+            renderer = self.create_renderer(queuesize = 10)
+            path = pathlib.Path(directory) / "frames.raw"
+            stats = asyncio.run(renderer.run(str(path), frames = 2))
+            self.assertEqual(stats["written"], 2)
+            self.assertEqual(path.stat().st_size, 2 * 100 * 80 * 4)
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, stream.StreamRenderer, self.canvas, 10, format = "gif")
+        self.assertRaises(ValueError, stream.StreamRenderer, self.canvas, 0)
+        self.assertRaises(ValueError, stream.StreamRenderer, self.canvas, 10, queuesize = 0)
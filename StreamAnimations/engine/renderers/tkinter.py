@@ -1,15 +1,27 @@
 ## This module
 from StreamAnimations import utils
+from StreamAnimations.engine.renderers.cache import LRUCache
+from StreamAnimations.engine.clock import FixedStepClock, Simulation
 ## 3rd Party
 from PIL import ImageTk
+## Builtin
+import time
 
 class TkinterCanvas():
 
-    def __init__(self, canvas: "canvases.CanvasBase", tkcanvas:"tk.Canvas", framerate: int, scale: float = 1.0, background: "PIL.Image" = None):
+    def __init__(self, canvas: "canvases.CanvasBase", tkcanvas:"tk.Canvas", framerate: int, scale: float = 1.0, background: "PIL.Image" = None, cachesize: int = 256,
+            *, update = None, tickrate: int = None, maxticks: int = 5, interpolate: bool = False):
+        """ If update is provided, the animation loop also runs a Simulation of the canvas: update(tick) is called
+            tickrate (default: framerate) times per second regardless of how long rendering takes (see engine.clock).
+            If interpolate is True, sprites are drawn between their locations at the last two ticks.
+        """
         self.canvas = canvas
         self.tkcanvas = tkcanvas
         self.framerate = framerate
         self.callback = None
+        self.clock = FixedStepClock(tickrate or framerate, framerate, maxticks = maxticks)
+        self.simulation = Simulation(canvas, update, self.clock) if update is not None else None
+        self.interpolate = interpolate
         self.scale = scale
         self.background = background
         """Collects information on sprites displayed, their canvas
@@ -17,6 +29,8 @@ class TkinterCanvas():
             in order to determine blotting
         """
         self.sprites = dict()
+        ## PhotoImages of scaled Sprite frames keyed on (frame, scale)
+        self.photocache = LRUCache(cachesize)
 
 
     @property
@@ -27,32 +41,48 @@ class TkinterCanvas():
     def begin_animationloop(self):
         """ Starts a new animation_loop """
         self.callback = True
+        self.clock.start()
         self.animation_loop()
 
     def animation_loop(self):
-        """ Renders the canvas changes to the TK Canvas and creates a new interval callback """
+        """ Runs any simulation ticks which are due, renders the canvas changes to the TK Canvas and creates a new callback.
+
+            The callback is scheduled for the next frame deadline (see FixedStepClock.frame), so render time does not cause drift.
+        """
+        now = self.clock.now()
+        if self.simulation is not None: self.simulation.run(now)
+        self.clock.frame(now)
         self.render(scale= self.scale, background = self.background)
+        if self.canvas.instrumentation is not None: self.canvas.instrumentation.end_frame()
         if self.callback:
-            self.callback = self.tkcanvas.after(self.fpsdelay, self.animation_loop)
+            self.callback = self.tkcanvas.after(round(self.clock.delay() * 1000), self.animation_loop)
+
+    def sprite_location(self, sprite: "sprites.Sprite")-> tuple:
+        """ Returns the location the sprite should be drawn at (interpolated between ticks if self.interpolate is True) """
+        if self.interpolate and self.simulation is not None:
+            return self.simulation.location(sprite)
+        return sprite.location
 
     def cancel_animationloop(self):
         """ Cancels the next queued animation loop """
         self.tkcanvas.after_cancel(self.callback)
         self.callback = None
 
+    def get_photo(self, sprite: "sprites.Sprite", scale: float)-> ImageTk.PhotoImage:
+        """ Returns a PhotoImage of the sprite's current frame at the given scale (cached in self.photocache) """
+        image = sprite.get_image()
+        return self.photocache.get(image, scale, lambda: ImageTk.PhotoImage(utils.scale_image(image, scale)))
+
     def add_sprite(self, sprite: "sprites.Sprite", scale:float = None):
         """ Adds a sprite to the canvas and creates an entry for it in self.sprites """
         if scale is None: scale = self.scale
 
-        ## Create PhotoImage at scale of the sprite
-        image = utils.scale_image(sprite.get_image(), self.scale)
-        photo = ImageTk.PhotoImage(image)
+        photo = self.get_photo(sprite, scale)
 
-        print(sprite.location, sprite.location[0]*scale, sprite.location[1]*scale)
+        location = self.sprite_location(sprite)
+        _id = self.tkcanvas.create_image(location[0]*scale, location[1]*scale, image = photo, anchor = "nw")
 
-        _id = self.tkcanvas.create_image(sprite.location[0]*scale, sprite.location[1]*scale, image = photo, anchor = "nw")
-
-        self.sprites[sprite] = dict(id = _id, photo=photo, location = sprite.location, animation = sprite.animations.current_loop(), frame = sprite.animations.current_frame(), zindex = sprite.zindex*100_000+sprite.location[1])
+        self.sprites[sprite] = dict(id = _id, photo=photo, location = location, animation = sprite.animations.current_loop(), frame = sprite.animations.current_frame(), zindex = sprite.zindex*100_000+sprite.location[1])
 
     def remove_sprite(self, sprite: "sprites.Sprite"):
         """ Removes a sprite from the canvas and from self.sprites """
@@ -62,10 +92,8 @@ class TkinterCanvas():
     def set_sprite_animation(self, sprite: "sprites.Sprite", scale:float = None):
         """ Changes the image for the sprite currently displayed on the canvas """
         if scale is None: scale = self.scale
-        ## Create PhotoImage at scale of the sprite
-        image = utils.scale_image(sprite.get_image(), scale)
-        photo = ImageTk.PhotoImage(image)
-        
+        photo = self.get_photo(sprite, scale)
+
         ## Update the sprite's image on the TK Canvas
         self.tkcanvas.itemconfigure(self.sprites[sprite]['id'], image = photo)
 
@@ -79,15 +107,23 @@ class TkinterCanvas():
         if scale is None: scale = self.scale
 
         olocation  = self.sprites[sprite]['location']
-        dx, dy = sprite.location[0] - olocation[0], sprite.location[1] - olocation[1]
+        location = self.sprite_location(sprite)
+        dx, dy = location[0] - olocation[0], location[1] - olocation[1]
         self.tkcanvas.move(self.sprites[sprite]['id'], dx*scale, dy*scale)
         if(dy != 0):
             self.sprites[sprite]['zindex'] = sprite.zindex*100_000+sprite.location[1]
 
-        self.sprites[sprite]['location'] = sprite.location
+        self.sprites[sprite]['location'] = location
         
     def render(self, scale: float = None, background: "PIL.Image" = None):
         """ Renders all changes in sprites to the TK Canvas """
+        instrumentation = self.canvas.instrumentation
+        if instrumentation is None: return self._render(scale, background)
+        start = time.perf_counter()
+        self._render(scale, background)
+        instrumentation.add_time("tkinter.render", time.perf_counter() - start)
+
+    def _render(self, scale: float = None, background: "PIL.Image" = None):
         if scale is None: scale = self.scale
 
         ## Keeps track of any missing sprites
@@ -109,7 +145,7 @@ class TkinterCanvas():
                 else:
                     ssp = self.sprites[sprite]
                     ## Sprite has moved
-                    if ssp['location'] != sprite.location:
+                    if ssp['location'] != self.sprite_location(sprite):
                         self.set_sprite_location(sprite, scale = scale)
 
                     ## Sprite's animation has changed
@@ -0,0 +1,143 @@
+## Test Framework
+import unittest
+## Test Target
+from StreamAnimations.engine import clock
+## Test Utilities
+from StreamAnimations.tests import utils as testutils
+## This Module
+from StreamAnimations.engine.renderers import gif
+from StreamAnimations.engine.renderers.tkinter import TkinterCanvas
+
+class FakeTimer():
+    """ Timer which only advances when told to """
+    def __init__(self) -> None:
+        self.time = 0.0
+
+    def __call__(self)-> float:
+        return self.time
+
+class FakeTkCanvas():
+    """ Records the delays passed to after (and otherwise does nothing) """
+    def __init__(self) -> None:
+        self.delays = []
+
+    def after(self, delay, callback):
+        self.delays.append(delay)
+        return len(self.delays)
+
+class FixedStepClockTestCase(unittest.TestCase):
+    def test_advance(self):
+        """ Tests that ticks are run at a fixed rate regardless of when advance is called """
+        testclock = clock.FixedStepClock(10)
+        testclock.start(0)
+        tests = [
+            ## now,     ticks,  total,  alpha
+            (.05,       0,      0,      .5),
+            (.1,        1,      1,      0),
+            (.35,       2,      3,      .5),
+            (.4,        1,      4,      0),
+            (.4,        0,      4,      0),
+        ]
+        for (now, ticks, total, alpha) in tests:
+            with self.subTest(now = now):
+                self.assertEqual(testclock.advance(now), ticks)
+                self.assertEqual(testclock.ticks, total)
+                self.assertAlmostEqual(testclock.alpha, alpha)
+        ## The tick due at .2 ran at .35
+        self.assertAlmostEqual(testclock.tickjitter.max, .15)
+
+    def test_maxticks(self):
+        """ Tests that catching up is capped and the remaining ticks are skipped """
+        testclock = clock.FixedStepClock(10, maxticks = 5)
+        testclock.start(0)
+        self.assertEqual(testclock.advance(10.05), 5)
+        self.assertEqual(testclock.skippedticks, 95)
+        self.assertAlmostEqual(testclock.alpha, .5)
+        self.assertEqual(testclock.advance(10.1), 1)
+
+        testclock = clock.FixedStepClock(10, maxticks = None)
+        testclock.start(0)
+        self.assertEqual(testclock.advance(10), 100)
+
+    def test_frames(self):
+        """ Tests that frames are scheduled against fixed deadlines """
+        testclock = clock.FixedStepClock(60, 10)
+        testclock.start(0)
+        testclock.frame(0)
+        ## Rendering took .03 seconds, so the next frame is due in .07 (not .1)
+        self.assertAlmostEqual(testclock.delay(.03), .07)
+        testclock.frame(.11)
+        self.assertAlmostEqual(testclock.delay(.11), .09)
+        ## The frame due at .2 is late, and the deadlines at .3 and .4 are skipped
+        testclock.frame(.45)
+        self.assertEqual(testclock.skippedframes, 2)
+        self.assertAlmostEqual(testclock.delay(.45), .05)
+        self.assertEqual(testclock.frames, 3)
+        self.assertAlmostEqual(testclock.framejitter.max, .25)
+        stats = testclock.stats()
+        self.assertEqual(stats["frames"], 3)
+        self.assertAlmostEqual(stats["framejitter"]["mean"], (0 + .01 + .25) / 3)
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, clock.FixedStepClock, 0)
+        self.assertRaises(ValueError, clock.FixedStepClock, 10, -1)
+
+class SimulationTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.canvas = testutils.load_canvas()
+        self.sprite = testutils.load_testsprite()
+        self.desk = testutils.load_terrain_sprite()
+        self.canvas.add_sprite(self.sprite, (0, 0))
+        self.canvas.add_sprite(self.desk, (100, 100))
+
+    def walk(self, tick: clock.Tick):
+        tick.move_sprite(self.sprite, "right")
+
+    def test_simulation(self):
+        """ Tests that ticks move sprites and that locations are interpolated between ticks """
+        testclock = clock.FixedStepClock(10)
+        simulation = clock.Simulation(self.canvas, self.walk, testclock)
+        testclock.start(0)
+        self.assertEqual(simulation.run(.25), 2)
+        self.assertEqual(list(self.sprite.location), [2*testutils.STEPLENGTH, 0])
+        ## Half way between the first and second tick's locations
+        self.assertEqual(simulation.location(self.sprite), (1.5*testutils.STEPLENGTH, 0))
+        self.assertEqual(simulation.location(self.sprite, alpha = 1), (2*testutils.STEPLENGTH, 0))
+        self.assertEqual(simulation.location(self.desk), (100, 100))
+
+    def test_gif_simulate(self):
+        """ Tests that GifRenderer.simulate records frames at a different rate than the simulation's ticks """
+        renderer = gif.GifRenderer(self.canvas)
+        testclock = renderer.simulate(self.walk, frames = 5, tickrate = 40, framerate = 10)
+        self.assertEqual(len(renderer.frames), 5)
+        self.assertEqual(testclock.ticks, 16)
+        self.assertEqual(testclock.skippedticks, 0)
+        spriteid = renderer.sprite_id(self.sprite)
+        locations = [[record.location for record in frame.resolution if record.spriteid == spriteid][0][0] for frame in renderer.frames]
+        self.assertEqual(locations, [i*4*testutils.STEPLENGTH for i in range(5)])
+
+class TkinterClockTestCase(unittest.TestCase):
+    def test_animation_loop(self):
+        """ Tests that the animation loop schedules frames against deadlines and runs the simulation at its own rate """
+        canvas = testutils.load_canvas()
+        sprite = testutils.load_testsprite()
+        canvas.add_sprite(sprite, (0, 0))
+        timer = FakeTimer()
+        tkcanvas = FakeTkCanvas()
+        def update(tick):
+            tick.move_sprite(sprite, "right")
+        renderer = TkinterCanvas(canvas, tkcanvas, framerate = 20, update = update, tickrate = 40)
+        renderer.clock.timer = timer
+        def render(**kw):
+            ## Rendering takes 20ms
+            timer.time += .02
+        renderer.render = render
+
+        renderer.begin_animationloop()
+        for i in range(4):
+            timer.time = (i + 1) * .05
+            renderer.animation_loop()
+        ## Each frame is scheduled 50ms after the previous deadline, not 50ms after rendering finished
+        self.assertEqual(tkcanvas.delays, [30] * 5)
+        self.assertEqual(renderer.clock.ticks, 8)
+        self.assertEqual(list(sprite.location), [8*testutils.STEPLENGTH, 0])
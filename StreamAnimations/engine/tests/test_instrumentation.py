@@ -0,0 +1,120 @@
+## Test Framework
+import unittest
+## Test Target
+from StreamAnimations.engine import instrumentation
+## Test Utilities
+from StreamAnimations.tests import utils as testutils
+## This Module
+from StreamAnimations.engine import utils
+from StreamAnimations.engine.renderers import gif
+
+## Builtin
+import json
+
+class HistogramTestCase(unittest.TestCase):
+    def test_histogram(self):
+        """ Tests that values are counted in the correct buckets and summarized """
+        histogram = instrumentation.Histogram(bounds = (1, 2, 4, 8))
+        for value in [.5, 1, 1.5, 3, 3, 3, 7, 100]:
+            histogram.add(value)
+        self.assertEqual(histogram.counts, [2, 1, 3, 1, 1])
+        self.assertEqual(histogram.count, 8)
+        self.assertEqual((histogram.min, histogram.max), (.5, 100))
+        self.assertAlmostEqual(histogram.mean, 119/8)
+        tests = [
+            ## percent, estimate
+            (0,         1),
+            (25,        1),
+            (50,        4),
+            (75,        4),
+            (85,        8),
+            (100,       100),
+        ]
+        for (percent, estimate) in tests:
+            with self.subTest(percent = percent, estimate = estimate):
+                self.assertEqual(histogram.percentile(percent), estimate)
+        self.assertEqual(histogram.to_dict()["buckets"], [[1, 2], [2, 1], [4, 3], [8, 1], [None, 1]])
+
+    def test_empty(self):
+        histogram = instrumentation.Histogram()
+        self.assertIsNone(histogram.mean)
+        self.assertIsNone(histogram.percentile(50))
+
+class InstrumentationTestCase(unittest.TestCase):
+    def test_frames(self):
+        """ Tests that times and counters are recorded both in aggregate and per frame """
+        inst = instrumentation.Instrumentation(history = 2)
+        inst.add_time("a", 1.0)
+        inst.add_time("a", 2.0)
+        inst.count("b")
+        first = inst.end_frame()
+        self.assertEqual(first["index"], 0)
+        self.assertEqual(first["timers"], {"a": 3.0})
+        self.assertEqual(first["counters"], {"b": 1})
+        self.assertIsNone(first["duration"])
+
+        inst.count("b", 4)
+        with inst.timer("c"): pass
+        second = inst.end_frame()
+        self.assertEqual(second["counters"], {"b": 4})
+        self.assertIn("c", second["timers"])
+        self.assertGreaterEqual(second["duration"], 0)
+        inst.end_frame()
+
+        ## Only history frames are kept, but aggregates cover every frame
+        self.assertEqual([record["index"] for record in inst.frames], [1, 2])
+        self.assertEqual(inst.counters["b"], 5)
+        self.assertEqual(inst.timers["a"].count, 2)
+        summary = json.loads(json.dumps(inst.to_dict()))
+        self.assertEqual(summary["frames"], 3)
+        self.assertEqual(len(summary["records"]), 2)
+
+        inst.reset()
+        self.assertFalse(inst.timers)
+        self.assertFalse(inst.frames)
+        self.assertEqual(inst.current["index"], 0)
+
+class CanvasInstrumentationTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.canvas = testutils.load_canvas()
+        self.canvas.add_listener("movement", utils.collision_stop_rule)
+        self.sprite = testutils.load_testsprite(hitboxes = [testutils.create_sprite_hitbox(),])
+        self.desk = testutils.load_terrain_sprite(hitboxes = [testutils.create_terrain_hitbox(),])
+        self.canvas.add_sprite(self.desk, (250, 250))
+        ## Directly below the desk (see engine.tests.test_utils.EngineUtilsRulesTestCase)
+        self.canvas.add_sprite(self.sprite, (250, 260))
+        self.renderer = gif.GifRenderer(self.canvas)
+
+    def test_disabled(self):
+        """ Tests that the hooks work without instrumentation """
+        self.assertIsNone(self.canvas.instrumentation)
+        with self.renderer.frame() as frame:
+            frame.move_sprite(self.sprite, "right")
+        self.renderer.render(frame = self.renderer.frames[0])
+
+    def test_hooks(self):
+        """ Tests that each phase of a frame is recorded """
+        inst = self.canvas.instrumentation = instrumentation.Instrumentation()
+        with self.renderer.frame() as frame:
+            ## Blocked by the desk
+            frame.move_sprite(self.sprite, "up")
+        with self.renderer.frame() as frame:
+            frame.move_sprite(self.sprite, "right")
+        self.renderer.render(frame = self.renderer.frames[0])
+
+        listener = "event.movement.collision_stop_rule"
+        self.assertEqual(inst.timers[listener].count, 2)
+        self.assertEqual(inst.counters["move.blocked"], 1)
+        self.assertEqual(inst.counters["move.executed"], 1)
+        self.assertEqual(inst.timers["canvas.execute_move"].count, 1)
+        self.assertEqual(inst.timers["canvas.animate_idlesprites"].count, 2)
+        self.assertEqual(inst.timers["frame.record"].count, 2)
+        self.assertEqual(inst.timers["gif.render"].count, 1)
+
+        first, second = inst.frames
+        self.assertEqual(first["counters"], {"move.blocked": 1, "canvas.idlesprites": 1})
+        self.assertEqual(second["counters"], {"move.executed": 1, "canvas.idlesprites": 1})
+        self.assertNotIn("canvas.execute_move", first["timers"])
+        self.assertIn("canvas.execute_move", second["timers"])
+        ## Rendering happens after the frames were recorded, so it belongs to the frame in progress
+        self.assertIn("gif.render", inst.current["timers"])
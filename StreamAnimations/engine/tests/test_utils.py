@@ -7,7 +7,10 @@ from StreamAnimations.engine import utils
 from StreamAnimations.tests import utils as testutils
 
 ## This Moudle
+from StreamAnimations import canvases
 from StreamAnimations.sprite import hitbox
+## Third Party
+import numpy as np
 
 class EngineUtils(unittest.TestCase):
     def setUp(self) -> None:
@@ -54,6 +57,33 @@ class EngineUtilsTestCase(EngineUtils):
                 bboxes = list(utils.find_nearby_sprites(self.desk, [self.sprite,]))
                 self.assertEqual(len(bboxes), result)
 
+    def test_find_nearby_sprites_canvas(self):
+        """ Tests that find_nearby_sprites only checks the sprites returned by the canvas' spatialindex """
+        self.canvas.add_sprite(self.desk, (0, 0))
+        self.canvas.add_sprite(self.sprite, (0, 0))
+        self.assertEqual(len(list(utils.find_nearby_sprites(self.sprite, self.canvas))), 1)
+
+        ## Sprites moved outside of the canvas are rehashed before the spatialindex is queried
+        self.desk.location = (300, 300)
+        self.assertEqual(len(list(utils.find_nearby_sprites(self.sprite, self.canvas))), 0)
+        self.sprite.location = (300, 300)
+        self.assertEqual(len(list(utils.find_nearby_sprites(self.sprite, self.canvas))), 1)
+        with self.desk.at((0, 0)):
+            self.assertEqual(len(list(utils.find_nearby_sprites(self.sprite, self.canvas))), 0)
+        self.assertEqual(len(list(utils.find_nearby_sprites(self.sprite, self.canvas))), 1)
+
+        ## CosmeticSprites are rehashed when their parent moves
+        cosmetic = sprite.CosmeticSprite(parent = self.desk, offset = (0, 25), hitboxes = [hitbox.Hitbox(hitbox.create_rect_hitbox_image(10, 10)),])
+        self.canvas.add_sprite(cosmetic)
+        self.assertIn(cosmetic, self.canvas.nearby_sprites(self.sprite))
+        self.desk.location = (100, 100)
+        self.assertNotIn(cosmetic, self.canvas.nearby_sprites(self.sprite))
+
+        ## Frame changes (which move MaskedHitboxes) also mark sprites to be rehashed
+        self.canvas.refresh_index()
+        self.sprite.animations.cycle()
+        self.assertIn(self.sprite, self.canvas._stale)
+
     def test_find_collisions(self):
         """ Checks collisions between sprites with hitboxes """
         tests = [
@@ -100,4 +130,30 @@ class EngineUtilsRulesTestCase(EngineUtils):
         self.sprite.location = (250,250+self.HITBOXHEIGHT)
         targetlocation = (250, 250+self.HITBOXHEIGHT+testutils.STEPLENGTH)
         self.canvas.move_sprite(self.sprite, "down")
-        self.assertEqual(self.sprite.location, targetlocation)
\ No newline at end of file
+        self.assertEqual(self.sprite.location, targetlocation)
+
+    def test_collision_stop_batch(self)-> None:
+        """ Tests that collision_stop_batch blocks the same moves as collision_stop_rule for a single sprite """
+        self.canvas.add_listener("movement", utils.collision_stop_rule)
+        self.canvas.add_sprite(self.desk, (250, 250))
+        self.canvas.add_sprite(self.sprite, (250, 250+self.HITBOXHEIGHT))
+        for (direction, result) in [("up", False), ("right", True), ("down", True), ("left", True)]:
+            with self.subTest(direction = direction):
+                offset = self.sprite.cs.determine_offset(direction)[:2]
+                moves = canvases.MoveBatch(self.canvas, [self.sprite,], [direction,], np.array([offset]) * testutils.STEPLENGTH)
+                self.assertEqual(utils.collision_stop_batch(moves, np.ones(1, dtype = bool)).tolist(), [result,])
+                event = moves.event(0)
+                self.assertEqual(utils.collision_stop_rule(event) is not False, result)
+
+    def test_collision_stop_rule_after_probe(self)-> None:
+        """ Tests that probing a sprite's moves at another location (which moves the sprite and returns it) does not hide it from collisions """
+        self.canvas.add_listener("movement", utils.collision_stop_rule)
+        other = testutils.load_testsprite(hitboxes = [hitbox.MaskedHitbox(hitbox.create_rect_hitbox_image(testutils.SPRITESIZE, self.HITBOXHEIGHT),anchor="bl"),])
+        self.canvas.add_sprite(other, (0, 0))
+        list(other.valid_moves(self.canvas, (300, 200)))
+        self.assertEqual(other.location, (0, 0))
+
+        self.canvas.add_sprite(self.sprite, (0, 40))
+        for i in range(5):
+            self.canvas.move_sprite(self.sprite, "up")
+        self.assertEqual(self.sprite.location, (0, 16))
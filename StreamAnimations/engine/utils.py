@@ -2,13 +2,21 @@
 from StreamAnimations.engine import Event
 from StreamAnimations import sprite,utils
 from StreamAnimations.sprite import hitbox
+from StreamAnimations.canvases import CanvasBase
 ## 3rd Part
 from PIL import Image, ImageChops
+import numpy as np
 
 
 def find_nearby_sprites(targetsprite, othersprites) -> list:
-    """ Check for overlapping bbox and return a list of overlapped boxes """
+    """ Check for overlapping bbox and return a list of overlapped boxes
+
+        othersprites may be a list of sprites or a Canvas: if a Canvas is provided, only the sprites
+        returned by its spatialindex are checked.
+    """
     if not targetsprite.hitboxes: return 
+    if isinstance(othersprites, CanvasBase):
+        othersprites = othersprites.nearby_sprites(targetsprite)
     tbboxes = targetsprite.hitboxes
     for sprite in othersprites:
         if sprite is not targetsprite:
@@ -18,9 +26,9 @@ def find_nearby_sprites(targetsprite, othersprites) -> list:
                         if utils.check_boundingbox_overlap(tbbox.bbox, hitbox.bbox):
                             yield (tbbox, hitbox)
 
-def find_collisions(hitbox1: hitbox.Hitbox, hitbox2: hitbox.Hitbox):
-    result = utils.find_overlap_of_images(hitbox1.image, hitbox2.image, bbox1= hitbox1.bbox, bbox2= hitbox2.bbox)
-    return bool(result.getbbox())
+def find_collisions(hitbox1: hitbox.Hitbox, hitbox2: hitbox.Hitbox)-> bool:
+    """ Returns whether the masks of the two hitboxes overlap """
+    return hitbox1.bitmask.overlaps(hitbox2.bitmask, bbox1= hitbox1.bbox, bbox2= hitbox2.bbox)
 
 
 def collision_stop_rule(event: Event):
@@ -29,6 +37,84 @@ def collision_stop_rule(event: Event):
     canvas = event.canvas
     targetx, targety = event.x + event.dx, event.y + event.dy
     with targetsprite.at( (targetx, targety) ):
-        for (hitbox, hurtbox) in find_nearby_sprites(targetsprite, canvas.sprites):
+        for (hitbox, hurtbox) in find_nearby_sprites(targetsprite, canvas):
             if find_collisions(hitbox, hurtbox):
-                return False
\ No newline at end of file
+                return False
+
+def _hitbox_table(moves: "canvases.MoveBatch")-> tuple:
+    """ Returns (hitboxes, boxes, owners) for every hitbox on the moves' canvas: boxes is an (n, 4) array of their
+        bboxes at their current locations and owners is the index of each hitbox's sprite in moves (-1 if it is not moving).
+
+        The table is cached on moves since sprites do not move while the batch is evaluated.
+    """
+    table = moves.cache.get("hitboxes")
+    if table is None:
+        hitboxes, boxes, owners = [], [], []
+        for sprite in moves.canvas.sprites:
+            if not sprite.hitboxes or sprite.location is None: continue
+            owner = moves.index.get(sprite, -1)
+            for hitbox in sprite.hitboxes:
+                hitboxes.append(hitbox)
+                boxes.append(hitbox.bbox)
+                owners.append(owner)
+        table = moves.cache["hitboxes"] = (hitboxes, np.array(boxes).reshape(-1, 4), np.array(owners, dtype = np.intp))
+    return table
+
+def collision_stop_batch(moves: "canvases.MoveBatch", allowed: np.ndarray)-> np.ndarray:
+    """ Batch form of collision_stop_rule (see canvases.MoveBatch).
+
+        An allowed move is blocked if the mover's hitboxes at its target overlap the hitboxes of a sprite which is not moving
+        (including movers whose moves are not allowed), or the hitboxes of an earlier allowed move at its target.
+        Candidate pairs are found with a vectorized bounding box test (see _broad_phase); pairs where either mask
+        is not solid are then checked with BitMask.overlaps.
+    """
+    hitboxes, boxes, owners = _hitbox_table(moves)
+    if not len(boxes): return allowed
+    ## Movers which are not allowed to move are obstacles, like sprites which are not moving
+    obstacle = (owners < 0) | ~allowed[np.maximum(owners, 0)]
+    movers = np.flatnonzero(~obstacle)
+    boxes = boxes.copy()
+    boxes[movers] += np.tile(moves.deltas[owners[movers]], 2)
+    ## Results of the narrow phase, keyed on the pair and whether the other hitbox is at its target
+    narrow = moves.cache.setdefault("narrowphase", dict())
+
+    output = allowed.copy()
+    for row, column in _broad_phase(boxes, movers):
+        ## A mover's hitboxes never block itself, and a conflict between two movers blocks the later move
+        owner = owners[row]
+        if not output[owner] or not (obstacle[column] or owners[column] < owner): continue
+        key = (row, column, bool(obstacle[column]))
+        collides = narrow.get(key)
+        if collides is None:
+            mask, othermask = hitboxes[row].bitmask, hitboxes[column].bitmask
+            collides = narrow[key] = (mask.solid and othermask.solid) or \
+                mask.overlaps(othermask, bbox1 = boxes[row].tolist(), bbox2 = boxes[column].tolist())
+        if collides: output[owner] = False
+    return output
+
+def _broad_phase(boxes: np.ndarray, rows: np.ndarray)-> list:
+    """ Returns the (row, column) pairs of boxes (an (n, 4) array of bboxes) where boxes[row] overlaps boxes[column]
+        (and row != column), for each row in rows.
+
+        Boxes are sorted by their left edge, so each row is only compared with the boxes whose left edge is within
+        the widest box's width of its own.
+    """
+    order = np.argsort(boxes[:, 0], kind = "stable")
+    left = boxes[order, 0]
+    widest = (boxes[:, 2] - boxes[:, 0]).max()
+    a = boxes[rows]
+    ## A box can only overlap a if its left edge is in (a.x0 - widest, a.x1)
+    lo = np.searchsorted(left, a[:, 0] - widest, side = "right")
+    hi = np.searchsorted(left, a[:, 2], side = "left")
+    counts = np.maximum(hi - lo, 0)
+    total = int(counts.sum())
+    if not total: return []
+    pairrows = np.repeat(rows, counts)
+    ## Index of each candidate within its row's range of the sorted boxes
+    offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    pairs = order[np.repeat(lo, counts) + offsets]
+    a, b = boxes[pairrows], boxes[pairs]
+    overlap = (a[:, 0] < b[:, 2]) & (b[:, 0] < a[:, 2]) & (a[:, 1] < b[:, 3]) & (b[:, 1] < a[:, 3]) & (pairrows != pairs)
+    return list(zip(pairrows[overlap].tolist(), pairs[overlap].tolist()))
+
+collision_stop_rule.batch = collision_stop_batch
@@ -5,11 +5,25 @@ from  PIL import Image
 
 class Animations():
     def __init__(self, **kw):
+        ## Called (with no arguments) whenever the current frame may have changed: see Sprite.watch
+        self.onchange = None
         self.animations = dict()
         for animation, frames in kw.items():
             self.animations[animation] = AnimationLoop(frames)
+            self.animations[animation].onchange = self._changed
         self.current_animation = list(kw.keys())[0] if kw else -1
         self._paused = False
+
+    def _changed(self):
+        if self.onchange is not None: self.onchange()
+
+    @property
+    def current_animation(self):
+        return self._current_animation
+    @current_animation.setter
+    def current_animation(self, value):
+        self._current_animation = value
+        self._changed()
     
     def pause(self):
         self._paused = True
@@ -32,8 +46,13 @@ class Animations():
         animation = self.animations[animation] if animation else self.current_loop()
         animation.cycle(count)
 
+    def current_name(self):
+        """ Returns the key of the AnimationLoop returned by current_loop """
+        if self.current_animation in self.animations: return self.current_animation
+        return list(self.animations)[0]
+
     def current_loop(self):
-        return self.animations.get(self.current_animation) or self.animations[list(self.animations)[0]]
+        return self.animations[self.current_name()]
 
     def current_frame(self):
         return self.current_loop().current_frame()
@@ -47,8 +66,21 @@ class AnimationLoop():
         ## Makes it easier for non-animated sprites
         if isinstance(frames,Image.Image): frames = [frames,] 
         self.frames = list(frames)
+        ## Called (with no arguments) whenever current_index changes
+        self.onchange = None
+        ## Atlas containing the frames and the (x, y, width, height) of each frame in it (see atlas.Atlas.attach)
+        self.atlas = None
+        self.rects = None
         self.current_index = 0
 
+    @property
+    def current_index(self):
+        return self._current_index
+    @current_index.setter
+    def current_index(self, value):
+        self._current_index = value
+        if self.onchange is not None: self.onchange()
+
     def cycle(self, count:int = 1)-> tuple:
         """ Cycles the current_index by count (default 1) and returns the new index and frame.
 
@@ -62,6 +94,12 @@ class AnimationLoop():
     def current_frame(self):
         return self.frames[self.current_index]
 
+    def view(self, index: int = None):
+        """ Returns the frame at index (default current_index) as an RGBA array view into the loop's atlas (None if it has no atlas) """
+        if self.atlas is None: return None
+        x, y, w, h = self.rects[self.current_index if index is None else index]
+        return self.atlas.array[y:y+h, x:x+w]
+
     def is_last_frame(self):
         return self.current_index == len(self.frames) - 1
     
@@ -98,9 +136,12 @@ class Sprite():
         hitboxes - a list of Hitbox Objects
         """
         self._location = None
+        ## Callbacks which are called with the sprite whenever its location or current frame changes (see watch)
+        self._watchers = []
 
         if not animations: animations = dict()
         self.animations = Animations(**animations)
+        self.animations.onchange = self._changed
         
         if not hitboxes:
             hitboxes = list()
@@ -126,6 +167,22 @@ class Sprite():
             self._location = value
         else:
             self._location = tuple(value)
+        self._changed()
+
+    def watch(self, callback)-> None:
+        """ Registers callback(sprite) to be called whenever the sprite's location or current frame changes
+            (and therefore its bbox and the bboxes of its hitboxes may have changed).
+
+            This is used by CanvasBase to keep its spatialindex up to date.
+        """
+        self._watchers.append(callback)
+
+    def unwatch(self, callback)-> None:
+        """ Removes a callback registered with watch """
+        self._watchers.remove(callback)
+
+    def _changed(self):
+        for callback in self._watchers: callback(self)
 
     def cycle_idle(self):
         self.animations.set_animation("idle")
@@ -144,6 +201,7 @@ class Sprite():
     def add_hitbox(self, hitbox: Hitbox):
         self.hitboxes.append(hitbox)
         hitbox.sprite = self
+        self._changed()
 
     def at(self, location: tuple)-> startlocation:
         """ Returns a startlocation instance which is intended to be used as a Context Manager so that
@@ -159,19 +217,19 @@ class Sprite():
         """
         return startlocation(self, newlocation= location)
 
-    def paste_hitboxes(self, img):
-        for box in self.hitboxes:
-            bx = box.image
-            color = bx.convert("RGBA")
-            pixels= color.load()
-            for x in range(color.width):
-                for y in range(color.height):
-                    if pixels[x,y] == (255, 255, 255, 255):
-                        pixels[x,y] = (255, 0, 0, 255)
-                    # elif pixels[x,y] == (0, 0, 0, 255):
-                    #     pixels[x,y] = (0, 0 , 0, 0)
-            ## bbox is global: need to convert back to local
-            img.paste(color, utils.offset_boundingbox(box.bbox, -self.location[0], -self.location[1]), bx)
+    def hitbox_overlays(self)-> list:
+        """ Returns a list of (mask, offset) for each hitbox, where offset is the hitbox's top-left relative to the sprite's location """
+        return [(box.image, (box.bbox[0]-self.location[0], box.bbox[1]-self.location[1])) for box in self.hitboxes]
+
+    def paste_hitboxes(self, img, overlays: list = None):
+        """ Colors the areas of img covered by the sprite's hitboxes red.
+
+            overlays defaults to the result of hitbox_overlays. Note that img is modified in place.
+        """
+        if overlays is None: overlays = self.hitbox_overlays()
+        for (mask, offset) in overlays:
+            color = Image.new("RGBA", mask.size, (255, 0, 0, 255))
+            img.paste(color, offset, mask)
         return img
 
 class StationarySprite(Sprite):
@@ -189,7 +247,7 @@ class StationarySprite(Sprite):
 
     def get_image(self, with_hitboxes: bool = False):
         img = self.animations.current_frame()
-        if with_hitboxes: return self.paste_hitboxes(img)
+        if with_hitboxes: return self.paste_hitboxes(img.copy())
         return img
 
     @property
@@ -200,13 +258,28 @@ class StationarySprite(Sprite):
 class CosmeticSprite(Sprite):
     def __init__(self, parent = None, offset = None, zindex = 1, **kw):
         super().__init__(**kw)
+        self._parent = None
         self.parent = parent
         self.offset = offset
         self._zindex = zindex
 
+    @property
+    def parent(self):
+        return self._parent
+    @parent.setter
+    def parent(self, value):
+        ## The sprite's location follows its parent, so changes to the parent are forwarded to the sprite's watchers
+        if self._parent is not None: self._parent.unwatch(self._parent_changed)
+        self._parent = value
+        if value is not None: value.watch(self._parent_changed)
+        self._changed()
+
+    def _parent_changed(self, parent):
+        self._changed()
+
     def get_image(self, with_hitboxes:bool = False):
         img = self.animations.current_frame()
-        if with_hitboxes: return self.paste_hitboxes(img)
+        if with_hitboxes: return self.paste_hitboxes(img.copy())
         return img
 
     @property
@@ -280,7 +353,7 @@ class MobileSprite(Sprite):
 
     def get_image(self, with_hitboxes: bool = False):
         img = self.animations.current_frame()
-        if with_hitboxes: return self.paste_hitboxes(img)
+        if with_hitboxes: return self.paste_hitboxes(img.copy())
         return img
 
     @property
@@ -0,0 +1,157 @@
+## This Module
+from StreamAnimations import utils
+## Builtin
+import hashlib
+import json
+import pathlib
+## Third Party
+from PIL import Image
+import numpy as np
+
+## Suffix appended to the names of mirrored animations
+MIRRORSUFFIX = "/mirror"
+
+def image_digest(image: Image.Image)-> str:
+    """ Returns a digest of the image's size and RGBA pixels, used to look up frames by content """
+    image = image.convert("RGBA")
+    return hashlib.sha1(b"%dx%d:" % image.size + image.tobytes()).hexdigest()
+
+class Atlas():
+    """ A single RGBA array (indexed [y, x]) containing many sprite frames.
+
+        index maps a name (e.g.- "walk/Y") to a list of (x, y, width, height) rects, one per frame.
+        sources maps the digest of each packed image (see image_digest) to its first (name, frameindex).
+
+        view returns a frame as a view into the array. PIL Images cannot share memory with part of an array,
+        so image and frames return copies: sprites attached to the atlas (see attach) keep their own Images,
+        and the numpy compositing backend blits their frames straight from the array instead.
+    """
+    def __init__(self, array: np.ndarray, index: dict, sources: dict = None) -> None:
+        self.array = array
+        self.index = {name: [tuple(rect) for rect in rects] for name, rects in index.items()}
+        self.sources = {digest: tuple(source) for digest, source in (sources or dict()).items()}
+        ## id(image) => (image, name, frameindex) for images the atlas was built from
+        self._sources = dict()
+
+    @classmethod
+    def build(cls, animations: dict, mirror: bool = False, padding: int = 0, maxwidth: int = 1024)-> "Atlas":
+        """ Packs the frames of each animation (a dict of name => list of Images) into a new Atlas.
+
+            If mirror is True, a horizontally mirrored copy of each animation is added as name + MIRRORSUFFIX.
+            Frames are packed onto shelves (tallest frames first) no wider than maxwidth (unless a frame is wider).
+        """
+        entries = []
+        for name, frames in animations.items():
+            if isinstance(frames, Image.Image): frames = [frames,]
+            frames = list(frames)
+            entries.extend((name, i, frame) for i, frame in enumerate(frames))
+            if mirror:
+                entries.extend((name + MIRRORSUFFIX, i, frame) for i, frame in enumerate(utils.mirror_sprite(frames)))
+
+        ## Shelf packing: images used by more than one animation are only packed once
+        unique = list({id(frame): frame for (name, i, frame) in entries}.values())
+        rects = dict()
+        x = y = shelfheight = width = 0
+        for frame in sorted(unique, key = lambda frame: frame.height, reverse = True):
+            if x and x + frame.width > maxwidth:
+                x, y, shelfheight = 0, y + shelfheight + padding, 0
+            rects[id(frame)] = (x, y, frame.width, frame.height)
+            x += frame.width + padding
+            width = max(width, x - padding)
+            shelfheight = max(shelfheight, frame.height)
+
+        array = np.zeros((y + shelfheight, width, 4), dtype = np.uint8)
+        for frame in unique:
+            fx, fy, fw, fh = rects[id(frame)]
+            array[fy:fy+fh, fx:fx+fw] = np.asarray(frame.convert("RGBA"))
+        index = dict()
+        for (name, i, frame) in entries:
+            index.setdefault(name, []).append(rects[id(frame)])
+
+        atlas = cls(array, index)
+        for (name, i, frame) in entries:
+            atlas._sources[id(frame)] = (frame, name, i)
+            atlas.sources.setdefault(image_digest(frame), (name, i))
+        return atlas
+
+    @classmethod
+    def from_sprites(cls, sprites: dict, **kw)-> "Atlas":
+        """ Builds an Atlas from a dict of name => Sprite: each of the sprite's animations is added as "{name}/{animation}" """
+        animations = dict()
+        for spritename, sprite in sprites.items():
+            for animation, loop in sprite.animations.animations.items():
+                if loop.frames: animations[f"{spritename}/{animation}"] = loop.frames
+        return cls.build(animations, **kw)
+
+    def attach(self, sprite, spritename: str)-> None:
+        """ Links each of the sprite's AnimationLoops to the frames of "{spritename}/{animation}" (as packed by from_sprites),
+            so that they can be drawn from the atlas (see AnimationLoop.view). Animations which are not in the atlas are skipped.
+
+            Raises ValueError if an animation's frames do not match the size of the atlas' frames.
+        """
+        for animation, loop in sprite.animations.animations.items():
+            rects = self.index.get(f"{spritename}/{animation}")
+            if rects is None or not loop.frames: continue
+            if len(rects) != len(loop.frames) or any(frame.size != tuple(rect[2:]) for frame, rect in zip(loop.frames, rects)):
+                raise ValueError(f"Frames of {spritename}/{animation} do not match the atlas")
+            loop.atlas, loop.rects = self, list(rects)
+
+    def attach_sprites(self, sprites: dict)-> None:
+        """ Attaches each sprite of a dict of name => Sprite (as passed to from_sprites) """
+        for spritename, sprite in sprites.items():
+            self.attach(sprite, spritename)
+
+    def animations(self, spritename: str)-> dict:
+        """ Returns a dict of animation => frames for the given sprite name (e.g.- to create a Sprite from a loaded atlas, before attaching it) """
+        prefix = spritename + "/"
+        return {name[len(prefix):]: self.frames(name) for name in self.index if name.startswith(prefix)}
+
+    def rect(self, name: str, index: int = 0)-> tuple:
+        """ Returns the (x, y, width, height) of the given frame """
+        return self.index[name][index]
+
+    def view(self, name: str, index: int = 0)-> np.ndarray:
+        """ Returns the given frame as a view into the atlas array """
+        x, y, w, h = self.index[name][index]
+        return self.array[y:y+h, x:x+w]
+
+    def image(self, name: str, index: int = 0)-> Image.Image:
+        """ Returns a copy of the given frame as an RGBA Image """
+        return Image.fromarray(self.view(name, index))
+
+    def frames(self, name: str)-> list:
+        """ Returns all frames for the given name as a list of Images (e.g.- to create a Sprite's animations) """
+        return [self.image(name, i) for i in range(len(self.index[name]))]
+
+    def lookup(self, image: Image.Image)-> tuple:
+        """ Returns the (name, index) of the frame that was created from the given image (or an identical image), or None """
+        source = self._sources.get(id(image))
+        if source and source[0] is image: return source[1:]
+        return self.sources.get(image_digest(image))
+
+    def save(self, path)-> None:
+        """ Saves the atlas array and its index.
+
+            The array is saved to path (as a numpy array if the suffix is ".npy", otherwise as an image)
+            and the index and sources are saved alongside it with a ".json" suffix.
+        """
+        path = pathlib.Path(path)
+        if path.suffix == ".npy":
+            np.save(path, self.array)
+        else:
+            Image.fromarray(self.array).save(path)
+        with open(path.with_suffix(".json"), "w") as f:
+            json.dump(dict(index = self.index, sources = self.sources), f)
+
+    @classmethod
+    def load(cls, path)-> "Atlas":
+        """ Loads an Atlas saved with Atlas.save """
+        path = pathlib.Path(path)
+        if path.suffix == ".npy":
+            array = np.load(path)
+        else:
+            with Image.open(path) as img:
+                array = np.asarray(img.convert("RGBA")).copy()
+        with open(path.with_suffix(".json"), "r") as f:
+            data = json.load(f)
+        return cls(array, data["index"], data["sources"])
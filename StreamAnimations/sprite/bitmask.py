@@ -0,0 +1,78 @@
+## Third Party
+from PIL import Image
+import numpy as np
+
+class BitMask():
+    """ A Bi-level (mode="1") mask stored as rows of packed bits.
+
+        Overlap tests AND the packed bytes covering the area where the two masks intersect
+        (shifted so that both start on the same bit), so nothing is unpacked or allocated at full size.
+    """
+    def __init__(self, packed: np.ndarray, width: int, height: int) -> None:
+        self.packed = packed
+        self.width = width
+        self.height = height
+        self._solid = None
+
+    @classmethod
+    def from_image(cls, image: Image.Image)-> "BitMask":
+        """ Creates a BitMask from an Image: any non-zero pixel (once converted to mode="1") is set """
+        bits = np.asarray(image.convert("1"), dtype = bool)
+        return cls(np.packbits(bits, axis = 1), image.width, image.height)
+
+    @property
+    def size(self):
+        return self.width, self.height
+
+    @property
+    def solid(self)-> bool:
+        """ Whether every bit of the mask is set (in which case overlap tests reduce to bounding box tests) """
+        if self._solid is None:
+            self._solid = bool(self.region(0, 0, self.width, self.height).all())
+        return self._solid
+
+    def region(self, x0: int, y0: int, x1: int, y1: int)-> np.ndarray:
+        """ Returns the given region of the mask as a 2d boolean array (indexed [y, x]) """
+        b0, b1 = x0 // 8, (x1 + 7) // 8
+        bits = np.unpackbits(self.packed[y0:y1, b0:b1], axis = 1)
+        return bits[:, x0 - b0*8 : x1 - b0*8].astype(bool)
+
+    def packed_region(self, x0: int, y0: int, x1: int, y1: int)-> np.ndarray:
+        """ Returns the given region of the mask as rows of packed bits (a 2d uint8 array) whose first bit is column x0.
+
+            Bits after column x1 in the last byte of each row are not cleared.
+        """
+        b0, shift = divmod(x0, 8)
+        nbytes = (x1 - x0 + 7) // 8
+        if not shift: return self.packed[y0:y1, b0:b0+nbytes]
+        rows = self.packed[y0:y1, b0:b0+nbytes+1]
+        if rows.shape[1] < nbytes + 1:
+            rows = np.pad(rows, ((0, 0), (0, nbytes + 1 - rows.shape[1])))
+        ## Each output byte is made of the low bits of one byte and the high bits of the next
+        return (rows[:, :nbytes] << shift) | (rows[:, 1:] >> (8 - shift))
+
+    def overlaps(self, other: "BitMask", bbox1 = None, bbox2 = None)-> bool:
+        """ Returns whether any set bit of this mask overlaps a set bit of the other mask.
+
+            bbox1 and bbox2 position this mask and the other mask respectively and default to
+            [0, 0, mask.width, mask.height] (mirroring utils.find_overlap_of_images).
+        """
+        if not bbox1: bbox1 = [0, 0, self.width, self.height]
+        if not bbox2: bbox2 = [0, 0, other.width, other.height]
+        ## Intersecting rectangle in global coordinates
+        x0, y0 = max(bbox1[0], bbox2[0]), max(bbox1[1], bbox2[1])
+        x1 = min(bbox1[0] + self.width, bbox2[0] + other.width)
+        y1 = min(bbox1[1] + self.height, bbox2[1] + other.height)
+        if x0 >= x1 or y0 >= y1: return False
+
+        a = self.packed_region(x0 - bbox1[0], y0 - bbox1[1], x1 - bbox1[0], y1 - bbox1[1])
+        b = other.packed_region(x0 - bbox2[0], y0 - bbox2[1], x1 - bbox2[0], y1 - bbox2[1])
+        both = a & b
+        ## Clear the bits after the intersection in the last byte of each row
+        tail = (x1 - x0) % 8
+        if tail: both[:, -1] &= (0xFF << (8 - tail)) & 0xFF
+        return bool(both.any())
+
+    def to_image(self)-> Image.Image:
+        """ Converts the BitMask back to a mode="1" Image """
+        return Image.fromarray(self.region(0, 0, self.width, self.height)).convert("1")
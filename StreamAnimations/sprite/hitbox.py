@@ -1,5 +1,6 @@
 ## This Module
 from StreamAnimations import utils
+from StreamAnimations.sprite.bitmask import BitMask
 ## Builtin
 from collections import OrderedDict
 ## Third Party
@@ -13,6 +14,8 @@ class Hitbox():
     def __init__(self, image, sprite= None) -> None:
         self.sprite = sprite
         self._image = image.convert("1")
+        ## (image, BitMask) for the last image used by bitmask
+        self._bitmask = None
 
     @property
     def image(self):
@@ -21,6 +24,14 @@ class Hitbox():
     def image(self, value):
         self._image = value.convert("1")
 
+    @property
+    def bitmask(self)-> BitMask:
+        """ Returns self.image as a BitMask, only rebuilding it when self.image is a different object """
+        image = self.image
+        if self._bitmask is None or self._bitmask[0] is not image:
+            self._bitmask = (image, BitMask.from_image(image))
+        return self._bitmask[1]
+
     @property
     def topleft(self):
         return tuple(self.sprite.location)[:2]
@@ -112,9 +123,43 @@ class AnchoredHitbox(AnchorMixin, Hitbox):
     
 
 class MaskedHitbox(AnchoredHitbox):
+    """ A Hitbox whose mask is limited to the opaque portions of its Sprite's current frame.
+
+        Because a Sprite's frames are drawn from a fixed list (AnimationLoop.frames), the resulting
+        mask is cached per frame (and anchor) and only rebuilt when the hitbox's image is reassigned.
+    """
+    def __init__(self, *args, **kw) -> None:
+        super().__init__(*args, **kw)
+        ## Keyed on (id(frame), anchor): values are [frame, mask, BitMask] so that the frame
+        ## cannot be garbage collected (and its id reused) while it is cached
+        self._maskcache = dict()
+
+    def _cached_mask(self)-> list:
+        """ Returns the cache entry for the sprite's current frame and anchor, creating it if necessary """
+        simage = self.sprite.get_image()
+        key = (id(simage), self.standardize_anchor(self.anchor))
+        cached = self._maskcache.get(key)
+        if cached and cached[0] is simage:
+            return cached
+        mask = utils.find_overlap_of_images(self._image, utils.opaque_mask(simage), self.bbox, self.sprite.bbox)
+        self._maskcache[key] = cached = [simage, mask, None]
+        return cached
+
     @property
     def image(self):
-        simage = self.sprite.get_image()
-        simage = utils.opaque_mask(simage)
-        sbbox = self.sprite.bbox
-        return utils.find_overlap_of_images(self._image, simage, self.bbox, sbbox)
+        return self._cached_mask()[1]
+    @image.setter
+    def image(self, value):
+        self._image = value.convert("1")
+        self.clear_cache()
+
+    @property
+    def bitmask(self)-> BitMask:
+        cached = self._cached_mask()
+        if cached[2] is None:
+            cached[2] = BitMask.from_image(cached[1])
+        return cached[2]
+
+    def clear_cache(self):
+        """ Removes all precomputed masks """
+        self._maskcache.clear()
@@ -0,0 +1,97 @@
+## Test Framework
+import unittest
+## Test Target
+from StreamAnimations.sprite import atlas
+## Test utilities
+from StreamAnimations.tests import utils as testutils
+## This Module
+from StreamAnimations import utils
+
+## builtin
+import itertools
+import pathlib
+import tempfile
+## 3rd Party
+from PIL import Image, ImageChops
+import numpy as np
+
+class AtlasTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.sprite = testutils.load_testsprite()
+        self.desk = testutils.load_terrain_sprite()
+        self.atlas = atlas.Atlas.from_sprites({"me": self.sprite, "desk": self.desk}, mirror = True, maxwidth = 200)
+
+    def assertImagesEqual(self, image1, image2):
+        self.assertEqual(image1.size, image2.size)
+        self.assertIsNone(ImageChops.difference(image1.convert("RGBA"), image2.convert("RGBA")).getbbox())
+
+    def test_frames(self):
+        """ Tests that every frame (and its mirror) can be retrieved from the atlas """
+        for (spritename, sprite) in [("me", self.sprite), ("desk", self.desk)]:
+            for animation, loop in sprite.animations.animations.items():
+                if not loop.frames: continue
+                name = f"{spritename}/{animation}"
+                for frame, image, mirrored in zip(loop.frames, self.atlas.frames(name), self.atlas.frames(name + atlas.MIRRORSUFFIX)):
+                    with self.subTest(name = name, frame = frame):
+                        self.assertImagesEqual(image, frame)
+                        self.assertImagesEqual(mirrored, utils.mirror_spriteframe(frame))
+                        ## The same image may be used by more than one animation, so lookup may return any of them
+                        self.assertImagesEqual(self.atlas.image(*self.atlas.lookup(frame)), frame)
+        self.assertIsNone(self.atlas.lookup(Image.new("RGBA", (1, 1))))
+
+    def test_packing(self):
+        """ Tests that no two frames overlap and that views share memory with the atlas """
+        rects = [rect for rects in self.atlas.index.values() for rect in rects]
+        for (ax, ay, aw, ah), (bx, by, bw, bh) in itertools.combinations(rects, 2):
+            self.assertFalse(utils.check_boundingbox_overlap((ax, ay, ax+aw, ay+ah), (bx, by, bx+bw, by+bh)))
+        self.assertLessEqual(self.atlas.array.shape[1], 200)
+        self.assertTrue(np.shares_memory(self.atlas.view("me/Y", 0), self.atlas.array))
+
+    def test_save_load(self):
+        """ Tests that atlases can be saved and loaded as .npy and .png """
+        with tempfile.TemporaryDirectory() as directory:
+            for filename in ["atlas.npy", "atlas.png"]:
+                with self.subTest(filename = filename):
+                    path = pathlib.Path(directory) / filename
+                    self.atlas.save(path)
+                    self.assertTrue(path.with_suffix(".json").exists())
+                    loaded = atlas.Atlas.load(path)
+                    self.assertEqual(loaded.index, self.atlas.index)
+                    self.assertTrue(np.array_equal(loaded.array, self.atlas.array))
+                    ## Frames are looked up by content once the source images are no longer available
+                    frame = self.sprite.get_image()
+                    self.assertImagesEqual(loaded.image(*loaded.lookup(frame)), frame)
+
+    def test_shared_frames(self):
+        """ Tests that an image used by multiple animations is only packed once """
+        frame = self.desk.get_image()
+        shared = atlas.Atlas.build({"a": [frame,], "b": [frame,]})
+        self.assertEqual(shared.rect("a"), shared.rect("b"))
+        self.assertEqual(shared.array.shape[:2], (frame.height, frame.width))
+
+    def test_attach(self):
+        """ Tests that attached AnimationLoops view their frames in the atlas """
+        self.atlas.attach_sprites({"me": self.sprite, "desk": self.desk})
+        for (spritename, sprite) in [("me", self.sprite), ("desk", self.desk)]:
+            for animation, loop in sprite.animations.animations.items():
+                if not loop.frames:
+                    self.assertIsNone(loop.view())
+                    continue
+                for i, frame in enumerate(loop.frames):
+                    with self.subTest(name = f"{spritename}/{animation}", frame = i):
+                        self.assertIs(loop.atlas, self.atlas)
+                        self.assertTrue(np.shares_memory(loop.view(i), self.atlas.array))
+                        self.assertImagesEqual(Image.fromarray(loop.view(i)), frame)
+
+        ## Sprites can be created from the atlas' frames and then attached
+        other = testutils.load_testsprite()
+        for animation, frames in self.atlas.animations("me").items():
+            if animation in other.animations.animations: other.animations.animations[animation].frames = frames
+        self.atlas.attach(other, "me")
+        self.assertTrue(np.shares_memory(other.animations.current_loop().view(), self.atlas.array))
+
+        ## "desk/idle" is a different size
+        mismatched = testutils.load_terrain_sprite()
+        mismatched.animations.animations["idle"].frames = [Image.new("RGBA", (4, 4)),]
+        with self.assertRaises(ValueError):
+            self.atlas.attach(mismatched, "desk")
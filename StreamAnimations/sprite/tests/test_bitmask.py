@@ -0,0 +1,62 @@
+## Test Framework
+import unittest
+## Test Target
+from StreamAnimations.sprite import bitmask
+## Test utilities
+from StreamAnimations.tests import utils as testutils
+## This Module
+from StreamAnimations import utils
+
+## builtin
+import pathlib
+## 3rd Party
+from PIL import Image, ImageChops
+import numpy as np
+
+SAMPLEDIR = (pathlib.Path(__file__).parent / "samples").resolve()
+
+class BitMaskTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.sprite = testutils.load_testsprite()
+        self.desk = testutils.load_terrain_sprite()
+        self.spritemask = utils.opaque_mask(self.sprite.get_image())
+        self.deskmask = utils.opaque_mask(self.desk.get_image())
+
+    def test_roundtrip(self):
+        """ Tests that converting an image to a BitMask and back results in the same image """
+        for image in [self.spritemask, self.deskmask, Image.open(SAMPLEDIR / "special_mask.bmp")]:
+            with self.subTest(image = image):
+                mask = bitmask.BitMask.from_image(image)
+                self.assertEqual(mask.size, image.size)
+                self.assertIsNone(ImageChops.difference(mask.to_image(), image.convert("1")).getbbox())
+
+    def test_overlaps(self):
+        """ Tests that BitMask.overlaps agrees with utils.find_overlap_of_images at a range of offsets """
+        spritemask, deskmask = bitmask.BitMask.from_image(self.spritemask), bitmask.BitMask.from_image(self.deskmask)
+        for dx in range(-50, 51, 3):
+            for dy in range(-35, 36, 5):
+                bbox1 = (0, 0, self.spritemask.width, self.spritemask.height)
+                bbox2 = (dx, dy, dx + self.deskmask.width, dy + self.deskmask.height)
+                with self.subTest(bbox1 = bbox1, bbox2 = bbox2):
+                    expected = utils.check_boundingbox_overlap(bbox1, bbox2) and \
+                        bool(utils.find_overlap_of_images(self.spritemask, self.deskmask, bbox1, bbox2).getbbox())
+                    self.assertEqual(spritemask.overlaps(deskmask, bbox1, bbox2), expected)
+                    ## The reciprocal should also be true
+                    self.assertEqual(deskmask.overlaps(spritemask, bbox2, bbox1), expected)
+
+    def test_overlaps_random(self):
+        """ Tests that BitMask.overlaps agrees with the unpacked masks for random masks at offsets which are not byte-aligned """
+        rng = np.random.default_rng(0)
+        for i in range(300):
+            (w1, h1), (w2, h2) = rng.integers(1, 40, 2), rng.integers(1, 40, 2)
+            bits1, bits2 = rng.random((h1, w1)) < .05, rng.random((h2, w2)) < .05
+            mask1, mask2 = bitmask.BitMask.from_image(Image.fromarray(bits1)), bitmask.BitMask.from_image(Image.fromarray(bits2))
+            dx, dy = int(rng.integers(-w2, w1 + 1)), int(rng.integers(-h2, h1 + 1))
+            bbox1, bbox2 = (0, 0, w1, h1), (dx, dy, dx + w2, dy + h2)
+            with self.subTest(bbox1 = bbox1, bbox2 = bbox2):
+                expected = np.zeros((max(h1, dy + h2) - min(0, dy), max(w1, dx + w2) - min(0, dx)), dtype = np.int8)
+                ox, oy = -min(0, dx), -min(0, dy)
+                expected[oy:oy+h1, ox:ox+w1] += bits1
+                expected[oy+dy:oy+dy+h2, ox+dx:ox+dx+w2] += bits2
+                self.assertEqual(mask1.overlaps(mask2, bbox1, bbox2), bool((expected == 2).any()))
+                self.assertEqual(mask2.overlaps(mask1, bbox2, bbox1), bool((expected == 2).any()))
@@ -144,4 +144,38 @@ class MaskedHitboxTestCase(HitboxTestCase):
                 testresult = hb.image
                 resultimg = Image.open(RESULTSDIR / result).convert("1")
 
-                self.assertIsNone(ImageChops.difference(testresult,resultimg).getbbox())
\ No newline at end of file
+                self.assertIsNone(ImageChops.difference(testresult,resultimg).getbbox())
+
+    def test_image_cache(self):
+        """ Tests that masks are cached per frame and anchor and are rebuilt when the hitbox image changes """
+        img = hitbox.create_rect_hitbox_image(32,10)
+        hb = hitbox.MaskedHitbox(img, anchor = "bl")
+        self.sprite.location = (0,0)
+        self.sprite.add_hitbox(hb)
+
+        ## Same frame and anchor returns the cached mask
+        mask = hb.image
+        self.assertIs(hb.image, mask)
+
+        ## Moving the sprite does not change the mask
+        self.sprite.location = (10, 10)
+        self.assertIs(hb.image, mask)
+
+        ## Different anchor results in a different mask
+        hb.anchor = "tl"
+        self.assertIsNot(hb.image, mask)
+        hb.anchor = "bl"
+        self.assertIs(hb.image, mask)
+
+        ## Different frame results in a different mask
+        self.sprite.animations.cycle()
+        self.assertIsNot(hb.image, mask)
+        self.sprite.animations.cycle(count = -1)
+        self.assertIs(hb.image, mask)
+
+        ## Reassigning the image invalidates the cache
+        hb.image = hitbox.create_rect_hitbox_image(32, 5)
+        newmask = hb.image
+        self.assertIsNot(newmask, mask)
+        resultimg = Image.open(RESULTSDIR / "mask_3.bmp").convert("1")
+        self.assertIsNotNone(ImageChops.difference(newmask, resultimg).getbbox())
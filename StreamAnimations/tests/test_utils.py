@@ -11,6 +11,7 @@ from StreamAnimations.sprite import hitbox
 import pathlib
 ## Third Party
 from PIL import Image, ImageChops
+import numpy as np
 
 
 class UtilsTestCase(unittest.TestCase):
@@ -48,6 +49,88 @@ class UtilsTestCase(unittest.TestCase):
             with self.subTest(bbox1 = bbox1, bbox2 = bbox2, result = result):
                 self.assertEqual(utils.find_overall_boundingbox(bbox1, bbox2), result)
 
+class ScaleImageTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.sprite = testutils.load_testsprite()
+
+    def test_strategies(self):
+        """ Tests that every scaling strategy produces the same image """
+        images = [self.sprite.get_image(), self.sprite.get_image().convert("RGB"), utils.opaque_mask(self.sprite.get_image())]
+        for image in images:
+            for multiplier in [2, 3, 5]:
+                expected = utils.scale_image(image, multiplier, strategy = "repeat")
+                self.assertEqual(expected.size, (image.width*multiplier, image.height*multiplier))
+                for strategy in list(utils.SCALESTRATEGIES) + ["auto",]:
+                    with self.subTest(mode = image.mode, multiplier = multiplier, strategy = strategy):
+                        result = utils.scale_image(image, multiplier, strategy = strategy)
+                        self.assertEqual(result.mode, expected.mode)
+                        self.assertTrue(np.array_equal(np.asarray(result), np.asarray(expected)))
+
+    def test_float_multiplier(self):
+        """ Tests that non-integer multipliers are supported """
+        image = self.sprite.get_image()
+        tests = [
+            ## multiplier, size
+            (1.5,   (48, 48)),
+            (2.0,   (64, 64)),
+            (2.25,  (72, 72)),
+        ]
+        for (multiplier, size) in tests:
+            with self.subTest(multiplier = multiplier, size = size):
+                self.assertEqual(utils.scale_image(image, multiplier).size, size)
+        self.assertIs(utils.scale_image(image, 1.0), image)
+        for multiplier in [0, .5]:
+            with self.subTest(multiplier = multiplier), self.assertRaises(ValueError):
+                utils.scale_image(image, multiplier)
+        with self.assertRaises(ValueError):
+            utils.scale_image(image, 2, strategy = "foobar")
+
+    def test_scale_array_out(self):
+        """ Tests that scale_array can write to a preallocated buffer """
+        array = np.asarray(self.sprite.get_image())
+        out = np.zeros((96, 96, 4), dtype = np.uint8)
+        result = utils.scale_array(array, 3, out = out)
+        self.assertIs(result, out)
+        self.assertTrue(np.array_equal(out, utils.scale_array(array, 3)))
+        with self.assertRaises(ValueError):
+            utils.scale_array(array, 2, out = out)
+
+    def test_choose_scale_strategy(self):
+        """ Tests that the chosen strategy is cached per size, mode, and multiplier """
+        image = Image.new("P", (7, 5))
+        self.assertEqual(list(utils.benchmark_scale_strategies(image, 2)), ["resize",])
+        self.assertEqual(list(utils.benchmark_scale_strategies(image.convert("RGBA"), 2.5)), ["resize",])
+        choice = utils.choose_scale_strategy(image.convert("RGBA"), 2)
+        self.assertIn(choice, utils.SCALESTRATEGIES)
+        self.assertEqual(utils._SCALECHOICES[((7, 5), "RGBA", 2)], choice)
+
+        ## Only the most recent choices are kept
+        for width in range(utils.SCALECHOICESIZE + 5):
+            utils.choose_scale_strategy(Image.new("L", (width + 1, 1)), 2)
+        self.assertEqual(len(utils._SCALECHOICES), utils.SCALECHOICESIZE)
+        self.assertNotIn(((7, 5), "RGBA", 2), utils._SCALECHOICES)
+
+    def test_default_strategy(self):
+        """ Tests that scale_image does not benchmark strategies unless "auto" is requested """
+        utils._SCALECHOICES.clear()
+        image = self.sprite.get_image()
+        self.assertTrue(np.array_equal(np.asarray(utils.scale_image(image, 2)), np.asarray(utils.scale_image(image, 2, strategy = utils.DEFAULT_SCALESTRATEGY))))
+        self.assertEqual(len(utils._SCALECHOICES), 0)
+        ## "P" images keep their palette
+        palette = image.convert("P")
+        self.assertEqual(utils.scale_image(palette, 2).mode, "P")
+        self.assertEqual(utils.scale_image(palette, 2).getpalette(), palette.getpalette())
+
+    def test_integer_scale(self):
+        """ Tests that integer_scale only accepts whole numbers of at least 1 """
+        for (scale, result) in [(1, 1), (2.0, 2), (3, 3)]:
+            with self.subTest(scale = scale):
+                self.assertEqual(utils.integer_scale(scale), result)
+                self.assertIsInstance(utils.integer_scale(scale), int)
+        for scale in [0, .5, 1.5]:
+            with self.subTest(scale = scale), self.assertRaises(ValueError):
+                utils.integer_scale(scale)
+
 class UtilsSpriteTestCase(unittest.TestCase):
     """ Tests which require Sprites/Canvas to be loaded """
     def setUp(self) -> None:
@@ -77,6 +160,24 @@ class UtilsSpriteTestCase(unittest.TestCase):
 
                 self.assertIsNone(ImageChops.difference(testresult, result).getbbox())
 
+    def test_opaque_mask_threshold(self):
+        """ Tests that only pixels with an alpha greater than the threshold are included in the mask """
+        image = Image.new("RGBA", (4, 1), (255, 0, 0, 0))
+        for x, alpha in enumerate([0, 1, 128, 255]):
+            image.putpixel((x, 0), (255, 0, 0, alpha))
+        tests = [
+            ## threshold,    result
+            (  0,    [0, 255, 255, 255]),
+            (  1,    [0,   0, 255, 255]),
+            (128,    [0,   0,   0, 255]),
+            (255,    [0,   0,   0,   0]),
+        ]
+        for (threshold, result) in tests:
+            with self.subTest(threshold = threshold, result = result):
+                testresult = utils.opaque_mask(image, threshold = threshold)
+                self.assertEqual(testresult.mode, "1")
+                self.assertEqual([testresult.getpixel((x, 0)) for x in range(testresult.width)], result)
+
     def test_find_overlap_of_images_nobbox(self):
         """ Tests that find_overlap_of_images works with no bboxes provided.
         
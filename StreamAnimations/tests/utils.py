@@ -4,6 +4,8 @@ from StreamAnimations.sprite import hitbox
 from StreamAnimations.systems import twodimensional
 ## Builtin
 import pathlib
+## Third Party
+from PIL import Image
 
 SAMPLEDIR = (pathlib.Path(__file__).parent / "samples").resolve()
 SPRITESIZE = 32
@@ -42,4 +44,10 @@ def create_sprite_hitbox():
     return hitbox.MaskedHitbox(image = hitbox.create_rect_hitbox_image(32,10), anchor = "bl")
 
 def create_terrain_hitbox():
-    return hitbox.MaskedHitbox(image = hitbox.create_rect_hitbox_image(45,10), anchor = "bl")
\ No newline at end of file
+    return hitbox.MaskedHitbox(image = hitbox.create_rect_hitbox_image(45,10), anchor = "bl")
+
+def create_block(location, size = (4, 3))-> sprite.StationarySprite:
+    """ Creates a sprite with a rectangular hitbox of the given size at location """
+    block = sprite.StationarySprite(animations = {"idle": [Image.new("RGBA", size, (0, 0, 0, 255)),]}, hitboxes = size)
+    block.location = location
+    return block
@@ -1,3 +1,7 @@
+## Builtin
+import collections
+import time
+## Third Party
 from PIL import Image, ImageOps, ImageChops
 import numpy as np
 
@@ -25,17 +29,111 @@ def mirror_sprite(sprite: list):
     """ Call mirror_spriteframe on each sprite image in the given list """
     return [mirror_spriteframe(sp) for sp in sprite]
 
-def scale_image(img: Image.Image, multiplier:int = 2) -> Image.Image:
-    """ Scales an image by the given multiplier """
-    if multiplier is None: multiplier = 2
-    multiplier = int(multiplier)
-    if multiplier == 1: return img
-    if multiplier < 1: raise ValueError("Image can only be scaled up")
+def scale_array(array: np.ndarray, multiplier: int, out: np.ndarray = None)-> np.ndarray:
+    """ Scales an array (indexed [y, x, ...]) by an integer multiplier using nearest neighbor.
+
+        The scaled array is written to out if provided (it must have the scaled shape and the same dtype),
+        so that a buffer can be reused between frames. Otherwise a new array is returned.
+    """
+    h, w = array.shape[:2]
+    shape = (h*multiplier, w*multiplier) + array.shape[2:]
+    if out is None:
+        out = np.empty(shape, dtype = array.dtype)
+    elif out.shape != shape or out.dtype != array.dtype:
+        raise ValueError(f"out should be a {array.dtype} array with shape {shape}, not a {out.dtype} array with shape {out.shape}")
+    source, dest = array, out
+    ## Pack each pixel's channels (e.g.- RGBA) into a single word so that whole pixels are copied at once
+    pixelsize = array.itemsize * (array.shape[2] if array.ndim == 3 else 1)
+    if array.ndim == 3 and pixelsize in (2, 4, 8) and array.flags.c_contiguous and out.flags.c_contiguous:
+        word = np.dtype(f"u{pixelsize}")
+        source, dest = array.view(word)[..., 0], out.view(word)[..., 0]
+    ## Each source pixel is broadcast (without copying) to a multiplier x multiplier block of dest
+    dest.reshape((h, multiplier, w, multiplier) + source.shape[2:])[...] = source[:, None, :, None]
+    return out
+
+def _scale_resize(img: Image.Image, multiplier)-> Image.Image:
+    return img.resize((round(img.width*multiplier), round(img.height*multiplier)), Image.Resampling.NEAREST)
+
+def _scale_broadcast(img: Image.Image, multiplier: int)-> Image.Image:
+    return Image.fromarray(scale_array(np.asarray(img), multiplier))
+
+def _scale_repeat(img: Image.Image, multiplier: int)-> Image.Image:
     img = np.array(img)
     img = np.repeat(img, multiplier, axis = 1)
     img = np.repeat(img, multiplier, axis = 0 )
     return Image.fromarray(img)
 
+## Strategies available to scale_image. Only "resize" supports non-integer multipliers.
+SCALESTRATEGIES = dict(resize = _scale_resize, broadcast = _scale_broadcast, repeat = _scale_repeat)
+## Modes which survive a round trip through numpy (e.g.- "P" images would lose their palette)
+_ARRAYMODES = ("1", "L", "RGB", "RGBA")
+## Strategy used by scale_image unless another one is requested
+DEFAULT_SCALESTRATEGY = "broadcast"
+## (size, mode, multiplier) => name of the fastest strategy (see choose_scale_strategy), least recently used first
+_SCALECHOICES = collections.OrderedDict()
+## Maximum number of entries kept in _SCALECHOICES
+SCALECHOICESIZE = 256
+
+def benchmark_scale_strategies(img: Image.Image, multiplier: int = 2, repeat: int = 3)-> dict:
+    """ Returns the best time (in seconds) out of repeat runs of each strategy that can scale the image """
+    output = dict()
+    for name, strategy in SCALESTRATEGIES.items():
+        if name != "resize" and (int(multiplier) != multiplier or img.mode not in _ARRAYMODES): continue
+        times = []
+        for i in range(repeat):
+            start = time.perf_counter()
+            strategy(img, multiplier)
+            times.append(time.perf_counter() - start)
+        output[name] = min(times)
+    return output
+
+def choose_scale_strategy(img: Image.Image, multiplier: int = 2)-> str:
+    """ Returns the name of the fastest strategy for images of the given image's size and mode.
+
+        The choice is benchmarked (see benchmark_scale_strategies) the first time an image of that size, mode and multiplier
+        is seen, and the most recent SCALECHOICESIZE choices are cached.
+    """
+    key = (img.size, img.mode, multiplier)
+    choice = _SCALECHOICES.get(key)
+    if choice is None:
+        results = benchmark_scale_strategies(img, multiplier)
+        choice = _SCALECHOICES[key] = min(results, key = results.get)
+        if len(_SCALECHOICES) > SCALECHOICESIZE: _SCALECHOICES.popitem(last = False)
+    else:
+        _SCALECHOICES.move_to_end(key)
+    return choice
+
+def scale_image(img: Image.Image, multiplier:int = 2, strategy: str = None) -> Image.Image:
+    """ Scales an image by the given multiplier using nearest neighbor.
+
+        multiplier can be a float, in which case the scaled size is rounded (and the "resize" strategy is always used).
+        strategy is the name of one of SCALESTRATEGIES (default DEFAULT_SCALESTRATEGY), or "auto" to use choose_scale_strategy
+        (which times each strategy the first time it sees an image's size, mode and multiplier, so it is opt-in).
+        Images whose mode cannot be scaled as an array (e.g.- "P") always use "resize". All strategies produce the same image.
+    """
+    if multiplier is None: multiplier = 2
+    if multiplier < 1: raise ValueError("Image can only be scaled up")
+    if multiplier == 1: return img
+    if int(multiplier) == multiplier and img.mode in _ARRAYMODES:
+        multiplier = int(multiplier)
+    else:
+        strategy = "resize"
+    if strategy is None: strategy = DEFAULT_SCALESTRATEGY
+    if strategy == "auto":
+        strategy = choose_scale_strategy(img, multiplier)
+    if strategy not in SCALESTRATEGIES:
+        raise ValueError(f"Invalid strategy: {strategy}")
+    return SCALESTRATEGIES[strategy](img, multiplier)
+
+def integer_scale(scale)-> int:
+    """ Returns scale as an int for renderers which place sprites at whole-pixel offsets (location * scale).
+
+        Raises ValueError if scale is not a whole number of at least 1.
+    """
+    if scale < 1 or int(scale) != scale:
+        raise ValueError(f"scale should be a whole number of at least 1, not {scale}")
+    return int(scale)
+
 def offset_boundingbox(bbox, deltax, deltay):
     return bbox[0] + deltax, bbox[1] + deltay, bbox[2] + deltax, bbox[3] + deltay
 
@@ -80,19 +178,14 @@ def find_overlap_of_images(image1, image2, bbox1 = None, bbox2 = None):
     i2.paste(image2, bbox2)
     return ImageChops.logical_and(i1, i2).crop(bbox1)
 
-def opaque_mask(image: Image.Image):
-    """ Converts the image to mode=1 (black and white) with the non-transparent portions converted to black """
-    image = image.copy().convert("RGBA")
-    pixels = image.load()
-    for x in range(image.width):
-        for y in range(image.height):
-            ## If pixel's alpha channel is not fully transparent, make it white (1)
-            if pixels[x,y][3] != 0:
-                pixels[x,y] = (255, 255, 255, 255)
-            ## Otherwise, make it black (0)
-            else:
-                pixels[x,y] = (0,0,0,0)
-    return image.convert("1")
+def opaque_mask(image: Image.Image, threshold: int = 0)-> Image.Image:
+    """ Converts the image to mode=1 (black and white) with the non-transparent portions converted to white.
+
+        Pixels whose alpha channel is greater than threshold are considered opaque (the default
+        threshold of 0 treats any pixel which is not fully transparent as opaque).
+    """
+    alpha = np.asarray(image.convert("RGBA"))[..., 3]
+    return Image.fromarray(alpha > threshold).convert("1")
 
 if __name__ == "__main__":
     import pathlib
@@ -1,8 +1,7 @@
 from StreamAnimations.engine.renderers.gif import GifRenderer
 from StreamAnimations.canvases import SinglePageCanvas
 from StreamAnimations import sprite
-from StreamAnimations.engine.ai.algorithms import astar
-from StreamAnimations.engine.ai.heuristics.distances import squaredistance, lineardistance
+from StreamAnimations.engine.ai.algorithms import astar_grid
 from StreamAnimations.engine.utils import collision_stop_rule
 from StreamAnimations.systems import twodimensional
 
@@ -67,14 +66,14 @@ goal = (8,3)
 canvas.add_sprite(character, start)
 
 ## Get astar path
-characterpath = astar(
-    character.location,         ## Start Location
-    goal,                       ## Goal
-    heuristic= lineardistance,  ## Heuristic
-    adjacent = lambda start:    ## Find adjacent
-        [(character.cs.determine_offset_coordinate(dire, start), 1)    ## create a node with coordinate offset from the start postion with cost 1
-         for dire in character.valid_moves(canvas, start)]          ## For each direction in valid_moves (returns direction names)
-         )
+## Each cell of the grid is one step (steplength = 1 pixel) and is blocked if the character's hitbox would overlap a wall's hitbox there
+grid = canvas.passability_grid(character)
+characterpath = astar_grid(
+    grid,
+    canvas.sprite_cell(character),  ## Start Cell
+    canvas.sprite_cell(character, goal),    ## Goal Cell
+    )
+characterpath = [canvas.cell_location(character, cell) for cell in characterpath]
 
 ##  Renderer initial frame
 with renderer.frame(): pass
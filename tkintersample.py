@@ -72,21 +72,14 @@ canvas.add_sprite(desk, (50, 50))
 path = ["right","right","right","right","right", "up", "up", "up", "up","left","left","left","left","left"]
 
 
-def movecallback():
-    if path: canvas.move_sprite(me, path.pop(0))
+def update(tick):
+    """ Scene logic: called FRAMERATE times per second by the renderer's Simulation """
+    if path: tick.move_sprite(me, path.pop(0))
     if(printer.animations.is_last_frame()): printer.animations.pause()
-    idles = []
-    for sprite in canvas.sprites:
-        if sprite != me:
-            idles.append(sprite)
-    canvas.animate_idlesprites(idles)
-    renderer.render(scale = renderer.scale, background = renderer.background)
-    root.after(1000//FRAMERATE, movecallback)
 
 root = tk.Tk()
 tkcanvas = tk.Canvas(root, width= CANVASSIZE[0], height = CANVASSIZE[1])
 tkcanvas.pack()
-renderer = TkinterCanvas(canvas, tkcanvas, framerate=FRAMERATE, scale = 5)
-renderer.render(scale = renderer.scale, background = renderer.background)
-root.after(1000//FRAMERATE, movecallback)
+renderer = TkinterCanvas(canvas, tkcanvas, framerate=FRAMERATE, scale = 5, update = update)
+renderer.begin_animationloop()
 root.mainloop()
\ No newline at end of file